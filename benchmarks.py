@@ -0,0 +1,221 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Benchmarks für die Modbus-Treiber und Regler gegen simulierte Geräte auf Loopback-Ports.
+
+Aufruf:
+
+    python benchmarks.py --output bench.json
+
+Die Ergebnisse (Transaktionen/s sowie p50/p95/p99-Latenzen) werden als JSON geschrieben,
+damit sich Releases vergleichen und Regressionen erkennen lassen.
+"""
+from threading import Thread, Barrier
+from datetime import datetime
+import argparse
+import asyncio
+import contextlib
+import json
+import platform
+import sys
+import time
+
+# Wie _sibling in modbus_functions: auch ohne Paket (Datei direkt im Suchpfad) importierbar
+if __package__:
+    from .modbus_functions import MOD_TCP, Modbus_MFC_MKS, Modbus_Pump
+    from .modbus_simulator import SimulatedRig
+    from .regler import easy_PI
+else:
+    from modbus_functions import MOD_TCP, Modbus_MFC_MKS, Modbus_Pump
+    from modbus_simulator import SimulatedRig
+    from regler import easy_PI
+
+
+def summarize(latencies, elapsed):
+    """
+    Fasst Einzellatenzen (Sekunden) zu Durchsatz und Perzentilen (Millisekunden) zusammen.
+
+    :param latencies: Liste der Latenzen einzelner Transaktionen
+    :param elapsed: Gesamtdauer des Laufs in Sekunden
+    """
+    ordered = sorted(latencies)
+    count = len(ordered)
+
+    def percentile(p):
+        if not ordered:
+            return None
+        return ordered[min(count - 1, max(0, int(round(p / 100.0 * count + 0.5)) - 1))] * 1000.0
+
+    return {
+        "count": count,
+        "elapsed_s": elapsed,
+        "tps": count / elapsed if elapsed > 0 else None,
+        "mean_ms": sum(ordered) / count * 1000.0 if count else None,
+        "p50_ms": percentile(50),
+        "p95_ms": percentile(95),
+        "p99_ms": percentile(99),
+        "max_ms": ordered[-1] * 1000.0 if ordered else None,
+    }
+
+
+def timed(func, iterations):
+    """
+    Ruft func iterations-mal auf und misst jede Ausführung.
+    """
+    latencies = []
+    start = time.perf_counter()
+    for _ in range(iterations):
+        t0 = time.perf_counter()
+        func()
+        latencies.append(time.perf_counter() - t0)
+    return summarize(latencies, time.perf_counter() - start)
+
+
+def bench_mfc(rig, iterations):
+    host, port = rig.add("bench_mfc", "mks_modbus")
+    mfc = Modbus_MFC_MKS(host, port)
+    results = {
+        "mfc_flow_read": timed(lambda: mfc.flow, iterations),
+        "mfc_snapshot": timed(mfc.snapshot, iterations),
+        "mfc_set": timed(lambda: mfc.set(100.0), iterations),
+    }
+    mfc.client.close()
+    return results
+
+
+def bench_pump_contention(rig, iterations, threads):
+    """
+    Mehrere Threads greifen gleichzeitig mit Lese- und Schreibbefehlen auf eine Pumpe zu
+    und konkurrieren um deren bus_semaphore bzw. (Suffix _queued) nutzen deren CommandQueue.
+    """
+    host, port = rig.add("bench_pump", "modbus_pump")
+    pump = Modbus_Pump(host, port)
+    results = {}
+    cases = (("pump_read_contention", lambda: pump.velocity),
+             ("pump_write_contention", lambda: pump.write_slew(1000)),
+             ("pump_read_contention_queued", lambda: pump.velocity),
+             ("pump_write_contention_queued", lambda: pump.write_slew(1000)))
+    for name, action in cases:
+        if name.endswith("_queued"):
+            pump.enable_command_queue()
+        latencies = [[] for _ in range(threads)]
+        barrier = Barrier(threads + 1)
+
+        def worker(index):
+            barrier.wait()
+            for _ in range(iterations):
+                t0 = time.perf_counter()
+                action()
+                latencies[index].append(time.perf_counter() - t0)
+
+        workers = [Thread(target=worker, args=(index,)) for index in range(threads)]
+        for thread in workers:
+            thread.start()
+        barrier.wait()
+        start = time.perf_counter()
+        for thread in workers:
+            thread.join()
+        result = summarize([lat for per_thread in latencies for lat in per_thread], time.perf_counter() - start)
+        result["threads"] = threads
+        results[name] = result
+    pump.halt()
+    pump.disable_command_queue()
+    pump.client.close()
+    return results
+
+
+def bench_poll_cycles(device_counts, iterations, latency):
+    """
+    Vollständige Abfragezyklen über alle Geräte eines MOD_TCP im dummyMode, einmal
+    sequentiell über snapshot() und einmal gleichzeitig über poll_all().
+    """
+    results = {}
+    for count in device_counts:
+        config = {f"MFC{index}": {"input_type": "mks_modbus", "ip_address": "127.0.0.1"} for index in range(count)}
+        mod = MOD_TCP(config, debug_mode=MOD_TCP.OperationModes.dummyMode, simulation={"latency": latency})
+        devices = list(mod.devices.values())
+
+        def sequential():
+            for device in devices:
+                device.snapshot()
+
+        async def concurrent():
+            latencies = []
+            start = time.perf_counter()
+            for _ in range(iterations):
+                t0 = time.perf_counter()
+                await mod.poll_all()
+                latencies.append(time.perf_counter() - t0)
+            elapsed = time.perf_counter() - start
+            await mod.async_close()
+            return summarize(latencies, elapsed)
+
+        results[f"mod_tcp_poll_sequential_{count}"] = timed(sequential, iterations)
+        results[f"mod_tcp_poll_all_{count}"] = asyncio.run(concurrent())
+        mod.close()
+    return results
+
+
+def bench_easy_pi(steps):
+    controller = easy_PI(None, 0, "extern", 0, ki=0.01, kp=0.1)
+    controller.start(50)
+    controller.input.values[0] = 20
+    start = time.perf_counter()
+    for _ in range(steps):
+        controller.regeln()
+    elapsed = time.perf_counter() - start
+    return {"easy_pi_regeln": {"count": steps, "elapsed_s": elapsed, "steps_per_s": steps / elapsed}}
+
+
+def run(iterations=500, threads=4, device_counts=(1, 10, 100), latency=0.0, pi_steps=100000):
+    """
+    Führt alle Benchmarks aus.
+
+    :return: Dictionary mit Metadaten und Ergebnissen
+    """
+    results = {}
+    rig = SimulatedRig(latency=latency)
+    try:
+        results.update(bench_mfc(rig, iterations))
+        results.update(bench_pump_contention(rig, iterations // threads or 1, threads))
+    finally:
+        rig.stop()
+    results.update(bench_poll_cycles(device_counts, max(1, iterations // 10), latency))
+    results.update(bench_easy_pi(pi_steps))
+    return {
+        "meta": {
+            "timestamp": datetime.now().isoformat(),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "iterations": iterations,
+            "threads": threads,
+            "simulated_latency_s": latency,
+        },
+        "results": results,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks der Modbus-Treiber und Regler")
+    parser.add_argument("--output", default="-", help="JSON-Ausgabedatei (Standard: stdout)")
+    parser.add_argument("--iterations", type=int, default=500, help="Transaktionen pro Einzelbenchmark")
+    parser.add_argument("--threads", type=int, default=4, help="Threads für den Pumpen-Konkurrenztest")
+    parser.add_argument("--devices", default="1,10,100", help="Geräteanzahlen für die Poll-Zyklen")
+    parser.add_argument("--latency", type=float, default=0.0, help="Simulierte Gerätelatenz in Sekunden")
+    parser.add_argument("--pi-steps", type=int, default=100000, help="Regelschritte für easy_PI")
+    args = parser.parse_args(argv)
+
+    # Statusausgaben der Treiber auf stderr, damit stdout reines JSON bleibt
+    with contextlib.redirect_stdout(sys.stderr):
+        report = run(args.iterations, args.threads, [int(n) for n in args.devices.split(",") if n],
+                     args.latency, args.pi_steps)
+    text = json.dumps(report, indent=2)
+    if args.output == "-":
+        print(text)
+    else:
+        with open(args.output, "w") as file:
+            file.write(text + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,21 +1,677 @@
-
 from datetime import datetime
+from threading import Thread, Event, Lock
+from bisect import bisect_right
+import json
+import os
+import queue
+import struct
+import time
+
+try:
+    import numpy as np
+except ImportError:  # NumPy wird nur für die Verlaufsspeicher (ChannelHistory) benötigt
+    np = None
+
+# Keys to exclude from the device information output
+DEVICE_INFO_EXCLUDED_KEYS = ['x', 'y']
+
+
+def format_device_informations(config, timestamp=None):
+    """
+    Formatiert die Geräteinformationen (Konfiguration ohne Positionsangaben) als Textblock.
+
+    :param config: Konfigurationsdictionary (z. B. tfh_obj.config)
+    :param timestamp: Zeitpunkt für die Kopfzeile (Standard: jetzt)
+    :return: Text inklusive Kopfzeile
+    """
+    timestamp = timestamp or datetime.now()
+    # Write the header line with the current timestamp
+    lines = ['### Device Informations at ' + timestamp.strftime("%Y-%m-%d %H:%M:%S.%f") + ':\n']
+    # Loop through each device configuration
+    for control_name, control_rule in config.items():
+        # Create a copy of the configuration and remove the keys to exclude
+        filtered_control_rule = {k: v for k, v in control_rule.items() if k not in DEVICE_INFO_EXCLUDED_KEYS}
+        lines.append(f"{control_name}: {filtered_control_rule}\n")
+    return ''.join(lines)
 
-def write_device_informations(tk_obj, tfh_obj):
-    
-    # Keys to exclude from the output
-    keys_to_exclude = ['x', 'y']
+
+def write_device_informations(tk_obj, tfh_obj, logger=None, journal=None):
+    """
+    Hängt die aktuellen Geräteinformationen an die Messdatei an.
+
+    :param tk_obj: GUI-Objekt mit dem Dateinamen in entries['SaveFile']
+    :param tfh_obj: Objekt mit der Gerätekonfiguration in config
+    :param logger: Optionaler MeasurementLogger; der Schreibvorgang erfolgt dann im Hintergrund
+                   (in dessen ConfigJournal, falls er eines hat)
+    :param journal: Optionales ConfigJournal; statt des vollständigen Textblocks werden dann nur
+                    die Änderungen seit dem letzten Aufruf ins Journal geschrieben
+    """
+    if journal is not None:
+        journal.record(tfh_obj.config)
+        return
+    if logger is not None:
+        logger.log_device_informations(tfh_obj.config)
+        return
 
     # Open the file for writing
     with open(tk_obj.entries['SaveFile'], 'a') as file:
-        # Write the header line with the current timestamp
-        line = '### Device Informations at ' + datetime.now().strftime("%Y-%m-%d %H:%M:%S.%f") + ':\n'
-        file.write(line)
+        file.write(format_device_informations(tfh_obj.config))
+
+
+class MeasurementLogger:
+    """
+    Nicht blockierender Logger für die Messdatei.
+
+    Aufrufer legen Messzeilen und Geräteinformationen nur in eine begrenzte Queue; ein
+    Hintergrund-Thread formatiert sie, schreibt sie gebündelt und leert den Dateipuffer
+    nach der eingestellten Flush-/fsync-Strategie. Ist die Queue voll, werden Einträge
+    verworfen und in dropped gezählt, statt den Aufrufer zu blockieren.
+    """
+
+    def __init__(self, path, max_queue=10000, batch_size=500, flush_interval=1.0, fsync=False, separator='\t',
+                 journal=None):
+        """
+        :param path: Pfad der Messdatei (wird angehängt)
+        :param max_queue: Maximale Anzahl wartender Einträge
+        :param batch_size: Maximale Anzahl Einträge pro Schreibvorgang
+        :param flush_interval: Maximaler Abstand zwischen zwei Flushes in Sekunden
+        :param fsync: Nach jedem Flush zusätzlich os.fsync ausführen
+        :param separator: Trennzeichen zwischen den Spalten einer Messzeile
+        :param journal: Optionales ConfigJournal (oder Pfad dafür), in das die Geräteinformationen
+                        statt als Textblock in die Messdatei geschrieben werden
+        """
+        if isinstance(journal, str):
+            journal = ConfigJournal(journal)
+        self.journal = journal
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.fsync = fsync
+        self.separator = separator
+        self.dropped = 0
+        self.written = 0
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._thread = Thread(target=self._run, name='MeasurementLogger', daemon=True)
+        self._thread.start()
+
+    def _put(self, item):
+        try:
+            self._queue.put_nowait(item)
+            return True
+        except queue.Full:
+            self.dropped += 1
+            return False
+
+    def log_row(self, values, timestamp=None):
+        """
+        Legt eine Messzeile (Zeitstempel plus Werte) in die Queue.
+
+        :param values: Iterable der Messwerte
+        :param timestamp: datetime der Messung (Standard: jetzt)
+        :return: False, falls die Zeile wegen voller Queue verworfen wurde
+        """
+        return self._put(('row', timestamp or datetime.now(), tuple(values)))
+
+    def log_text(self, text):
+        """
+        Legt einen bereits formatierten Textblock in die Queue.
+        """
+        return self._put(('text', None, text))
+
+    def log_device_informations(self, config):
+        """
+        Legt die Geräteinformationen in die Queue. Die Konfiguration wird sofort kopiert,
+        damit spätere Änderungen den Eintrag nicht verfälschen.
+        """
+        snapshot = {name: dict(rule) for name, rule in config.items()}
+        return self._put(('config' if self.journal is None else 'journal', datetime.now(), snapshot))
+
+    def flush(self, timeout=5.0):
+        """
+        Wartet, bis alle bisher eingereihten Einträge geschrieben und geflusht sind.
+
+        :return: True, falls das innerhalb des Timeouts geschehen ist
+        """
+        done = Event()
+        try:
+            self._queue.put(('flush', None, done), timeout=timeout)
+        except queue.Full:
+            return False
+        return done.wait(timeout)
+
+    def close(self, timeout=5.0):
+        """
+        Schreibt alle ausstehenden Einträge und beendet den Hintergrund-Thread.
+        """
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join(timeout)
+        if self.journal is not None:
+            self.journal.close()
+
+    def _format(self, kind, timestamp, payload):
+        if kind == 'row':
+            stamp = timestamp.strftime("%Y-%m-%d %H:%M:%S.%f")
+            return stamp + self.separator + self.separator.join(map(str, payload)) + '\n'
+        if kind == 'config':
+            return format_device_informations(payload, timestamp)
+        return payload
+
+    def _run(self):
+        with open(self.path, 'a') as file:
+            last_flush = time.monotonic()
+            running = True
+            while running:
+                try:
+                    items = [self._queue.get(timeout=self.flush_interval)]
+                except queue.Empty:
+                    items = []
+                while items and len(items) < self.batch_size:
+                    try:
+                        items.append(self._queue.get_nowait())
+                    except queue.Empty:
+                        break
+
+                chunks = []
+                flush_events = []
+                for item in items:
+                    if item is None:
+                        running = False
+                    elif item[0] == 'flush':
+                        flush_events.append(item[2])
+                    elif item[0] == 'journal':
+                        self.journal.record(item[2], item[1])
+                    else:
+                        chunks.append(self._format(*item))
+                if chunks:
+                    file.write(''.join(chunks))
+                    self.written += len(chunks)
+
+                now = time.monotonic()
+                if flush_events or not running or now - last_flush >= self.flush_interval:
+                    file.flush()
+                    if self.fsync:
+                        os.fsync(file.fileno())
+                    if self.journal is not None:
+                        self.journal.flush()
+                    last_flush = now
+                for event in flush_events:
+                    event.set()
+
+
+_journal_index = struct.Struct("<dQQ")   # Zeitstempel (Epoche), Offset des Eintrags, Offset seines Schnappschusses
+
+
+def _epoch(timestamp):
+    if timestamp is None:
+        return time.time()
+    if isinstance(timestamp, datetime):
+        return timestamp.timestamp()
+    return float(timestamp)
+
+
+class ConfigJournal:
+    """
+    Journal der Gerätekonfiguration als JSON Lines mit Zeitindex.
+
+    Die erste Zeile enthält einen vollständigen Schnappschuss, jede weitere nur die Änderungen
+    pro Gerät seit dem vorigen Eintrag:
+        {"t": 1760000000.0, "time": "...", "snapshot": {Gerät: {Schlüssel: Wert}}}
+        {"t": 1760000060.0, "time": "...", "devices": {Gerät: {"set": {...}, "unset": [...]}, Gerät: null}}
+    (null: Gerät entfernt). Nach keyframe_interval Änderungen folgt wieder ein Schnappschuss.
+
+    Die Indexdatei (path + ".idx") enthält pro Eintrag Zeitstempel, Byte-Offset und den Offset
+    des zugehörigen Schnappschusses. Die zu einem Zeitpunkt gültige Konfiguration wird so mit einer
+    binären Suche im Index, einem Seek und höchstens keyframe_interval Zeilen rekonstruiert.
+    """
+
+    def __init__(self, path, keyframe_interval=100, excluded_keys=DEVICE_INFO_EXCLUDED_KEYS):
+        """
+        :param path: Pfad der Journaldatei (wird fortgesetzt, falls sie existiert)
+        :param keyframe_interval: Anzahl Änderungseinträge zwischen zwei Schnappschüssen
+        :param excluded_keys: Schlüssel, die nicht ins Journal übernommen werden (Positionsangaben)
+        """
+        self.path = path
+        self.index_path = path + ".idx"
+        self.keyframe_interval = keyframe_interval
+        self.excluded_keys = set(excluded_keys)
+        self._lock = Lock()
+        self._file = self._index_file = None
+        self._index = self._load_index()
+        self._state = None
+        self._since_keyframe = 0
+        if self._index:
+            self._state = self.config_at(self._index[-1][0])
+            keyframe = self._index[-1][2]
+            self._since_keyframe = sum(1 for entry in self._index if entry[2] == keyframe) - 1
+        self._file = open(path, "ab")
+        self._index_file = open(self.index_path, "ab")
+
+    def _load_index(self):
+        try:
+            with open(self.index_path, "rb") as file:
+                data = file.read()
+        except FileNotFoundError:
+            return []
+        # Ein unvollständig geschriebener letzter Indexeintrag wird ignoriert
+        usable = len(data) - len(data) % _journal_index.size
+        return list(_journal_index.iter_unpack(data[:usable]))
+
+    def _normalize(self, config):
+        # JSON-Rundreise, damit Vergleiche mit dem gelesenen Journal übereinstimmen (Tupel -> Listen usw.)
+        filtered = {name: {k: v for k, v in rule.items() if k not in self.excluded_keys}
+                    for name, rule in config.items()}
+        return json.loads(json.dumps(filtered, default=repr))
+
+    def record(self, config, timestamp=None):
+        """
+        Schreibt die Änderungen gegenüber dem letzten Eintrag (beim ersten Aufruf einen Schnappschuss).
+
+        :param config: Konfigurationsdictionary (z. B. tfh_obj.config)
+        :param timestamp: Zeitpunkt als datetime oder Sekunden seit der Epoche (Standard: jetzt)
+        :return: False, falls sich nichts geändert hat und kein Eintrag geschrieben wurde
+        """
+        state = self._normalize(config)
+        t = _epoch(timestamp)
+        with self._lock:
+            if self._file is None:
+                return False
+            if self._state is None or self._since_keyframe >= self.keyframe_interval:
+                entry = {"snapshot": state}
+            else:
+                changes = {}
+                for name, rule in state.items():
+                    old = self._state.get(name)
+                    if old == rule:
+                        continue
+                    old = old or {}
+                    change = {}
+                    changed = {k: v for k, v in rule.items() if k not in old or old[k] != v}
+                    removed = [k for k in old if k not in rule]
+                    if changed:
+                        change["set"] = changed
+                    if removed:
+                        change["unset"] = removed
+                    changes[name] = change
+                for name in self._state:
+                    if name not in state:
+                        changes[name] = None
+                if not changes:
+                    return False
+                entry = {"devices": changes}
+            line = json.dumps(dict({"t": t, "time": datetime.fromtimestamp(t).isoformat(sep=" ")}, **entry),
+                              default=repr)
+            offset = self._file.tell()
+            keyframe = offset if "snapshot" in entry else self._index[-1][2]
+            self._file.write(line.encode("utf-8") + b"\n")
+            self._index_file.write(_journal_index.pack(t, offset, keyframe))
+            self._index.append((t, offset, keyframe))
+            self._since_keyframe = 0 if "snapshot" in entry else self._since_keyframe + 1
+            self._state = state
+            return True
+
+    def config_at(self, timestamp):
+        """
+        Rekonstruiert die zum Zeitpunkt gültige Konfiguration.
+
+        :param timestamp: datetime oder Sekunden seit der Epoche
+        :return: Konfigurationsdictionary oder None, falls das Journal zu diesem Zeitpunkt noch leer war
+        """
+        with self._lock:
+            index = list(self._index)
+            if self._file is not None:
+                self._file.flush()
+        return _config_at(self.path, index, _epoch(timestamp))
+
+    def times(self):
+        """
+        :return: Liste der Zeitstempel aller Einträge (Sekunden seit der Epoche)
+        """
+        return [entry[0] for entry in self._index]
+
+    def flush(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.flush()
+                self._index_file.flush()
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._index_file.close()
+                self._file = self._index_file = None
+
+
+def _config_at(path, index, t):
+    position = bisect_right([entry[0] for entry in index], t) - 1
+    if position < 0:
+        return None
+    _, target, keyframe = index[position]
+    config = None
+    with open(path, "rb") as file:
+        file.seek(keyframe)
+        while True:
+            offset = file.tell()
+            entry = json.loads(file.readline())
+            if "snapshot" in entry:
+                config = entry["snapshot"]
+            else:
+                for name, change in entry["devices"].items():
+                    if change is None:
+                        config.pop(name, None)
+                        continue
+                    rule = config.setdefault(name, {})
+                    rule.update(change.get("set", {}))
+                    for key in change.get("unset", ()):
+                        rule.pop(key, None)
+            if offset >= target:
+                return config
+
+
+def read_config_journal(path, timestamp):
+    """
+    Rekonstruiert die zu einem Zeitpunkt gültige Konfiguration aus einem Journal, ohne es zum
+    Schreiben zu öffnen (z. B. bei der Auswertung einer Messdatei).
+
+    :param path: Pfad der Journaldatei
+    :param timestamp: datetime oder Sekunden seit der Epoche
+    :return: Konfigurationsdictionary oder None
+    """
+    with open(path + ".idx", "rb") as file:
+        data = file.read()
+    index = list(_journal_index.iter_unpack(data[:len(data) - len(data) % _journal_index.size]))
+    return _config_at(path, index, _epoch(timestamp))
+
+
+class _Ring:
+    """
+    Vorallokierter Ringpuffer für Zeitstempel und beliebig viele Wertspalten.
+    """
+
+    def __init__(self, capacity, columns):
+        self.capacity = capacity
+        self.time = np.empty(capacity)
+        self.columns = {name: np.empty(capacity) for name in columns}
+        self.count = 0  # Anzahl jemals geschriebener Einträge
+
+    def __len__(self):
+        return min(self.count, self.capacity)
+
+    def append(self, timestamp, **values):
+        position = self.count % self.capacity
+        self.time[position] = timestamp
+        for name, value in values.items():
+            self.columns[name][position] = value
+        self.count += 1
+
+    @property
+    def oldest(self):
+        if not self.count:
+            return None
+        return self.time[self.count % self.capacity if self.count > self.capacity else 0]
+
+    def _segments(self):
+        # Chronologische Reihenfolge als (Start, Ende) in den Arrays; höchstens zwei Abschnitte
+        if self.count <= self.capacity:
+            return [(0, self.count)]
+        head = self.count % self.capacity
+        return [(head, self.capacity), (0, head)]
+
+    def window(self, start, end):
+        """
+        :return: Logische Indizes [first, last) der Einträge mit start <= Zeit <= end
+        """
+        first = last = 0
+        for begin, stop in self._segments():
+            times = self.time[begin:stop]
+            first += int(np.searchsorted(times, start, side="left"))
+            last += int(np.searchsorted(times, end, side="right"))
+        return first, last
+
+    def take(self, first, last, column):
+        """
+        :return: Kopie der logischen Einträge [first, last) einer Spalte (oder der Zeitstempel)
+        """
+        data = self.time if column is None else self.columns[column]
+        if self.count <= self.capacity:
+            return data[first:last].copy()
+        head = self.count % self.capacity
+        indices = (np.arange(first, last) + head) % self.capacity
+        return data[indices]
+
+
+class ChannelHistory:
+    """
+    Verlauf eines Kanals in vorallokierten NumPy-Ringpuffern mit mehreren Auflösungsstufen.
+
+    Stufe 0 enthält die Rohwerte. Jede weitere Stufe fasst factor Einträge der vorherigen zu
+    einem Eintrag mit Minimum, Maximum und Mittelwert zusammen. Der Speicherbedarf ist durch
+    capacity und levels festgelegt, unabhängig von der Laufzeit; die gröbste Stufe reicht
+    capacity * factor ** (levels - 1) Rohwerte zurück.
+    """
+
+    def __init__(self, capacity=10000, levels=4, factor=10):
+        """
+        :param capacity: Einträge pro Stufe
+        :param levels: Anzahl der Stufen (inklusive der Rohwerte)
+        :param factor: Anzahl der Einträge, die zu einem Eintrag der nächsten Stufe zusammengefasst werden
+        """
+        if np is None:
+            raise ImportError("ChannelHistory benötigt NumPy")
+        self.capacity = capacity
+        self.factor = factor
+        self.levels = [_Ring(capacity, ("value",))]
+        self.levels += [_Ring(capacity, ("min", "max", "mean")) for _ in range(levels - 1)]
+        # Laufende Zusammenfassung pro Stufe >= 1: [Startzeit, Anzahl, Minimum, Maximum, Summe der Mittelwerte]
+        self._pending = [None] * levels
+        self._lock = Lock()
+
+    @property
+    def nbytes(self):
+        """
+        Belegter Speicher der Ringpuffer in Bytes.
+        """
+        return sum(ring.time.nbytes + sum(column.nbytes for column in ring.columns.values())
+                   for ring in self.levels)
+
+    def append(self, value, timestamp=None):
+        """
+        Hängt einen Rohwert an. None wird übergangen.
+
+        :param value: Messwert
+        :param timestamp: Zeitpunkt in Sekunden seit der Epoche (Standard: jetzt)
+        """
+        if value is None:
+            return
+        timestamp = time.time() if timestamp is None else timestamp
+        value = float(value)
+        with self._lock:
+            self.levels[0].append(timestamp, value=value)
+            self._aggregate(1, timestamp, value, value, value)
+
+    def _aggregate(self, level, timestamp, low, high, mean):
+        while level < len(self.levels):
+            pending = self._pending[level]
+            if pending is None:
+                pending = self._pending[level] = [timestamp, 0, low, high, 0.0]
+            pending[1] += 1
+            pending[2] = min(pending[2], low)
+            pending[3] = max(pending[3], high)
+            pending[4] += mean
+            if pending[1] < self.factor:
+                return
+            self._pending[level] = None
+            timestamp, low, high, mean = pending[0], pending[2], pending[3], pending[4] / pending[1]
+            self.levels[level].append(timestamp, min=low, max=high, mean=mean)
+            level += 1
+
+    def query(self, start, end, points):
+        """
+        Liefert den Verlauf im Zeitfenster [start, end] mit höchstens points Punkten.
+
+        Verwendet wird die feinste Stufe, die das Fenster abdeckt und höchstens points Einträge
+        darin hat; liegen auch in der gröbsten Stufe mehr Einträge im Fenster, werden diese
+        nochmals gruppenweise zusammengefasst. Bei den gröberen Stufen wird der noch nicht
+        abgeschlossene jüngste Abschnitt als letzter Punkt angehängt, damit der Verlauf bis zum
+        neuesten Rohwert reicht.
+
+        :param start: Beginn des Fensters (Sekunden seit der Epoche)
+        :param end: Ende des Fensters
+        :param points: Maximale Anzahl Punkte (z. B. Breite des Plots in Pixeln)
+        :return: Dictionary mit NumPy-Arrays "time", "min", "max" und "mean"
+        """
+        with self._lock:
+            chosen = None
+            for index, ring in enumerate(self.levels):
+                if not len(ring):
+                    break
+                first, last = ring.window(start, end)
+                chosen = (index, first, last)
+                covers = ring.count <= ring.capacity or ring.oldest <= start
+                if last - first <= points and covers:
+                    break
+            if chosen is None:
+                empty = np.empty(0)
+                return {"time": empty, "min": empty, "max": empty, "mean": empty}
+            index, first, last = chosen
+            ring = self.levels[index]
+            times = ring.take(first, last, None)
+            if index == 0:
+                values = ring.take(first, last, "value")
+                low = high = mean = values
+            else:
+                low = ring.take(first, last, "min")
+                high = ring.take(first, last, "max")
+                mean = ring.take(first, last, "mean")
+                partial = self._partial(index)
+                if partial is not None and start <= partial[0] <= end:
+                    times = np.append(times, partial[0])
+                    low = np.append(low, partial[1])
+                    high = np.append(high, partial[2])
+                    mean = np.append(mean, partial[3])
+        if len(times) > points > 0:
+            starts = np.arange(0, len(times), -(-len(times) // points))
+            counts = np.diff(np.append(starts, len(times)))
+            times = times[starts]
+            low = np.minimum.reduceat(low, starts)
+            high = np.maximum.reduceat(high, starts)
+            mean = np.add.reduceat(mean, starts) / counts
+        return {"time": times, "min": low, "max": high, "mean": mean}
+
+    def _partial(self, level):
+        """
+        Fasst die laufenden Zusammenfassungen der Stufen 1 bis level zusammen, also alle Rohwerte,
+        die noch in keinem Eintrag der Stufe level enthalten sind.
+
+        :return: Tupel (Startzeit, Minimum, Maximum, Mittelwert) oder None
+        """
+        timestamp, low, high, total, weight = None, np.inf, -np.inf, 0.0, 0
+        for index in range(1, level + 1):
+            pending = self._pending[index]
+            if pending is None:
+                continue
+            # Ein Eintrag der Stufe index - 1 steht für factor ** (index - 1) Rohwerte
+            scale = self.factor ** (index - 1)
+            timestamp = pending[0] if timestamp is None else min(timestamp, pending[0])
+            low, high = min(low, pending[2]), max(high, pending[3])
+            total += pending[4] * scale
+            weight += pending[1] * scale
+        if timestamp is None:
+            return None
+        return timestamp, low, high, total / weight
+
+    def latest(self):
+        """
+        :return: Tupel (Zeitstempel, Wert) des neuesten Rohwerts oder None
+        """
+        with self._lock:
+            ring = self.levels[0]
+            if not ring.count:
+                return None
+            position = (ring.count - 1) % ring.capacity
+            return ring.time[position], ring.columns["value"][position]
+
+
+class HistoryStore:
+    """
+    Verlaufsspeicher für viele Kanäle (z. B. "MFC1.flow", "P1.position", "Heizung.out").
+    Kanäle werden beim ersten Wert mit den Parametern des Speichers angelegt.
+    """
+
+    def __init__(self, capacity=10000, levels=4, factor=10):
+        """
+        :param capacity: Einträge pro Stufe und Kanal
+        :param levels: Anzahl der Auflösungsstufen
+        :param factor: Verdichtungsfaktor zwischen zwei Stufen
+        """
+        self.capacity = capacity
+        self.levels = levels
+        self.factor = factor
+        self.channels = {}
+        self._lock = Lock()
+
+    def channel(self, name):
+        """
+        :return: ChannelHistory des Kanals (wird bei Bedarf angelegt)
+        """
+        history = self.channels.get(name)
+        if history is None:
+            with self._lock:
+                history = self.channels.get(name)
+                if history is None:
+                    history = self.channels[name] = ChannelHistory(self.capacity, self.levels, self.factor)
+        return history
+
+    def record(self, name, value, timestamp=None):
+        """
+        Hängt einen Wert an den Verlauf eines Kanals an.
+        """
+        self.channel(name).append(value, timestamp)
+
+    def record_values(self, prefix, values, timestamp=None):
+        """
+        Hängt mehrere Werte eines Geräts an (Kanäle "prefix.name").
+
+        :param values: Dictionary Name -> Wert (z. B. snapshot().values)
+        """
+        timestamp = time.time() if timestamp is None else timestamp
+        for name, value in values.items():
+            self.channel(f"{prefix}.{name}").append(value, timestamp)
+
+    def query(self, name, start, end, points):
+        """
+        Siehe ChannelHistory.query; für unbekannte Kanäle leere Arrays.
+        """
+        history = self.channels.get(name)
+        if history is None:
+            empty = np.empty(0)
+            return {"time": empty, "min": empty, "max": empty, "mean": empty}
+        return history.query(start, end, points)
+
+    @property
+    def nbytes(self):
+        return sum(history.nbytes for history in list(self.channels.values()))
+
+    def sink(self, names):
+        """
+        Liefert eine Senke für DevicePoller.add_sink, die die gepollten Werte aufzeichnet.
+
+        :param names: Dictionary id(Gerät) -> Gerätename
+        """
+        def record(device, values):
+            name = names.get(id(device))
+            if name is not None:
+                self.record_values(name, values)
+        return record
 
-        # Loop through each device configuration
-        for control_name, control_rule in tfh_obj.config.items():
-            # Create a copy of the configuration and remove the keys to exclude
-            filtered_control_rule = {k: v for k, v in control_rule.items() if k not in keys_to_exclude}
+    def controller_sink(self, name, attribute="out"):
+        """
+        Liefert einen Callback für ControlScheduler.add(on_step=...), der die Stellgröße
+        eines Reglers als Kanal "name.out" aufzeichnet.
+        """
+        channel = f"{name}.{attribute}"
 
-            # Write the filtered configuration to the file
-            file.write(f"{control_name}: {filtered_control_rule}\n")
\ No newline at end of file
+        def record(controller):
+            self.record(channel, getattr(controller, attribute))
+        return record
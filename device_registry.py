@@ -0,0 +1,156 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Register der Gerätetreiber.
+
+Ordnet die Typbezeichnungen aus input_type/output_type der Konfiguration (z. B. "mks_modbus")
+Treiberklassen zu. Treiber werden als Verweis "modul:Attribut" eingetragen und erst importiert,
+wenn eine Konfiguration sie tatsächlich verwendet.
+
+Treiber anderer Pakete melden sich über Entry Points der Gruppe ENTRY_POINT_GROUP an, z. B. in
+deren pyproject.toml:
+
+    [project.entry-points."chemtherm.drivers"]
+    vici_modbus = "vici_driver.valve:Modbus_Valve"
+
+Der Name des Entry Points ist die Typbezeichnung. Weil das Durchsuchen der installierten Pakete
+Zeit kostet, werden die Entry Points erst gelesen, wenn ein Konfigurationseintrag einen
+Modbus-Typ nennt, den kein bereits registrierter Treiber kennt (oder bei load_entry_points()).
+Die Treiberklassen müssen den Konstruktor der eingebauten Treiber unterstützen:
+Treiber(ip_address, port) bzw. Treiber(ip_address, client=client).
+"""
+from collections import namedtuple
+from threading import Lock
+import importlib
+
+ENTRY_POINT_GROUP = "chemtherm.drivers"
+
+DriverSpec = namedtuple("DriverSpec", ["key", "target", "label", "fields", "lazy"])
+DriverSpec.__doc__ = """
+Eintrag im Treiberregister:
+    key: Typbezeichnung, die in einem der Konfigurationsfelder fields vorkommen muss
+    target: Treiberklasse oder Verweis "modul:Attribut" (mit führendem Punkt relativ zu diesem Paket)
+    label: Bezeichnung für Statusmeldungen und Startbericht
+    fields: Konfigurationsfelder, in denen key gesucht wird
+    lazy: Der Treiber unterstützt den Parameter lazy (verzögerte Initialisierung)
+"""
+
+_drivers = {}      # Typbezeichnung -> DriverSpec, in Registrierungsreihenfolge
+_classes = {}      # Typbezeichnung -> geladene Treiberklasse
+_lock = Lock()
+_entry_points_loaded = False
+
+
+def register_driver(key, target, label=None, fields=("input_type", "output_type"), lazy=False):
+    """
+    Registriert einen Treiber (ersetzt einen bestehenden Eintrag mit gleicher Typbezeichnung).
+    Bei der Zuordnung gewinnt unter mehreren passenden Treibern der zuletzt registrierte.
+
+    :param key: Typbezeichnung in input_type/output_type (Kleinschreibung)
+    :param target: Treiberklasse oder Verweis "modul:Attribut"
+    :param label: Bezeichnung für Statusmeldungen (Standard: key)
+    :param fields: Konfigurationsfelder, in denen key gesucht wird
+    :param lazy: Der Treiber unterstützt verzögerte Initialisierung (Parameter lazy)
+    """
+    with _lock:
+        _drivers.pop(key, None)
+        _drivers[key] = DriverSpec(key, target, label or key, tuple(fields), lazy)
+        _classes.pop(key, None)
+
+
+def registered_drivers():
+    """
+    :return: Liste der registrierten Typbezeichnungen
+    """
+    return list(_drivers)
+
+
+def driver_spec(key):
+    """
+    :return: DriverSpec der Typbezeichnung key
+    """
+    return _drivers[key]
+
+
+def _match(value):
+    with _lock:
+        specs = list(_drivers.values())
+    for spec in reversed(specs):
+        for field in spec.fields:
+            text = value.get(field)
+            if isinstance(text, str) and spec.key in text.lower():
+                return spec.key
+    return None
+
+
+def driver_key(value, load=True):
+    """
+    Ermittelt den Treiber eines Konfigurationseintrags.
+
+    :param value: Konfigurationseintrag eines Geräts
+    :param load: Entry Points lesen, falls ein unbekannter Modbus-Typ genannt wird
+    :return: Typbezeichnung oder None
+    """
+    if not isinstance(value, dict):
+        return None
+    key = _match(value)
+    if key is None and load and not _entry_points_loaded and any(
+            isinstance(value.get(field), str) and "modbus" in value[field].lower()
+            for field in ("input_type", "output_type")):
+        load_entry_points()
+        key = _match(value)
+    return key
+
+
+def driver_class(key):
+    """
+    Liefert die Treiberklasse und importiert dazu beim ersten Aufruf ihr Modul.
+
+    :param key: Typbezeichnung
+    """
+    driver = _classes.get(key)
+    if driver is not None:
+        return driver
+    target = _drivers[key].target
+    if isinstance(target, str):
+        module_name, _, attribute = target.partition(":")
+        if module_name.startswith("."):
+            if __package__:
+                module = importlib.import_module(module_name, __package__)
+            else:
+                module = importlib.import_module(module_name[1:])
+        else:
+            module = importlib.import_module(module_name)
+        driver = getattr(module, attribute)
+    else:
+        driver = target
+    _classes[key] = driver
+    return driver
+
+
+def load_entry_points():
+    """
+    Registriert die Treiber aus den Entry Points der Gruppe ENTRY_POINT_GROUP (ohne sie zu importieren).
+    Eingebaute Treiber werden dabei nicht überschrieben.
+    """
+    global _entry_points_loaded
+    if _entry_points_loaded:
+        return
+    _entry_points_loaded = True
+    from importlib.metadata import entry_points
+    try:
+        found = entry_points(group=ENTRY_POINT_GROUP)
+    except Exception as e:
+        print(f"Fehler beim Lesen der Treiber-Entry-Points: {e}")
+        return
+    for entry_point in found:
+        if entry_point.name in _drivers:
+            print(f"Treiber {entry_point.name} aus {entry_point.value} ist bereits registriert und wird übergangen")
+            continue
+        register_driver(entry_point.name, entry_point.value)
+
+
+# Eingebaute Treiber; die Reihenfolge entspricht der früheren if-Kette in MOD_TCP.setup_devices.
+register_driver("mks_modbus", ".modbus_functions:Modbus_MFC_MKS", "Modbus MFC")
+register_driver("modbus_pump", ".modbus_functions:Modbus_Pump", "Modbus Pump", fields=("output_type",), lazy=True)
+register_driver("coupon_modbus", ".modbus_functions:Modbus_Coupon", "coupon_modbus", fields=("output_type",))
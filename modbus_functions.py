@@ -1,55 +1,1392 @@
-from threading import Lock
-from pyModbusTCP.client import ModbusClient
+from threading import Lock, RLock, Thread, Event, Condition, current_thread
+from functools import partial
 from datetime import datetime as dt, timedelta
+import importlib
 import json
+import os
+import time
 import struct
-import inspect
-import itertools
-import logging
+import sys
+from array import array
 from enum import IntEnum
+from collections import namedtuple
 
 
 SERVER_PORT = 502
 
 
+def _sibling(name):
+    """
+    Importiert ein Nachbarmodul dieses Pakets (funktioniert auch, wenn die Datei direkt als Skript läuft).
+    """
+    if __package__:
+        return importlib.import_module(f"{__package__}.{name}")
+    return importlib.import_module(name)
+
+
+device_registry = _sibling("device_registry")
+
+# Namen, die erst beim ersten Zugriff aus ihrem Modul geladen werden (pyModbusTCP wird so nur
+# importiert, wenn tatsächlich ein Gerät angesprochen wird).
+_LAZY_NAMES = {
+    "ResilientClient": "modbus_resilience",
+    "CircuitState": "modbus_resilience",
+}
+
+
+def __getattr__(name):
+    module = _LAZY_NAMES.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    return getattr(_sibling(module), name)
+
+
+def _modbus_client(host, port, timeout):
+    """
+    Erzeugt einen pyModbusTCP-ModbusClient mit automatischem Verbindungsaufbau.
+    """
+    from pyModbusTCP.client import ModbusClient
+    return ModbusClient(host=host, port=port, auto_open=True, timeout=timeout)
+
+
+def contains_modbus(item):
+    """
+    Rekursive Hilfsfunktion, die prüft, ob im übergebenen Objekt (String, Liste, Dict)
+    der Substring "modbus" (oder "mobus") enthalten ist.
+    """
+    if isinstance(item, str):
+        return "modbus" in item.lower() or "mobus" in item.lower()
+    elif isinstance(item, dict):
+        return any(contains_modbus(value) for value in item.values())
+    elif isinstance(item, list):
+        return any(contains_modbus(elem) for elem in item)
+    else:
+        return False
+
+
+def driver_type(value):
+    """
+    Ermittelt den Modbus-Treibertyp eines Konfigurationseintrags (siehe device_registry).
+
+    :return: Typbezeichnung (z. B. "mks_modbus", "modbus_pump", "coupon_modbus") oder None
+    """
+    return device_registry.driver_key(value)
+
+
+class DeviceIndex:
+    """
+    Index der Modbus-Geräte einer Konfiguration für Nachschlagen in O(1).
+    """
+
+    def __init__(self, config):
+        self.driver_of = {}  # Gerätename -> Treibertyp
+        self.by_driver = {}  # Treibertyp -> {Gerätename: Konfiguration}
+        self.by_ip = {}      # IP-Adresse -> [Gerätenamen]
+        self.by_unit = {}    # (IP-Adresse, Port, Unit-ID) -> Gerätename
+        for device_key, value in config.items():
+            driver = driver_type(value)
+            if driver is None:
+                continue
+            self.driver_of[device_key] = driver
+            self.by_driver.setdefault(driver, {})[device_key] = value
+            ip = value.get("ip_address")
+            if ip is not None:
+                self.by_ip.setdefault(ip, []).append(device_key)
+                self.by_unit[(ip, value.get("port", SERVER_PORT), value.get("unit_id", 1))] = device_key
+
+    def devices(self, driver):
+        """
+        :return: Dictionary Gerätename -> Konfiguration aller Geräte des Treibertyps
+        """
+        return self.by_driver.get(driver, {})
+
+
+_config_cache = {}  # Pfad -> (mtime, gefilterte Konfiguration, DeviceIndex)
+_config_lock = Lock()
+
+
+def load_config(config_name):
+    """
+    Lädt die gefilterte Konfiguration samt Geräteindex. Das Ergebnis wird pro Datei
+    zwischengespeichert und nur neu eingelesen, wenn sich der Änderungszeitpunkt der Datei ändert.
+
+    :param config_name: Name der JSON-Datei (ohne Endung) oder False, um das config-Modul zu verwenden.
+    :return: Tupel (gefilterte Konfiguration, DeviceIndex); die Konfiguration wird mit anderen
+             Aufrufern geteilt und darf nicht verändert werden. Bei Fehler (None, None).
+    """
+    try:
+        module = None
+        if config_name:
+            path = os.path.abspath(f'./json_files/{config_name}.json')
+        else:
+            import config as module
+            path = module.__file__
+        mtime = os.stat(path).st_mtime_ns
+
+        with _config_lock:
+            cached = _config_cache.get(path)
+            if cached is not None and cached[0] == mtime:
+                return cached[1], cached[2]
+
+            if module is None:
+                with open(path, 'r') as config_file:
+                    config_data = json.load(config_file)
+            else:
+                if cached is not None:
+                    module = importlib.reload(module)
+                config_data = module.config  # Hier wird cfg.config verwendet
+
+            # Filtere nur die Einträge, bei denen der Substring "Modbus" (oder "Mobus") vorkommt
+            # oder die einen registrierten Treiber verwenden
+            filtered_config = {k: v for k, v in config_data.items()
+                               if contains_modbus(v) or device_registry.driver_key(v, load=False)}
+            index = DeviceIndex(filtered_config)
+            _config_cache[path] = (mtime, filtered_config, index)
+            return filtered_config, index
+
+    except (FileNotFoundError, json.JSONDecodeError) as e:
+        print(f"Error loading config: {e}")
+        return None, None
+
+
 def get_config(config_name):
     """
     Lädt die Konfiguration entweder aus einer JSON-Datei oder aus dem config-Modul
     und filtert dabei alle Einträge heraus, die den String "Modbus" (oder "Mobus") enthalten.
     Es werden nur diese Einträge zurückgegeben.
+    Das Einlesen erfolgt über den Cache von load_config.
     
     :param config_name: Name der JSON-Datei (ohne Endung) oder False, um das config-Modul zu verwenden.
     :return: Gefiltertes Konfigurationsdictionary oder None bei Fehler.
     """
-    def contains_modbus(item):
+    filtered_config, _ = load_config(config_name)
+    return None if filtered_config is None else dict(filtered_config)
+
+
+class RegisterCodec:
+    """
+    Vorkompilierte Kodierung eines Werttyps in 16-Bit Register.
+
+    Die Byte-Reihenfolge innerhalb eines Registers ist durch Modbus festgelegt (Big-Endian)
+    und bereits im Registerwert aufgelöst; die Wortreihenfolge mehrregistriger Werte wird
+    explizit angegeben: "big" (High-Word zuerst, z. B. MKS-MFC) oder "little" (Low-Word zuerst,
+    z. B. Pumpe). Eine Instanz ist direkt als Decodierfunktion aufrufbar.
+    """
+    __slots__ = ("fmt", "word_order", "prefix", "count", "_value", "_words")
+
+    def __init__(self, fmt, word_order="big"):
+        """
+        :param fmt: struct-Formatzeichen des Werts (z. B. "H", "h", "i", "I", "f")
+        :param word_order: "big" oder "little"
+        """
+        self.fmt = fmt
+        self.word_order = word_order
+        # Mit der Wortreihenfolge als Byte-Reihenfolge ergeben die Register als Bytes genau den Wert.
+        self.prefix = ">" if word_order == "big" else "<"
+        self._value = struct.Struct(self.prefix + fmt)
+        self.count = self._value.size // 2
+        self._words = struct.Struct(f"{self.prefix}{self.count}H")
+
+    def decode(self, regs):
         """
-        Rekursive Hilfsfunktion, die prüft, ob im übergebenen Objekt (String, Liste, Dict)
-        der Substring "modbus" (oder "mobus") enthalten ist.
+        Wandelt die Registerliste in den Wert um.
         """
-        if isinstance(item, str):
-            return "modbus" in item.lower() or "mobus" in item.lower()
-        elif isinstance(item, dict):
-            return any(contains_modbus(value) for value in item.values())
-        elif isinstance(item, list):
-            return any(contains_modbus(elem) for elem in item)
+        return self._value.unpack(self._words.pack(*regs))[0]
+
+    __call__ = decode
+
+    def encode(self, value):
+        """
+        Wandelt den Wert in eine Registerliste um.
+        """
+        return list(self._words.unpack(self._value.pack(value)))
+
+    def __repr__(self):
+        return f"RegisterCodec({self.fmt!r}, {self.word_order!r})"
+
+
+UINT16 = RegisterCodec("H")
+INT16 = RegisterCodec("h")
+FLOAT32_BE = RegisterCodec("f", "big")          # MKS-MFC: High-Word zuerst
+INT32_LOW_FIRST = RegisterCodec("i", "little")  # Pumpe: Low-Word zuerst, vorzeichenbehaftet
+
+NUMPY_BLOCK_THRESHOLD = 256  # Ab dieser Werteanzahl decodiert decode_values über NumPy (falls installiert)
+_bulk_structs = {}
+
+
+def registers_to_bytes(regs, word_order="big"):
+    """
+    Wandelt eine Registerliste ohne Einzelzugriffe in Bytes in der angegebenen Wortreihenfolge um.
+    """
+    words = array('H', regs)
+    if (sys.byteorder == "little") == (word_order == "big"):
+        words.byteswap()
+    return words.tobytes()
+
+
+def decode_values(regs, codec, count=None):
+    """
+    Decodiert einen ganzen Block gleichartiger Werte auf einmal.
+
+    Kleine Blöcke werden über ein zwischengespeichertes struct.Struct decodiert, große
+    (ab NUMPY_BLOCK_THRESHOLD Werten) über numpy.frombuffer, sofern NumPy verfügbar ist.
+
+    :param regs: Registerliste (oder array/memoryview mit 16-Bit Werten)
+    :param codec: RegisterCodec der Werte
+    :param count: Anzahl der Werte (Standard: so viele, wie die Register enthalten)
+    :return: Liste der Werte
+    """
+    count = len(regs) // codec.count if count is None else count
+    buffer = registers_to_bytes(regs[:count * codec.count], codec.word_order)
+    if count >= NUMPY_BLOCK_THRESHOLD:
+        try:
+            import numpy as np
+        except ImportError:
+            pass
         else:
+            return np.frombuffer(buffer, dtype=np.dtype(codec.prefix + codec.fmt)).tolist()
+    key = (codec.prefix, codec.fmt, count)
+    bulk = _bulk_structs.get(key)
+    if bulk is None:
+        bulk = _bulk_structs[key] = struct.Struct(f"{codec.prefix}{count}{codec.fmt}")
+    return list(bulk.unpack(buffer))
+
+
+class RegisterTable(IntEnum):
+    """
+    Registerbereiche, benannt nach dem Modbus-Funktionscode für das Lesen.
+    """
+    holding = 3
+    input = 4
+
+
+class RegisterField:
+    """
+    Beschreibt einen Wert im Registerabbild eines Geräts.
+    """
+    __slots__ = ("name", "address", "count", "table", "codec")
+
+    def __init__(self, name, address, codec=UINT16, table=RegisterTable.holding):
+        """
+        :param name: Name des Werts (entspricht dem Property-Namen des Treibers)
+        :param address: Startadresse des Werts
+        :param codec: RegisterCodec des Werts (bestimmt auch die Registeranzahl)
+        :param table: Registerbereich (Input- oder Holding-Register)
+        """
+        self.name = name
+        self.address = address
+        self.codec = codec
+        self.count = codec.count
+        self.table = table
+
+    def decode(self, regs):
+        return self.codec.decode(regs)
+
+    @property
+    def end(self):
+        return self.address + self.count
+
+
+class ReadBlock:
+    """
+    Ein zusammenhängender Lesezugriff, der einen oder mehrere Werte abdeckt.
+    """
+    __slots__ = ("table", "start", "count", "fields", "_layout")
+
+    def __init__(self, field):
+        self.table = field.table
+        self.start = field.address
+        self.count = field.count
+        self.fields = [field]
+        self._layout = None
+
+    def add(self, field):
+        self.fields.append(field)
+        self.count = max(self.start + self.count, field.end) - self.start
+        self._layout = None
+
+    def _compile(self):
+        """
+        Erzeugt ein struct.Struct, das alle Werte des Blocks in einem Aufruf decodiert.
+        Nicht möglich (False), wenn sich Werte überlappen oder unterschiedliche Wortreihenfolgen haben.
+        """
+        orders = {field.codec.word_order for field in self.fields if field.count > 1}
+        if len(orders) > 1:
             return False
+        prefix = ">" if not orders or orders.pop() == "big" else "<"
+        layout = []
+        position = self.start
+        for field in self.fields:
+            if field.address < position:
+                return False
+            if field.address > position:
+                layout.append(f"{2 * (field.address - position)}x")
+            layout.append(field.codec.fmt)
+            position = field.end
+        return (struct.Struct(f"{prefix}{self.count}H"), struct.Struct(prefix + "".join(layout)),
+                [field.name for field in self.fields])
 
-    try:
-        if config_name:
-            with open(f'./json_files/{config_name}.json', 'r') as config_file:
-                config_data = json.load(config_file)
+    def read(self, client, lock=None):
+        """
+        Führt den Blockzugriff aus.
+
+        :param client: ModbusClient (oder kompatibles Objekt)
+        :param lock: Optionales Lock, das für die Dauer des Zugriffs gehalten wird
+        :return: Liste der Registerwerte oder None bei Fehler
+        """
+        if self.table == RegisterTable.input:
+            read = client.read_input_registers
         else:
-            import config as cfg
-            config_data = cfg.config  # Hier wird cfg.config verwendet
+            read = client.read_holding_registers
+        if lock is None:
+            return read(self.start, self.count)
+        with lock:
+            return read(self.start, self.count)
+
+    async def async_read(self, client):
+        """
+        Asynchrones Gegenstück zu read() für einen AsyncModbusClient.
+        """
+        if self.table == RegisterTable.input:
+            return await client.read_input_registers(self.start, self.count)
+        return await client.read_holding_registers(self.start, self.count)
 
-        # Filtere nur die Einträge, bei denen der Substring "Modbus" (oder "Mobus") vorkommt
-        filtered_config = {k: v for k, v in config_data.items() if contains_modbus(v)}
-        return filtered_config
+    def decode(self, regs):
+        """
+        Zerlegt die Registerliste des Blocks in die einzelnen Werte.
+        """
+        if self._layout is None:
+            self._layout = self._compile()
+        if self._layout:
+            words, values, names = self._layout
+            return dict(zip(names, values.unpack_from(words.pack(*regs))))
+        values = {}
+        for field in self.fields:
+            offset = field.address - self.start
+            values[field.name] = field.decode(regs[offset:offset + field.count])
+        return values
 
-    except (FileNotFoundError, json.JSONDecodeError) as e:
-        print(f"Error loading config: {e}")
-        return None
+
+class RegisterSnapshot:
+    """
+    Momentaufnahme aller gelesenen Werte eines Geräts.
+    Die Werte sind als Attribute oder per Index erreichbar (z. B. snap.flow oder snap["flow"]),
+    fehlgeschlagene Werte sind None.
+    """
+
+    def __init__(self, values, timestamp=None):
+        self.values = values
+        self.timestamp = timestamp if timestamp is not None else dt.now()
+
+    def __getattr__(self, name):
+        try:
+            return self.__dict__["values"][name]
+        except KeyError:
+            raise AttributeError(name) from None
+
+    def __getitem__(self, name):
+        return self.values[name]
+
+    def __repr__(self):
+        return f"RegisterSnapshot({self.values}, {self.timestamp:%H:%M:%S.%f})"
+
+
+class RegisterMap:
+    """
+    Deklaratives Registerabbild eines Geräts mit Leseplaner.
+
+    Der Planer fasst benachbarte (oder nur durch kleine Lücken getrennte) Werte desselben
+    Registerbereichs zu möglichst wenigen Blockzugriffen zusammen. Blöcke, die ein Gerät
+    ablehnt, werden pro Gerät gemerkt und von diesem danach nur noch wertweise gelesen
+    (siehe read()); das Registerabbild selbst wird von allen Geräten eines Treibers geteilt.
+    """
+    MAX_BLOCK = 125  # Maximale Registeranzahl pro Lesezugriff laut Modbus-Spezifikation
+
+    def __init__(self, fields, max_gap=4):
+        """
+        :param fields: Liste von RegisterField-Instanzen
+        :param max_gap: Maximale Anzahl ungenutzter Register, die zum Zusammenfassen mitgelesen werden
+        """
+        self.fields = {field.name: field for field in fields}
+        self.max_gap = max_gap
+        self._plans = {}     # (Gerät mit abgelehnten Blöcken oder None, Wertnamen) -> Blöcke
+        self._rejected = {}  # Gerät (siehe _device) -> {(Registerbereich, Start, Anzahl) abgelehnter Blöcke}
+
+    def __contains__(self, name):
+        return name in self.fields
+
+    @staticmethod
+    def _device(client):
+        # Gerät hinter einem Client: synchroner und asynchroner Client teilen sich den Schlüssel
+        return getattr(client, "host", None), getattr(client, "port", None), getattr(client, "unit_id", None)
+
+    def plan(self, names=None, device=None):
+        """
+        Liefert die Blockzugriffe für die angeforderten Werte (zwischengespeichert).
+
+        :param names: Iterable der Wertnamen oder None für alle Werte
+        :param device: Gerät (siehe _device), dessen abgelehnte Blöcke wertweise geplant werden
+        :return: Liste von ReadBlock-Instanzen
+        """
+        names = None if names is None else tuple(sorted(set(names)))
+        rejected = self._rejected.get(device)
+        key = (device if rejected else None, names)
+        plan = self._plans.get(key)
+        if plan is None:
+            fields = self.fields.values() if names is None else [self.fields[name] for name in names]
+            plan = self._plans[key] = self._build_plan(fields, rejected)
+        return plan
+
+    def _build_plan(self, fields, rejected=None):
+        blocks = []
+        for table in RegisterTable:
+            block = None
+            for field in sorted((f for f in fields if f.table == table), key=lambda f: f.address):
+                if (block is not None
+                        and field.address - (block.start + block.count) <= self.max_gap
+                        and field.end - block.start <= self.MAX_BLOCK):
+                    block.add(field)
+                else:
+                    block = ReadBlock(field)
+                    blocks.append(block)
+        if rejected:
+            blocks = [single for block in blocks for single in (
+                [ReadBlock(field) for field in block.fields]
+                if (block.table, block.start, block.count) in rejected else [block])]
+        return blocks
+
+    def _reject(self, device, block):
+        # Das Gerät lässt den Block nicht zu: künftig wertweise lesen
+        self._rejected.setdefault(device, set()).add((block.table, block.start, block.count))
+        self._plans = {key: plan for key, plan in self._plans.items() if key[0] != device}
+
+    def read(self, client, names=None, lock=None):
+        """
+        Liest die angeforderten Werte in möglichst wenigen Zugriffen.
+
+        Schlägt ein zusammengefasster Block fehl (z. B. weil das Gerät Lücken im Adressraum
+        nicht zulässt), werden seine Werte einzeln nachgelesen. Hat das Gerät den Block mit einer
+        Modbus-Exception abgelehnt und gelingt mindestens ein einzelner Wert, wird der Block von
+        diesem Gerät (Host, Port, Unit-ID des Clients) nicht mehr angefragt.
+
+        :param client: ModbusClient (oder kompatibles Objekt)
+        :param names: Iterable der Wertnamen oder None für alle Werte
+        :param lock: Optionales Lock für den Buszugriff
+        :return: RegisterSnapshot
+        """
+        values = {}
+        device = self._device(client)
+        for block in self.plan(names, device):
+            regs = block.read(client, lock)
+            if regs and len(regs) == block.count:
+                values.update(block.decode(regs))
+            elif len(block.fields) > 1:
+                exception = getattr(client, "last_except", 0)
+                for field in block.fields:
+                    single = self.plan((field.name,))[0]
+                    regs = single.read(client, lock)
+                    values[field.name] = field.decode(regs) if regs else None
+                if exception and any(values[field.name] is not None for field in block.fields):
+                    self._reject(device, block)
+            else:
+                values[block.fields[0].name] = None
+        return RegisterSnapshot(values)
+
+    async def async_read(self, client, names=None):
+        """
+        Asynchrones Gegenstück zu read() für einen AsyncModbusClient.
+        """
+        values = {}
+        device = self._device(client)
+        for block in self.plan(names, device):
+            regs = await block.async_read(client)
+            if regs and len(regs) == block.count:
+                values.update(block.decode(regs))
+            elif len(block.fields) > 1:
+                exception = getattr(client, "last_except", 0)
+                for field in block.fields:
+                    regs = await self.plan((field.name,))[0].async_read(client)
+                    values[field.name] = field.decode(regs) if regs else None
+                if exception and any(values[field.name] is not None for field in block.fields):
+                    self._reject(device, block)
+            else:
+                values[block.fields[0].name] = None
+        return RegisterSnapshot(values)
+
+
+class AsyncModbusClient:
+    """
+    Schlanker asyncio-Modbus-TCP-Client mit derselben Lese-/Schreib-API wie der
+    pyModbusTCP-ModbusClient, jedoch als Koroutinen.
+
+    Anfragen an dasselbe Gerät werden nacheinander abgearbeitet; verschiedene Geräte
+    können mit asyncio.gather gleichzeitig abgefragt werden.
+    """
+
+    def __init__(self, host, port=SERVER_PORT, unit_id=1, timeout=0.2):
+        """
+        :param host: IP-Adresse des Geräts
+        :param port: Port (Standard: 502)
+        :param unit_id: Slave-/Unit-ID des Geräts
+        :param timeout: Timeout in Sekunden pro Anfrage
+        """
+        self.host = host
+        self.port = port
+        self.unit_id = unit_id
+        self.timeout = timeout
+        self.last_error_as_txt = ""
+        self.last_except = 0
+        self._reader = None
+        self._writer = None
+        self._lock = None
+        self._loop = None
+        self._transaction_id = 0
+
+    @property
+    def is_open(self):
+        return self._writer is not None and not self._writer.is_closing()
+
+    async def open(self):
+        """
+        Öffnet die TCP-Verbindung.
+
+        :return: True bei Erfolg, sonst False.
+        """
+        import asyncio
+        if self.is_open:
+            return True
+        try:
+            self._reader, self._writer = await asyncio.wait_for(
+                asyncio.open_connection(self.host, self.port), self.timeout)
+            return True
+        except (OSError, asyncio.TimeoutError) as e:
+            self.last_error_as_txt = f"connect error: {e}"
+            self._reader = self._writer = None
+            return False
+
+    async def close(self):
+        """
+        Schließt die TCP-Verbindung.
+        """
+        writer, self._reader, self._writer = self._writer, None, None
+        if writer is not None:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except OSError:
+                pass
+
+    def _bind_loop(self):
+        # Lock und Verbindung gehören zu einer Event-Loop; bei einer neuen Loop (z. B.
+        # erneutes asyncio.run) werden sie neu angelegt.
+        import asyncio
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            self._loop = loop
+            self._lock = asyncio.Lock()
+            self._reader = self._writer = None
+
+    async def _request(self, pdu):
+        """
+        Sendet eine PDU und liefert die Antwort-PDU oder None bei Fehler.
+        """
+        import asyncio
+        self._bind_loop()
+        async with self._lock:
+            if not await self.open():
+                return None
+            self._transaction_id = (self._transaction_id + 1) & 0xFFFF
+            frame = struct.pack('>HHHB', self._transaction_id, 0, len(pdu) + 1, self.unit_id) + pdu
+            try:
+                self._writer.write(frame)
+                await self._writer.drain()
+                header = await asyncio.wait_for(self._reader.readexactly(7), self.timeout)
+                transaction_id, _, length, _ = struct.unpack('>HHHB', header)
+                response = await asyncio.wait_for(self._reader.readexactly(length - 1), self.timeout)
+            except asyncio.TimeoutError:
+                self.last_error_as_txt = "recv timeout occur"
+                await self.close()
+                return None
+            except (OSError, asyncio.IncompleteReadError) as e:
+                self.last_error_as_txt = f"socket error: {e}"
+                await self.close()
+                return None
+            if transaction_id != self._transaction_id or not response:
+                self.last_error_as_txt = "frame format error"
+                await self.close()
+                return None
+            if response[0] == pdu[0] | 0x80:
+                self.last_except = response[1] if len(response) > 1 else 0
+                self.last_error_as_txt = "modbus exception"
+                return None
+            self.last_error_as_txt = "no error"
+            self.last_except = 0
+            return response
+
+    async def _read_registers(self, function_code, reg_addr, reg_nb):
+        response = await self._request(struct.pack('>BHH', function_code, reg_addr, reg_nb))
+        if response is None or len(response) != 2 + 2 * reg_nb:
+            return None
+        return list(struct.unpack(f'>{reg_nb}H', response[2:]))
+
+    async def read_holding_registers(self, reg_addr, reg_nb=1):
+        return await self._read_registers(0x03, reg_addr, reg_nb)
+
+    async def read_input_registers(self, reg_addr, reg_nb=1):
+        return await self._read_registers(0x04, reg_addr, reg_nb)
+
+    async def write_single_coil(self, bit_addr, bit_value):
+        response = await self._request(struct.pack('>BHH', 0x05, bit_addr, 0xFF00 if bit_value else 0x0000))
+        return response is not None
+
+    async def write_multiple_registers(self, regs_addr, regs_value):
+        pdu = struct.pack(f'>BHHB{len(regs_value)}H', 0x10, regs_addr, len(regs_value),
+                          2 * len(regs_value), *regs_value)
+        response = await self._request(pdu)
+        return response is not None
+
+
+class ConnectionPool:
+    """
+    Teilt eine TCP-Verbindung pro (Host, Port) zwischen allen Geräten, die hinter demselben
+    Modbus-TCP-Gateway liegen und sich nur in der Unit-ID unterscheiden.
+
+    Die Anfragen aller Handles einer Verbindung werden nacheinander ausgeführt.
+    """
+
+    def __init__(self, timeout=0.2):
+        """
+        :param timeout: Standard-Timeout in Sekunden für neue Handles
+        """
+        self.timeout = timeout
+        self._connections = {}  # (host, port) -> _PooledConnection
+        self._lock = Lock()
+
+    def handle(self, host, port=SERVER_PORT, unit_id=1, timeout=None):
+        """
+        Liefert einen Unit-spezifischen Handle auf die geteilte Verbindung zu host:port.
+
+        :param host: IP-Adresse des Geräts bzw. Gateways
+        :param port: Port (Standard: 502)
+        :param unit_id: Slave-/Unit-ID des Geräts hinter dem Gateway
+        :param timeout: Timeout in Sekunden (Standard: Pool-Timeout)
+        :return: UnitHandle mit der API des ModbusClient
+        """
+        key = (host, port)
+        with self._lock:
+            connection = self._connections.get(key)
+            if connection is None:
+                connection = self._connections[key] = _PooledConnection(host, port, self.timeout)
+            connection.handles += 1
+        return UnitHandle(self, connection, unit_id, self.timeout if timeout is None else timeout)
+
+    def release(self, connection):
+        """
+        Gibt einen Handle zurück; die Verbindung wird geschlossen, sobald sie niemand mehr nutzt.
+        """
+        with self._lock:
+            connection.handles -= 1
+            if connection.handles > 0:
+                return
+            if self._connections.get((connection.host, connection.port)) is connection:
+                del self._connections[(connection.host, connection.port)]
+        with connection.lock:
+            connection.client.close()
+
+    def close_all(self):
+        """
+        Schließt alle Verbindungen des Pools.
+        """
+        with self._lock:
+            connections, self._connections = list(self._connections.values()), {}
+        for connection in connections:
+            with connection.lock:
+                connection.client.close()
+
+    def __len__(self):
+        return len(self._connections)
+
+
+class _PooledConnection:
+    """
+    Eine geteilte Verbindung samt Lock zur Serialisierung der Anfragen.
+    """
+
+    def __init__(self, host, port, timeout):
+        self.host = host
+        self.port = port
+        self.client = _modbus_client(host, port, timeout)
+        self.lock = Lock()
+        self.handles = 0
+
+
+class UnitHandle:
+    """
+    Unit-spezifischer Zugriff auf eine geteilte Verbindung mit der API des pyModbusTCP-ModbusClient.
+
+    Vor jeder Anfrage werden Unit-ID und Timeout des Handles auf den geteilten Client übertragen;
+    Fehlerstatus (last_error, last_except, ...) wird pro Handle festgehalten.
+    """
+
+    def __init__(self, pool, connection, unit_id, timeout):
+        self._pool = pool
+        self._connection = connection
+        self._released = False
+        self.unit_id = unit_id
+        self.timeout = timeout
+        self.last_error = 0
+        self.last_except = 0
+        self.last_error_as_txt = ""
+        self.last_except_as_txt = ""
+        self.last_except_as_full_txt = ""
+
+    @property
+    def host(self):
+        return self._connection.host
+
+    @property
+    def port(self):
+        return self._connection.port
+
+    @property
+    def is_open(self):
+        return not self._released and self._connection.client.is_open
+
+    def open(self):
+        with self._connection.lock:
+            return self._connection.client.open()
+
+    def close(self):
+        """
+        Gibt den Handle an den Pool zurück (die Verbindung bleibt für andere Units bestehen).
+        """
+        if not self._released:
+            self._released = True
+            self._pool.release(self._connection)
+
+    def _call(self, method, *args):
+        connection = self._connection
+        with connection.lock:
+            client = connection.client
+            client.unit_id = self.unit_id
+            client.timeout = self.timeout
+            result = getattr(client, method)(*args)
+            self.last_error = client.last_error
+            self.last_except = client.last_except
+            self.last_error_as_txt = client.last_error_as_txt
+            self.last_except_as_txt = client.last_except_as_txt
+            self.last_except_as_full_txt = client.last_except_as_full_txt
+        return result
+
+    def read_coils(self, bit_addr, bit_nb=1):
+        return self._call("read_coils", bit_addr, bit_nb)
+
+    def read_discrete_inputs(self, bit_addr, bit_nb=1):
+        return self._call("read_discrete_inputs", bit_addr, bit_nb)
+
+    def read_holding_registers(self, reg_addr, reg_nb=1):
+        return self._call("read_holding_registers", reg_addr, reg_nb)
+
+    def read_input_registers(self, reg_addr, reg_nb=1):
+        return self._call("read_input_registers", reg_addr, reg_nb)
+
+    def write_single_coil(self, bit_addr, bit_value):
+        return self._call("write_single_coil", bit_addr, bit_value)
+
+    def write_multiple_coils(self, bits_addr, bits_value):
+        return self._call("write_multiple_coils", bits_addr, bits_value)
+
+    def write_single_register(self, reg_addr, reg_value):
+        return self._call("write_single_register", reg_addr, reg_value)
+
+    def write_multiple_registers(self, regs_addr, regs_value):
+        return self._call("write_multiple_registers", regs_addr, regs_value)
+
+
+class Quality(IntEnum):
+    """
+    Güte eines zwischengespeicherten Werts.
+    """
+    good = 0
+    stale = 1
+    bad = 2
+
+
+CachedValue = namedtuple("CachedValue", ["value", "timestamp", "quality"])
+
+
+class ValueCache:
+    """
+    Zwischenspeicher der zuletzt gepollten Werte eines Geräts als (value, timestamp, quality).
+    Zeitstempel stammen aus time.monotonic().
+    """
+
+    def __init__(self):
+        self._values = {}
+        self.max_age = {}  # Name -> maximal zulässiges Alter in Sekunden
+
+    def update(self, values, timestamp=None):
+        """
+        Übernimmt die Werte eines Lesezugriffs. None-Werte werden als Quality.bad markiert.
+        """
+        timestamp = time.monotonic() if timestamp is None else timestamp
+        for name, value in values.items():
+            quality = Quality.bad if value is None else Quality.good
+            self._values[name] = CachedValue(value, timestamp, quality)
+
+    def get(self, name):
+        """
+        Liefert den zuletzt gepollten Wert; zu alte Werte werden als Quality.stale gekennzeichnet.
+
+        :return: CachedValue oder None, falls der Wert noch nie gelesen wurde
+        """
+        entry = self._values.get(name)
+        if entry is None:
+            return None
+        max_age = self.max_age.get(name)
+        if max_age is not None and time.monotonic() - entry.timestamp > max_age:
+            return entry._replace(quality=Quality.stale)
+        return entry
+
+    def fresh(self, name):
+        """
+        Liefert den Wert nur, wenn er jünger als das zulässige Alter ist, sonst None.
+        """
+        entry = self.get(name)
+        if entry is None or entry.quality == Quality.stale:
+            return None
+        return entry
+
+
+class DevicePoller:
+    """
+    Hintergrund-Thread, der die Registerwerte eines oder mehrerer Geräte mit
+    konfigurierbarer Rate pro Wert liest und in deren ValueCache ablegt.
+
+    Werte, die im selben Zyklus fällig sind, werden über den Leseplaner des Geräts
+    gemeinsam gelesen.
+    """
+
+    def __init__(self, name="DevicePoller"):
+        self.name = name
+        self.sinks = []  # Funktionen sink(device, values), die zusätzlich jedes Pollergebnis erhalten
+        self._schedules = {}  # id(device) -> (device, {name: [period, next_due]})
+        self._lock = Lock()
+        self._stop_event = Event()
+        self._thread = None
+
+    def add(self, device, rates, max_age_factor=2.0):
+        """
+        Registriert ein Gerät beim Poller.
+
+        :param device: ModbusDevice-Instanz
+        :param rates: Abfragerate in Hz für alle Werte des Registerabbilds oder Dictionary Name -> Hz
+        :param max_age_factor: Ein Wert gilt als aktuell, solange er jünger als
+                               max_age_factor Abfrageperioden ist (Standard: 2)
+        """
+        if not isinstance(rates, dict):
+            rates = {name: rates for name in device.REGISTERS.fields}
+        if device.cache is None:
+            device.cache = ValueCache()
+        now = time.monotonic()
+        schedule = {}
+        for name, rate in rates.items():
+            if name not in device.REGISTERS:
+                raise KeyError(f"{type(device).__name__} hat keinen Registerwert '{name}'")
+            period = 1.0 / rate
+            schedule[name] = [period, now]
+            device.cache.max_age[name] = period * max_age_factor
+        with self._lock:
+            self._schedules[id(device)] = (device, schedule)
+        device.poller = self
+
+    def add_sink(self, sink):
+        """
+        Registriert eine Funktion sink(device, values), die nach jedem Pollvorgang die gelesenen
+        Werte erhält (z. B. shared_values.SharedValueTable.sink).
+        """
+        self.sinks.append(sink)
+
+    def remove(self, device):
+        """
+        Entfernt ein Gerät vom Poller. Der Cache wird verworfen, damit die Properties wieder
+        direkt vom Bus lesen.
+        """
+        with self._lock:
+            self._schedules.pop(id(device), None)
+        device.cache = None
+        device.poller = None
+
+    def start(self):
+        """
+        Startet den Poll-Thread (falls noch nicht aktiv).
+        """
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = Thread(target=self._run, name=self.name, daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=1.0):
+        """
+        Stoppt den Poll-Thread.
+        """
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            now = time.monotonic()
+            next_wake = now + 1.0
+            with self._lock:
+                schedules = list(self._schedules.values())
+            for device, schedule in schedules:
+                due = []
+                for name, entry in schedule.items():
+                    period, next_due = entry
+                    if next_due <= now:
+                        due.append(name)
+                        # Bei Verzug nicht nachholen, sondern ab jetzt neu takten
+                        entry[1] = next_due + period if next_due + period > now else now + period
+                    next_wake = min(next_wake, entry[1])
+                if due:
+                    self._poll(device, due)
+            self._stop_event.wait(max(0.0, next_wake - time.monotonic()))
+
+    def _poll(self, device, names):
+        try:
+            values = device.snapshot(names).values
+        except Exception as e:
+            print(f"Fehler beim Pollen von {type(device).__name__}: {e}")
+            values = dict.fromkeys(names)
+        cache = device.cache
+        if cache is not None:
+            cache.update(values)
+        for sink in self.sinks:
+            try:
+                sink(device, values)
+            except Exception as e:
+                print(f"Fehler in der Senke des Pollers {self.name}: {e}")
+
+
+class WriteBehind:
+    """
+    Optionale Write-Behind-Schicht für Sollwert-Schreibzugriffe.
+
+    Merkt sich pro Register den zuletzt bestätigten Wert und
+    - überspringt Schreibzugriffe, die innerhalb des Totbands um diesen Wert liegen,
+    - begrenzt die Schreibrate pro Register auf max_rate; Werte, die dazwischen eintreffen,
+      werden zusammengefasst und nur der jeweils neueste wird nachgeschrieben,
+    - schreibt einen unveränderten Wert nach refresh Sekunden dennoch erneut, damit ein
+      zwischenzeitlich zurückgesetztes Gerät wieder den richtigen Sollwert erhält.
+    """
+
+    def __init__(self, deadband=0.0, max_rate=None, refresh=30.0):
+        """
+        :param deadband: Änderungen bis zu diesem Betrag werden nicht geschrieben
+        :param max_rate: Maximale Anzahl Schreibzugriffe pro Sekunde und Register (None: unbegrenzt)
+        :param refresh: Spätestens nach dieser Zeit in Sekunden wird auch ein unveränderter Wert erneut geschrieben
+        """
+        self.deadband = deadband
+        self.min_interval = 1.0 / max_rate if max_rate else 0.0
+        self.refresh = refresh
+        self.sent = 0
+        self.skipped = 0
+        self.coalesced = 0
+        self._state = {}  # Schlüssel -> [bestätigter Wert, Zeit der Bestätigung, Zeit des letzten Sendens, (Wert, send) ausstehend]
+        self._cond = Condition(Lock())
+        self._send_lock = Lock()
+        self._thread = None
+
+    def write(self, key, value, send):
+        """
+        Schreibt value über send(value) oder verwirft bzw. verzögert den Zugriff.
+
+        :param key: Schlüssel des Registers (z. B. die Adresse)
+        :param value: Zu schreibender Wert
+        :param send: Funktion, die den Wert tatsächlich schreibt und True bei Erfolg liefert
+        :return: Ergebnis von send bei sofortigem Schreiben, sonst True
+        """
+        now = time.monotonic()
+        with self._cond:
+            state = self._state.setdefault(key, [None, 0.0, float("-inf"), None])
+            acked, acked_time, sent_time, _ = state
+            if acked is not None and abs(value - acked) <= self.deadband and now - acked_time < self.refresh:
+                # Ein ausstehender Wert ist damit überholt.
+                state[3] = None
+                self.skipped += 1
+                return True
+            if now - sent_time < self.min_interval:
+                if state[3] is not None:
+                    self.coalesced += 1
+                state[3] = (value, send)
+                self._ensure_worker()
+                self._cond.notify()
+                return True
+            state[2] = now
+            state[3] = None
+        return self._send(key, state, value, send)
+
+    def forget(self, key):
+        """
+        Verwirft den bekannten und einen ausstehenden Wert eines Registers, z. B. wenn es an der
+        Write-Behind-Schicht vorbei beschrieben wird. Ein gerade laufender Schreibzugriff wird
+        abgewartet, sodass ein anschließender direkter Zugriff (z. B. halt) als letzter ankommt.
+        """
+        with self._send_lock:
+            with self._cond:
+                self._state.pop(key, None)
+
+    def _send(self, key, state, value, send):
+        with self._send_lock:
+            with self._cond:
+                if self._state.get(key) is not state:
+                    # Zwischenzeitlich per forget() verworfen
+                    return False
+            success = send(value)
+            with self._cond:
+                self.sent += 1
+                if success:
+                    state[0] = value
+                    state[1] = time.monotonic()
+        return success
+
+    def _ensure_worker(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = Thread(target=self._run, name="WriteBehind", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                due = None
+                while due is None:
+                    now = time.monotonic()
+                    next_due = None
+                    for key, state in self._state.items():
+                        if state[3] is None:
+                            continue
+                        ready_at = state[2] + self.min_interval
+                        if ready_at <= now:
+                            due = key
+                            break
+                        next_due = ready_at if next_due is None else min(next_due, ready_at)
+                    if due is None:
+                        self._cond.wait(None if next_due is None else next_due - now)
+                state = self._state[due]
+                value, send = state[3]
+                state[2] = now
+                state[3] = None
+            self._send(due, state, value, send)
+
+
+class CommandPriority(IntEnum):
+    """
+    Priorität eines Buszugriffs in der CommandQueue (kleiner Wert = früher).
+    """
+    safety = 0  # z. B. halt()
+    write = 1
+    read = 2
+
+
+class CommandQueue:
+    """
+    Eigener Worker-Thread eines Geräts, der Buszugriffe nacheinander aus einer Prioritätswarteschlange
+    abarbeitet.
+
+    Aufrufer erhalten sofort ein concurrent.futures.Future und warten nur, wenn sie das Ergebnis
+    brauchen; sicherheitsrelevante Befehle werden vor wartenden Schreib- und Lesezugriffen
+    ausgeführt. Gleiche Lesezugriffe, die noch in der Warteschlange stehen, werden zusammengefasst
+    und teilen sich ein Future.
+    """
+
+    def __init__(self, name="CommandQueue"):
+        """
+        :param name: Name des Worker-Threads
+        """
+        self.name = name
+        self.executed = 0
+        self.merged = 0
+        import queue
+        self._queue = queue.PriorityQueue()
+        self._pending = {}  # Schlüssel -> Future eines noch nicht begonnenen Befehls
+        self._lock = Lock()
+        self._counter = 0
+        self._thread = None
+        self._closed = False
+
+    def submit(self, priority, func, *args, key=None):
+        """
+        Reiht func(*args) ein.
+
+        :param priority: CommandPriority des Befehls
+        :param func: Auszuführende Funktion (führt den Buszugriff aus)
+        :param key: Optionaler Schlüssel; ein noch wartender Befehl mit gleichem Schlüssel wird
+                    nicht erneut eingereiht, sondern dessen Future zurückgegeben
+        :return: Future mit dem Rückgabewert von func
+        """
+        with self._lock:
+            if self._closed:
+                raise RuntimeError(f"{self.name} ist geschlossen")
+            if key is not None and key in self._pending:
+                self.merged += 1
+                return self._pending[key]
+            from concurrent.futures import Future
+            future = Future()
+            if key is not None:
+                self._pending[key] = future
+            self._counter += 1
+            self._queue.put((int(priority), self._counter, future, key, func, args))
+            if self._thread is None:
+                self._thread = Thread(target=self._run, name=self.name, daemon=True)
+                self._thread.start()
+        return future
+
+    def in_worker(self):
+        """
+        :return: True, falls der Aufruf aus dem Worker-Thread selbst stammt
+        """
+        return current_thread() is self._thread
+
+    def close(self, timeout=1.0):
+        """
+        Arbeitet die bereits eingereihten Befehle ab und beendet den Worker-Thread.
+        """
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            thread = self._thread
+            self._counter += 1
+            self._queue.put((len(CommandPriority), self._counter, None, None, None, ()))
+        if thread is not None and not self.in_worker():
+            thread.join(timeout)
+
+    def _run(self):
+        while True:
+            _, _, future, key, func, args = self._queue.get()
+            if future is None:
+                return
+            with self._lock:
+                if key is not None:
+                    self._pending.pop(key, None)
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                result = func(*args)
+            except BaseException as exc:
+                future.set_exception(exc)
+            else:
+                future.set_result(result)
+            self.executed += 1
+
+
+class ModbusDevice:
+    """
+    Basisklasse der Modbus-Treiber.
+
+    Jeder Treiber deklariert sein Registerabbild einmalig in REGISTERS; snapshot()
+    liest daraus beliebig viele Werte in möglichst wenigen Bustransaktionen.
+    """
+    REGISTERS = RegisterMap([])
+    bus_semaphore = None
+    cache = None   # ValueCache, solange ein DevicePoller das Gerät abfragt
+    poller = None
+    ready = True   # False, solange eine verzögerte Initialisierung (lazy) aussteht
+    write_behind = None
+    command_queue = None  # CommandQueue, falls aktiviert
+    _async_client = None
+
+    def enable_write_behind(self, deadband=0.0, max_rate=None, refresh=30.0):
+        """
+        Aktiviert die Write-Behind-Schicht für die Sollwert-Schreibzugriffe des Geräts
+        (siehe WriteBehind).
+
+        :return: Die WriteBehind-Instanz (z. B. für deren Zähler sent/skipped/coalesced)
+        """
+        self.write_behind = WriteBehind(deadband, max_rate, refresh)
+        return self.write_behind
+
+    def enable_command_queue(self):
+        """
+        Lässt alle Buszugriffe des Geräts von einem eigenen Worker-Thread ausführen (siehe CommandQueue).
+        Aufrufende Threads warten dann nicht mehr gegenseitig auf bus_semaphore, sondern nur auf
+        das Ergebnis ihres eigenen Befehls.
+
+        :return: Die CommandQueue-Instanz
+        """
+        if self.command_queue is None:
+            self.command_queue = CommandQueue(f"{type(self).__name__}-Commands")
+        return self.command_queue
+
+    def disable_command_queue(self):
+        """
+        Beendet den Worker-Thread; Buszugriffe erfolgen danach wieder direkt im aufrufenden Thread.
+        """
+        command_queue, self.command_queue = self.command_queue, None
+        if command_queue is not None:
+            command_queue.close()
+
+    def instrument(self, metrics, name=None):
+        """
+        Erfasst alle weiteren Transaktionen des Geräts in einem modbus_metrics.ModbusMetrics-Objekt.
+
+        :param metrics: ModbusMetrics-Objekt (kann von mehreren Geräten geteilt werden)
+        :param name: Gerätename in den Metriken (Standard: Klassenname und Host)
+        """
+        self.client = metrics.instrument(self.client, name or f"{type(self).__name__}@{self.client.host}")
+
+    def make_resilient(self, **options):
+        """
+        Versieht den Client mit adaptivem Timeout, Wiederholungen und Circuit Breaker (siehe ResilientClient).
+
+        :param options: Parameter von ResilientClient (z. B. failure_threshold=3, probe_interval=2.0)
+        :return: Der ResilientClient
+        """
+        self.client = _sibling("modbus_resilience").ResilientClient(self.client, **options)
+        return self.client
+
+    @property
+    def available(self):
+        """
+        False, solange das Gerät als ausgefallen gilt (offener Circuit Breaker eines ResilientClient).
+        """
+        return getattr(self.client, "available", True)
+
+    def _execute(self, priority, func, *args, key=None, wait=True):
+        """
+        Führt einen Buszugriff über die CommandQueue oder, falls diese nicht aktiv ist (oder der
+        Aufruf aus deren Worker stammt), direkt aus.
+
+        :param wait: True: Ergebnis zurückgeben, False: Future zurückgeben
+        """
+        command_queue = self.command_queue
+        if command_queue is None or command_queue.in_worker():
+            if wait:
+                return func(*args)
+            from concurrent.futures import Future
+            future = Future()
+            try:
+                future.set_result(func(*args))
+            except Exception as exc:
+                future.set_exception(exc)
+            return future
+        future = command_queue.submit(priority, func, *args, key=key)
+        return future.result() if wait else future
+
+    def _write(self, key, value, send):
+        """
+        Schreibt einen Sollwert direkt oder, falls aktiviert, über die Write-Behind-Schicht.
+        """
+        if self.write_behind is None:
+            return send(value)
+        return self.write_behind.write(key, value, send)
+
+    def ensure_ready(self):
+        """
+        Führt eine ausstehende verzögerte Initialisierung aus. Für Geräte ohne
+        Initialisierungssequenz ohne Wirkung.
+        """
+
+    async def async_ensure_ready(self):
+        """
+        Asynchrones Gegenstück zu ensure_ready(); die blockierende Initialisierung läuft in einem Thread.
+        """
+        if not self.ready:
+            import asyncio
+            await asyncio.to_thread(self.ensure_ready)
+
+    def snapshot(self, names=None):
+        """
+        Liest die angeforderten Werte (Standard: alle) als RegisterSnapshot.
+
+        :param names: Iterable der Wertnamen oder None für alle Werte
+        """
+        self.ensure_ready()
+        if names is not None:
+            names = tuple(names)
+        return self._execute(CommandPriority.read, self.REGISTERS.read, self.client, names, self.bus_semaphore,
+                             key=("snapshot", names))
+
+    @property
+    def async_client(self):
+        """
+        AsyncModbusClient mit denselben Verbindungsdaten wie der synchrone Client
+        (wird beim ersten Zugriff angelegt). Bietet der Transport ein eigenes asynchrones
+        Gegenstück an (z. B. der ReplayClient einer Wiedergabe), wird dieses verwendet.
+        """
+        if self._async_client is None:
+            counterpart = getattr(self.client, "async_counterpart", None)
+            if counterpart is not None:
+                self._async_client = counterpart()
+            else:
+                self._async_client = AsyncModbusClient(self.client.host, self.client.port,
+                                                       self.client.unit_id, self.client.timeout)
+        return self._async_client
+
+    async def async_snapshot(self, names=None):
+        """
+        Asynchrones Gegenstück zu snapshot().
+        """
+        await self.async_ensure_ready()
+        return await self.REGISTERS.async_read(self.async_client, names)
+
+    async def async_close(self):
+        """
+        Schließt die asynchrone Verbindung.
+        """
+        if self._async_client is not None:
+            await self._async_client.close()
+
+    def start_polling(self, rates, poller=None):
+        """
+        Aktiviert das Hintergrund-Polling. Die Properties liefern danach den zwischengespeicherten
+        Wert, solange dieser aktuell ist, und lesen sonst direkt vom Bus.
+
+        :param rates: Abfragerate in Hz für alle Werte oder Dictionary Name -> Hz
+        :param poller: Gemeinsam genutzter DevicePoller; ohne Angabe wird ein eigener erzeugt
+        :return: Der verwendete DevicePoller
+        """
+        if poller is None:
+            poller = DevicePoller(f"{type(self).__name__}-Poller")
+        poller.add(self, rates)
+        poller.start()
+        return poller
+
+    def stop_polling(self):
+        """
+        Meldet das Gerät vom Poller ab.
+        """
+        if self.poller is not None:
+            self.poller.remove(self)
+
+    def cached(self, name):
+        """
+        Liefert den zwischengespeicherten Wert als CachedValue, falls er aktuell ist, sonst None.
+        """
+        cache = self.cache
+        if cache is None:
+            return None
+        return cache.fresh(name)
+
+    def _read(self, name, read=None):
+        """
+        Liest einen einzelnen Wert, bevorzugt aus dem Poll-Cache.
+
+        :param name: Name des Werts im Registerabbild
+        :param read: Optionale Lesefunktion für den direkten Buszugriff
+        """
+        entry = self.cached(name)
+        if entry is not None:
+            return entry.value
+        if read is not None:
+            return read()
+        return self.snapshot((name,))[name]
+
+
+DeviceStartup = namedtuple("DeviceStartup", ["name", "driver", "seconds", "error"])
 
 
 class MOD_TCP:
@@ -67,34 +1404,361 @@ class MOD_TCP:
         inputDevice = 1
         outputDevice = 2
 
-    def setup_devices(self):        
-        channels_required = {}
-        for device_key, value in self.config.items():
-             # Überspringe externe Geräte, z.B. Modbus oder über andere Protokolle
-            if "input_type" in value and "mks_modbus" in value["input_type"]  or "output_type" in value and "mks_modbus" in value["output_type"].lower():
-                print(f"Setting up device {device_key} as Modbus MFC")
-                self.devices[device_key] = Modbus_MFC_MKS(value["ip_address"])
-            if  "output_type" in value and "modbus_pump" in value["output_type"].lower():
-                print(f"Setting up device {device_key} as Modbus Pump")
-                self.devices[device_key] = Modbus_Pump(value["ip_address"])
-            if  "output_type" in value and "coupon_modbus" in value["output_type"].lower():
-                print(f"Setting up device {device_key} as coupon_modbus")
-                self.devices[device_key] = Modbus_Coupon(value["ip_address"])
+    def device_factories(self, lazy=False):
+        """
+        Ermittelt aus der Konfiguration den passenden Treiber für jedes Gerät (siehe device_registry).
+        Das Modul eines Treibers wird erst importiert, wenn seine Factory aufgerufen wird.
+
+        :param lazy: Verbindungsaufbau und Initialisierungssequenz erst beim ersten Zugriff ausführen
+        :return: Dictionary Gerätename -> (Treiberbezeichnung, Factory ohne Argumente)
+        """
+        factories = {}
+        for device_key, driver in self.index.driver_of.items():
+            value = self.config[device_key]
+            if self.operation_mode == self.OperationModes.dummyMode and self.replay is None:
+                value = self._simulate(device_key, driver, value)
+            spec = device_registry.driver_spec(driver)
+            options = {"lazy": lazy} if spec.lazy else {}
+            factories[device_key] = (spec.label, partial(self._create_device, device_key, driver, value, **options))
+        return factories
+
+    def _simulate(self, device_key, driver, value):
+        """
+        Startet für ein Gerät ein simuliertes Gegenstück auf einem Loopback-Port und liefert
+        die entsprechend umgeschriebene Konfiguration. Gerätespezifische Simulationsparameter
+        (z. B. latency, loss, full_scale) können im Konfigurationsschlüssel "simulation" stehen.
+        Für Treiber ohne Simulation bleibt die Konfiguration unverändert.
+        """
+        simulator = _sibling("modbus_simulator")
+        if driver not in simulator.SIMULATED_DEVICES:
+            print(f"Für {device_key} ({driver}) gibt es keine Simulation, das echte Gerät wird verwendet")
+            return value
+        if self.simulator is None:
+            self.simulator = simulator.SimulatedRig(**self.simulation_options)
+        host, port = self.simulator.add(device_key, driver, **value.get("simulation", {}))
+        return dict(value, ip_address=host, port=port, unit_id=1)
+
+    def _create_device(self, device_key, driver, value, **kwargs):
+        """
+        Erzeugt ein Gerät; mit Verbindungspool erhält es einen Unit-Handle auf die geteilte
+        Verbindung zu seinem Gateway, sonst einen eigenen Client (Konfigurationsschlüssel "port"
+        und "unit_id" optional).
+        Mit aktivierten Metriken wird der Client zusätzlich instrumentiert, mit aktivierter
+        Ausfallbehandlung in einen ResilientClient gehüllt. Bei einer Aufzeichnung wird der
+        Verkehr direkt am Transport mitgeschnitten, bei einer Wiedergabe ersetzt der
+        ReplayClient des Geräts den Transport.
+
+        :param driver: Treiberklasse oder Typbezeichnung aus device_registry
+        """
+        if isinstance(driver, str):
+            driver = device_registry.driver_class(driver)
+        port = value.get("port", SERVER_PORT)
+        if self.replay is not None:
+            client = self.replay.client(device_key)
+        elif self.pool is not None:
+            client = self.pool.handle(value["ip_address"], port, value.get("unit_id", 1))
+        else:
+            # Eigener Client, damit auch ohne Pool die Unit-ID der Konfiguration gilt
+            client = _modbus_client(value["ip_address"], port, 0.2)
+            client.unit_id = value.get("unit_id", 1)
+        if self.recorder is not None:
+            client = self.recorder.instrument(client, device_key)
+        if self.metrics is not None:
+            client = self.metrics.instrument(client, device_key)
+        if self.resilience is not None:
+            client = _sibling("modbus_resilience").ResilientClient(client, name=device_key, **self.resilience)
+        try:
+            return driver(value["ip_address"], client=client, **kwargs)
+        except Exception:
+            client.close()
+            raise
+
+    def setup_devices(self, max_workers=8, lazy=False):
+        """
+        Erzeugt alle Geräte parallel auf einem begrenzten Thread-Pool.
+
+        Geräte, deren Initialisierung fehlschlägt, werden im Startbericht (self.startup_report)
+        vermerkt und übersprungen; die übrigen Geräte werden normal eingerichtet.
+
+        :param max_workers: Maximale Anzahl gleichzeitig initialisierter Geräte
+        :param lazy: Verbindungsaufbau und Initialisierungssequenz erst beim ersten Zugriff ausführen
+        """
+        factories = self.device_factories(lazy)
+        if not factories:
+            return
 
-                
+        def bring_up(device_key, driver, factory):
+            start = time.perf_counter()
+            try:
+                device, error = factory(), None
+            except Exception as e:
+                device, error = None, e
+            return device, DeviceStartup(device_key, driver, time.perf_counter() - start, error)
 
+        from concurrent.futures import ThreadPoolExecutor
+        futures = []
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(factories)))) as pool:
+            for device_key, (driver, factory) in factories.items():
+                print(f"Setting up device {device_key} as {driver}")
+                futures.append(pool.submit(bring_up, device_key, driver, factory))
+        for future in futures:
+            device, report = future.result()
+            self.startup_report[report.name] = report
+            if device is not None:
+                self.devices[report.name] = device
+        self.print_startup_report()
 
+    def print_startup_report(self):
+        """
+        Gibt Dauer und Ergebnis der Initialisierung jedes Geräts aus.
+        """
+        failed = [report for report in self.startup_report.values() if report.error is not None]
+        print(f"Gerätestart: {len(self.startup_report) - len(failed)} von {len(self.startup_report)} Geräten bereit")
+        for report in self.startup_report.values():
+            status = "OK" if report.error is None else f"FEHLER: {report.error}"
+            print(f"  {report.name:<20} {report.driver:<15} {report.seconds * 1000:8.1f} ms  {status}")
 
-    def __init__(self, config_name=False, debug_mode=OperationModes.normalMode):
+    def __init__(self, config_name=False, debug_mode=OperationModes.normalMode, max_workers=8, lazy=False,
+                 shared_connections=True, simulation=None, metrics=None, resilience=None, processes=None,
+                 shard_rate=10.0, record=None, replay=None):
+        """
+        :param config_name: Name der JSON-Konfiguration, False für das config-Modul oder ein
+                            bereits geladenes Konfigurationsdictionary
+        :param debug_mode: Betriebsart (OperationModes); im dummyMode werden statt der echten
+                           Geräte simulierte Geräte auf Loopback-Ports angesprochen
+        :param max_workers: Maximale Anzahl parallel initialisierter Geräte
+        :param lazy: Geräte erst beim ersten Zugriff verbinden und initialisieren
+        :param shared_connections: Geräte hinter demselben Host/Port teilen sich eine Verbindung
+        :param simulation: Optionen für modbus_simulator.SimulatedRig im dummyMode
+                           (z. B. {"latency": 0.005, "loss": 0.01})
+        :param metrics: True oder ein modbus_metrics.ModbusMetrics-Objekt, um Latenzen und Fehler aller
+                        Transaktionen pro Gerät und Register zu erfassen (siehe self.metrics); mit
+                        processes nur True, die Metriken bleiben dann in den Worker-Prozessen
+        :param resilience: True oder Dictionary mit Parametern von ResilientClient, um ausgefallene Geräte
+                           nach wiederholten Fehlschlägen zu überspringen und im Hintergrund neu zu verbinden
+        :param processes: Anzahl Worker-Prozesse, auf die die Geräte nach Gateway verteilt werden
+                          (siehe modbus_shards); self.devices enthält dann RemoteDevice-Stellvertreter
+        :param shard_rate: Abfragerate der Worker-Prozesse in Hz
+        :param record: Pfad oder modbus_replay.ModbusRecorder, um alle Transaktionen mit Zeitstempel
+                       aufzuzeichnen (siehe self.recorder)
+        :param replay: Pfad oder modbus_replay.Replay; die Geräte erhalten dann statt einer
+                       Verbindung die aufgezeichneten Antworten (Zeitquelle: self.replay.clock)
+        """
         self.devices = {}
+        sharded = bool(processes) and record is None and replay is None
+        if sharded and metrics and metrics is not True:
+            raise ValueError("Ein ModbusMetrics-Objekt kann nicht an Worker-Prozesse übergeben werden")
+        if metrics is True and not sharded:
+            metrics = _sibling("modbus_metrics").ModbusMetrics()
+        self.metrics = None if sharded else metrics or None
+        self.resilience = ({} if resilience is True else dict(resilience)) if resilience else None
+        if isinstance(record, str):
+            record = _sibling("modbus_replay").ModbusRecorder(record)
+        self.recorder = record
+        if isinstance(replay, str):
+            replay = _sibling("modbus_replay").Replay(replay)
+        self.replay = replay
+        self.pool = ConnectionPool() if shared_connections and replay is None else None
+        self.simulator = None
+        self.simulation_options = simulation or {}
+        self.startup_report = {}
         self.operation_mode = debug_mode
-        self.config = get_config(config_name)
-        self.setup_devices()
+        if isinstance(config_name, dict):
+            config = {k: v for k, v in config_name.items()
+                      if contains_modbus(v) or device_registry.driver_key(v, load=False)}
+            self.index = DeviceIndex(config)
+        else:
+            config, self.index = load_config(config_name)
+        self.config = None if config is None else dict(config)
+        self.shards = None
+        if sharded and self.config:
+            self._start_shards(processes, shard_rate, dict(
+                debug_mode=debug_mode, max_workers=max_workers, lazy=lazy, shared_connections=shared_connections,
+                simulation=simulation, metrics=bool(metrics), resilience=resilience))
+        else:
+            self.setup_devices(max_workers, lazy)
         self.run = True
+        self.poller = None
+        self.sinks = []   # Senken, die jeder Poller dieses MOD_TCP erhält (siehe add_sink)
+        self.table = None
+        self.history = None
+
+    def add_sink(self, sink):
+        """
+        Registriert eine Funktion sink(device, values), die jedes Pollergebnis erhält, auch für
+        Poller, die erst später mit start_polling() gestartet werden. Bei verteilter Erfassung
+        (processes) erhält sie stattdessen jeden Rahmen der Worker-Prozesse.
+        """
+        self.sinks.append(sink)
+        if self.shards is not None:
+            self.shards.add_sink(sink)
+        if self.poller is not None:
+            self.poller.add_sink(sink)
+
+    def device_names(self):
+        """
+        :return: Dictionary id(Gerät) -> Gerätename, wie es die Senken der Poller erwarten
+        """
+        return {id(device): key for key, device in self.devices.items()}
+
+    def publish(self, table=None, name=None):
+        """
+        Schreibt ab sofort alle Pollergebnisse in eine Shared-Memory-Tabelle der neuesten Werte
+        (siehe shared_values), aus der GUI, Logger und Regler ohne Buszugriff lesen.
+        Die Werte werden durch start_polling() bzw. die Worker-Prozesse (processes) erfasst.
+
+        :param table: Bestehende SharedValueTable; ohne Angabe wird eine mit einem Kanal pro
+                      Registerwert der konfigurierten Geräte angelegt
+        :param name: Name des neu anzulegenden Shared-Memory-Segments (Standard: automatisch)
+        :return: Die SharedValueTable (ihr Name steht in table.name)
+        """
+        if table is None:
+            shared_values = _sibling("shared_values")
+            table = shared_values.SharedValueTable(name, shared_values.channels_from_config(self.config))
+        self.table = table
+        self.add_sink(table.sink(self.device_names()))
+        return table
+
+    def record_history(self, history=None, capacity=10000, levels=4, factor=10):
+        """
+        Zeichnet ab sofort alle Pollergebnisse in einem Verlaufsspeicher mit mehreren
+        Auflösungsstufen auf (siehe data_functions.HistoryStore), z. B. für Live-Plots.
+
+        :param history: Bestehender HistoryStore (z. B. gemeinsam mit den Reglern genutzt)
+        :param capacity: Einträge pro Stufe und Kanal für einen neuen HistoryStore
+        :param levels: Anzahl der Auflösungsstufen für einen neuen HistoryStore
+        :param factor: Verdichtungsfaktor zwischen zwei Stufen für einen neuen HistoryStore
+        :return: Der HistoryStore
+        """
+        if history is None:
+            history = _sibling("data_functions").HistoryStore(capacity, levels, factor)
+        self.history = history
+        self.add_sink(history.sink(self.device_names()))
+        return history
+
+    def _start_shards(self, processes, rate, options):
+        """
+        Verteilt die Geräte auf Worker-Prozesse und übernimmt deren Stellvertreter und Startberichte.
+        """
+        self.shards = _sibling("modbus_shards").ShardSet(self.config, processes, rate, options)
+        self.devices = self.shards.devices
+        for name, (driver, seconds, error) in self.shards.startup_report.items():
+            self.startup_report[name] = DeviceStartup(name, driver, seconds, error)
+        self.print_startup_report()
+
+    def close(self):
+        """
+        Stoppt das Polling, schließt alle Verbindungen und beendet eine laufende Simulation.
+        """
+        self.stop_polling()
+        if self.table is not None:
+            self.table.close()
+            self.table = None
+        if self.shards is not None:
+            self.shards.close()
+            self.shards = None
+            return
+        for device in self.devices.values():
+            device.disable_command_queue()
+            device.client.close()
+        if self.pool is not None:
+            self.pool.close_all()
+        if self.recorder is not None:
+            self.recorder.close()
+        if self.simulator is not None:
+            self.simulator.stop()
+            self.simulator = None
+
+    def device_at(self, ip, unit_id=1, port=SERVER_PORT):
+        """
+        Liefert das Gerät mit der angegebenen Adresse.
 
+        :return: Geräteobjekt oder None
+        """
+        device_key = self.index.by_unit.get((ip, port, unit_id))
+        return None if device_key is None else self.devices.get(device_key)
+
+    def devices_of(self, driver):
+        """
+        Liefert alle eingerichteten Geräte eines Treibertyps (z. B. "mks_modbus").
+
+        :return: Dictionary Gerätename -> Geräteobjekt
+        """
+        return {key: self.devices[key] for key in self.index.devices(driver) if key in self.devices}
+
+    def start_polling(self, rates=1.0):
+        """
+        Fragt alle Geräte über einen gemeinsamen DevicePoller im Hintergrund ab.
 
-class Modbus_Coupon:
-    def __init__(self, ip, port=SERVER_PORT, unit_id=1, timeout=0.2):
+        :param rates: Abfragerate in Hz für alle Werte, ein Dictionary Name -> Hz, das für alle
+                      Geräte gilt, oder ein Dictionary Gerätename -> Rate(n)
+        :return: Der DevicePoller (None bei verteilter Erfassung, die Worker fragen bereits zyklisch ab)
+        """
+        if self.shards is not None:
+            return None
+        if self.poller is None:
+            self.poller = DevicePoller("MOD_TCP-Poller")
+            for sink in self.sinks:
+                self.poller.add_sink(sink)
+        for device_key, device in self.devices.items():
+            device_rates = rates
+            if isinstance(rates, dict) and device_key in rates:
+                device_rates = rates[device_key]
+            if isinstance(device_rates, dict):
+                device_rates = {name: rate for name, rate in device_rates.items() if name in device.REGISTERS}
+                if not device_rates:
+                    continue
+            device.start_polling(device_rates, self.poller)
+        return self.poller
+
+    async def poll_all(self, names=None):
+        """
+        Liest alle Geräte gleichzeitig über die asynchronen Clients.
+        Die Zykluszeit ist damit durch das langsamste Gerät begrenzt, nicht durch die Summe;
+        als ausgefallen markierte Geräte (available == False) werden übersprungen.
+
+        :param names: Iterable der Wertnamen oder None für alle Werte des jeweiligen Registerabbilds
+        :return: Dictionary Gerätename -> RegisterSnapshot (None bei Fehler)
+        """
+        import asyncio
+        keys = [key for key, device in self.devices.items() if device.available]
+        results = await asyncio.gather(
+            *(self.devices[key].async_snapshot(
+                None if names is None else [name for name in names if name in self.devices[key].REGISTERS])
+              for key in keys),
+            return_exceptions=True)
+        snapshots = dict.fromkeys(self.devices)
+        for key, result in zip(keys, results):
+            if isinstance(result, Exception):
+                print(f"Fehler beim Abfragen von {key}: {result}")
+                result = None
+            snapshots[key] = result
+        return snapshots
+
+    async def async_close(self):
+        """
+        Schließt die asynchronen Verbindungen aller Geräte.
+        """
+        import asyncio
+        await asyncio.gather(*(device.async_close() for device in self.devices.values()))
+
+    def stop_polling(self):
+        """
+        Stoppt das Hintergrund-Polling aller Geräte.
+        """
+        if self.poller is not None:
+            self.poller.stop()
+            for device in self.devices.values():
+                device.stop_polling()
+            self.poller = None
+
+
+class Modbus_Coupon(ModbusDevice):
+    REGISTERS = RegisterMap([
+        RegisterField("setpoint", 2100),
+    ])
+
+    def __init__(self, ip, port=SERVER_PORT, unit_id=1, timeout=0.2, client=None):
         """
         Initialisiert den Modbus-Client.
         
@@ -102,9 +1766,14 @@ class Modbus_Coupon:
         :param port: Port (Standard: 502)
         :param unit_id: Slave-/Unit-ID des Geräts (falls benötigt)
         :param timeout: Timeout in Sekunden
+        :param client: Bereits vorhandener Client (z. B. UnitHandle aus einem ConnectionPool);
+                       port, unit_id und timeout werden dann ignoriert
         """
-        self.client = ModbusClient(host=ip, port=port, auto_open=True, timeout=timeout)
-        self.client.unit_id = unit_id
+        if client is not None:
+            self.client = client
+        else:
+            self.client = _modbus_client(ip, port, timeout)
+            self.client.unit_id = unit_id
         
     @property
     def stop(self):
@@ -122,12 +1791,29 @@ class Modbus_Coupon:
         :param value: Float-Wert, der gesetzt werden soll.
         :return: Boolean, ob das Schreiben erfolgreich war.
         """
+        return self._write(2100, int(value), self._send_value)
+
+    def _send_value(self, value):
         # Schreibe die Register 
-        success = self.client.write_multiple_registers(2100, [int(value)])
+        success = self._execute(CommandPriority.write, self.client.write_multiple_registers, 2100, [value])
         return success
 
-class Modbus_MFC_MKS:
-    def __init__(self, ip, port=SERVER_PORT, unit_id=1, timeout=0.2):
+    async def async_set(self, value):
+        """
+        Asynchrones Gegenstück zu set().
+        """
+        return await self.async_client.write_multiple_registers(2100, [int(value)])
+
+class Modbus_MFC_MKS(ModbusDevice):
+    REGISTERS = RegisterMap([
+        RegisterField("flow", 0x4000, FLOAT32_BE, RegisterTable.input),
+        RegisterField("temp", 0x4002, FLOAT32_BE, RegisterTable.input),
+        RegisterField("valve", 0x4004, FLOAT32_BE, RegisterTable.input),
+        RegisterField("current_setpoint", 0xA000, FLOAT32_BE),
+        RegisterField("modbus_control", 0xA006, FLOAT32_BE),
+    ])
+
+    def __init__(self, ip, port=SERVER_PORT, unit_id=1, timeout=0.2, client=None):
         """
         Initialisiert den Modbus-Client.
         
@@ -135,9 +1821,14 @@ class Modbus_MFC_MKS:
         :param port: Port (Standard: 502)
         :param unit_id: Slave-/Unit-ID des Geräts (falls benötigt)
         :param timeout: Timeout in Sekunden
+        :param client: Bereits vorhandener Client (z. B. UnitHandle aus einem ConnectionPool);
+                       port, unit_id und timeout werden dann ignoriert
         """
-        self.client = ModbusClient(host=ip, port=port, auto_open=True, timeout=timeout)
-        self.client.unit_id = unit_id
+        if client is not None:
+            self.client = client
+        else:
+            self.client = _modbus_client(ip, port, timeout)
+            self.client.unit_id = unit_id
     @property
     def stop(self):
         """
@@ -153,12 +1844,7 @@ class Modbus_MFC_MKS:
         Liest den Flow (sccm, als 32-Bit Float) aus den Input-Registern ab Adresse 0x4000.
         """
         try:
-            regs = self.client.read_input_registers(0x4000, 2)
-            if regs:
-                # Wandelt die zwei 16-Bit Register in einen 32-Bit Float um (Big-Endian)
-                return struct.unpack('>f', struct.pack('>HH', regs[0], regs[1]))[0]
-            else:
-                return None  # Falls keine Daten empfangen wurden
+            return self._read("flow")
         except Exception as e:
             print(f"Fehler beim Lesen des Flow-Werts: {e}")
             return None
@@ -177,55 +1863,41 @@ class Modbus_MFC_MKS:
         """
         Liest die Temperatur (degC, als 32-Bit Float) aus den Input-Registern ab Adresse 0x4002.
         """
-        regs = self.client.read_input_registers(0x4002, 2)
-        if regs:
-            return struct.unpack('>f', struct.pack('>HH', regs[0], regs[1]))[0]
-        else:
-            return None
+        return self._read("temp")
 
     @property
     def valve(self):
         """
         Liest die Ventilstellung (0-100%, als 32-Bit Float) aus den Input-Registern ab Adresse 0x4004.
         """
-        regs = self.client.read_input_registers(0x4004, 2)
-        if regs:
-            return struct.unpack('>f', struct.pack('>HH', regs[0], regs[1]))[0]
-        else:
-            return None
+        return self._read("valve")
         
     @property
     def modbus_control(self):
         """
         Prüft, ob Full Modbus Control aktiviert ist (Register 0xA006).
         """
-        regs = self.client.read_holding_registers(0xA006, 2)
-        if regs:
-            return struct.unpack('>f', struct.pack('>HH', regs[0], regs[1]))[0]
-        return None
+        return self._read("modbus_control")
 
     @property
     def current_setpoint(self):
         """
         Liest den aktuellen Flow-Setpoint aus Register 0xA000.
         """
-        regs = self.client.read_holding_registers(0xA000, 2)
-        if regs:
-            return struct.unpack('>f', struct.pack('>HH', regs[0], regs[1]))[0]
-        return None
+        return self._read("current_setpoint")
     @property
     def close_valve(self):
         """
         Schließt das Ventil vollständig (Register 0xE002, Wert 0xFF00).
         """
-        success = self.client.write_single_coil(0xE002, 0xFF00)
+        success = self._execute(CommandPriority.safety, self.client.write_single_coil, 0xE002, 0xFF00)
         return success
     @property
     def release_valve(self):
         """
         Gibt das Ventil wieder frei (Register 0xE002, Wert 0x0000).
         """
-        success = self.client.write_single_coil(0xE002, 0x0000)
+        success = self._execute(CommandPriority.write, self.client.write_single_coil, 0xE002, 0x0000)
         return success
     
     @property
@@ -236,7 +1908,7 @@ class Modbus_MFC_MKS:
         
         :return: Boolean, ob das Schreiben erfolgreich war.
         """
-        success = self.client.write_single_coil(0xE003, 1)
+        success = self._execute(CommandPriority.write, self.client.write_single_coil, 0xE003, 1)
         return success
 
     def set(self, value, callback=None):
@@ -249,14 +1921,39 @@ class Modbus_MFC_MKS:
         :return: Boolean, ob das Schreiben erfolgreich war.
         """
         #self.release_valve
-        # Float-Wert in 4 Byte (32-Bit IEEE754) umwandeln, Big-Endian
-        packed = struct.pack('>f', value)
-        # Aufteilen in zwei 16-Bit Register (unsigned short)
-        registers = struct.unpack('>HH', packed)
+        return self._write(0xA000, value, self._send_setpoint)
+
+    def _send_setpoint(self, value):
+        # Float-Wert als 32-Bit IEEE754 in zwei 16-Bit Register (High-Word zuerst) umwandeln
+        registers = FLOAT32_BE.encode(value)
         # Schreibe die Register ab Adresse 0xA000
-        success = self.client.write_multiple_registers(0xA000, list(registers))
+        success = self._execute(CommandPriority.write, self.client.write_multiple_registers, 0xA000, registers)
         return success
 
+    async def async_set(self, value):
+        """
+        Asynchrones Gegenstück zu set().
+        """
+        return await self.async_client.write_multiple_registers(0xA000, FLOAT32_BE.encode(value))
+
+    async def async_close_valve(self):
+        """
+        Asynchrones Gegenstück zu close_valve.
+        """
+        return await self.async_client.write_single_coil(0xE002, 0xFF00)
+
+    async def async_release_valve(self):
+        """
+        Asynchrones Gegenstück zu release_valve.
+        """
+        return await self.async_client.write_single_coil(0xE002, 0x0000)
+
+    async def async_zero_flow(self):
+        """
+        Asynchrones Gegenstück zu zero_flow.
+        """
+        return await self.async_client.write_single_coil(0xE003, 1)
+
 
 # Beispiel für die Verwendung der Klasse:
 if __name__ == "__main__":
@@ -267,6 +1964,8 @@ if __name__ == "__main__":
     print("Flow:", MFC.flow, "sccm")
     print("Temp:", MFC.temp, "degC")
     print("Valve:", MFC.valve, "%")
+    # Flow, Temperatur und Ventilstellung in einem einzigen Zugriff
+    print("Snapshot:", MFC.snapshot(("flow", "temp", "valve")))
      # Prüfe den Modbus Control-Status
     modbus_status = MFC.modbus_control
     #print("Modbus Control aktiv?", modbus_status)
@@ -283,7 +1982,7 @@ if __name__ == "__main__":
     #MFC.close_valve # Ventil vollständig schließen
     #MFC.release_valve
 
-class Modbus_Pump:
+class Modbus_Pump(ModbusDevice):
     """
     Diese Klasse stellt die Kommunikation zu einer Modbus-gesteuerten Pumpe bereit.
     
@@ -293,18 +1992,36 @@ class Modbus_Pump:
     REGISTER_SIZE = 16
     MAX_REGISTER_RANGE = 1 << REGISTER_SIZE  # Maximale Anzahl darstellbarer Werte (0 inklusive)
     STEPS_PER_REV = 51200
+    # Alle Statusregister liegen zwischen 0x21 und 0x86 und passen in einen Blockzugriff. Lehnt
+    # eine Pumpe den Block wegen der Lücken ab, liest RegisterMap für diese Pumpe danach nur noch wertweise.
+    REGISTERS = RegisterMap([
+        RegisterField("error", 0x0021),
+        RegisterField("moving", 0x004A),
+        RegisterField("output_fault", 0x004E),
+        RegisterField("position", 0x0057, INT32_LOW_FIRST),
+        RegisterField("stalled", 0x007B),
+        RegisterField("velocity", 0x0085, INT32_LOW_FIRST),
+    ], max_gap=48)
 
-    def __init__(self, ip_address):
+    def __init__(self, ip_address, port=SERVER_PORT, lazy=False, client=None):
         """
         Initialisiert den Modbus-Client für die Pumpe und konfiguriert die Lese- und Schreibaktionen.
         
         :param ip_address: IP-Adresse der Pumpe.
-        :raises Exception: Falls keine Verbindung hergestellt werden kann.
+        :param port: Port (Standard: 502)
+        :param lazy: Verbindungsaufbau und Initialisierungssequenz erst beim ersten Zugriff ausführen
+        :param client: Bereits vorhandener Client (z. B. UnitHandle aus einem ConnectionPool)
+        :raises Exception: Falls keine Verbindung hergestellt werden kann (nur ohne lazy).
         """
-        self.client = ModbusClient(host=ip_address, port=SERVER_PORT, auto_open=True, timeout=0.2)
-        if not self.client.open():
-            raise Exception(f"Verbindung zu {ip_address} konnte nicht hergestellt werden.")
+        self.ip_address = ip_address
+        if client is not None:
+            self.client = client
+        else:
+            self.client = _modbus_client(ip_address, port, 0.2)
         self.bus_semaphore = Lock()
+        self.ready = False
+        self._initializing = False
+        self._init_lock = RLock()
         
         # Initialisiere Schreibaktionen als Dictionary von WriteCommand-Instanzen.
         self.__writeActions = {
@@ -331,13 +2048,35 @@ class Modbus_Pump:
             "position": self.ReadCommand(self, 0x0057, 2)
         }
         
-        # Setze Standardwerte und starte den Motor in einem sicheren Zustand.
-        self.write_encodeEnable(1)
-        self.write_error(0)
-        self.write_position(0)
-        self.write_makeUp(1)
-        self.halt()
-        self.polling_thread = None
+        if not lazy:
+            self.ensure_ready()
+
+    def ensure_ready(self):
+        """
+        Öffnet die Verbindung und führt die Initialisierungssequenz aus, falls das noch nicht
+        geschehen ist. Wird bei lazy-Initialisierung vor dem ersten Buszugriff aufgerufen.
+
+        :raises Exception: Falls keine Verbindung hergestellt werden kann.
+        """
+        if self.ready:
+            return
+        with self._init_lock:
+            # Die Schreibbefehle der Initialisierungssequenz rufen ensure_ready() erneut auf.
+            if self.ready or self._initializing:
+                return
+            self._initializing = True
+            try:
+                if not self.client.open():
+                    raise Exception(f"Verbindung zu {self.ip_address} konnte nicht hergestellt werden.")
+                # Setze Standardwerte und starte den Motor in einem sicheren Zustand.
+                self.write_encodeEnable(1)
+                self.write_error(0)
+                self.write_position(0)
+                self.write_makeUp(1)
+                self.halt()
+                self.ready = True
+            finally:
+                self._initializing = False
 
     def convert_value_to_register(self, value, value_range, register_count):
         """
@@ -345,7 +2084,7 @@ class Modbus_Pump:
         
         Der Wert wird in den zulässigen Bereich begrenzt. Falls der Bereich kleiner als der
         maximal darstellbare Registerbereich ist, wird ein einzelner Wert zurückgegeben;
-        ansonsten werden zwei Register (High- und Low-Register) zurückgegeben.
+        ansonsten werden zwei Register (Low- und High-Register) zurückgegeben.
         
         :param value: Der einzustellende Wert.
         :param value_range: Tupel (min, max) des zulässigen Bereichs.
@@ -360,9 +2099,7 @@ class Modbus_Pump:
         if abs_range < self.MAX_REGISTER_RANGE:
             return [value]
         else:
-            high_register = (value >> self.REGISTER_SIZE) & 0xFFFF
-            low_register = value & 0xFFFF
-            return [low_register, high_register]
+            return INT32_LOW_FIRST.encode(value)
 
     class ReadCommand:
         """
@@ -381,8 +2118,32 @@ class Modbus_Pump:
             
             :return: Gelesener Wert oder False bei Fehler.
             """
+            return self.submit().result()
+
+        def submit(self):
+            """
+            Reiht die Leseaktion in die CommandQueue der Pumpe ein (ohne aktive CommandQueue
+            wird sie sofort ausgeführt).
+
+            :return: Future mit dem gelesenen Wert oder False bei Fehler.
+            """
+            self.modbus.ensure_ready()
+            return self.modbus._execute(CommandPriority.read, self._get_value, key=("read", self.register), wait=False)
+
+        def _get_value(self):
             with self.modbus.bus_semaphore:
                 regs = self.modbus.client.read_holding_registers(self.register, self.register_count)
+            return self._decode(regs)
+
+        async def async_get_value(self):
+            """
+            Asynchrones Gegenstück zu get_value().
+            """
+            await self.modbus.async_ensure_ready()
+            regs = await self.modbus.async_client.read_holding_registers(self.register, self.register_count)
+            return self._decode(regs)
+
+        def _decode(self, regs):
             if regs is None:
                 print("Kommunikationsfehler: Kein Wert empfangen.")
                 return False
@@ -390,12 +2151,7 @@ class Modbus_Pump:
                 print("Unerwartete Länge der Rückgabe.")
                 return False
             if len(regs) == 2:
-                low_reg, high_reg = regs
-                combined = (high_reg << 16) | low_reg
-                # Vorzeichenanpassung, falls notwendig
-                if combined & (1 << 31):
-                    combined -= (1 << 32)
-                regs = [combined]
+                return INT32_LOW_FIRST.decode(regs)
             return regs[0]
 
     class WriteCommand:
@@ -417,7 +2173,22 @@ class Modbus_Pump:
             :param value: Der einzustellende Wert.
             :return: True bei Erfolg, sonst False.
             """
+            return self.submit(value).result()
+
+        def submit(self, value: int, priority=CommandPriority.write):
+            """
+            Reiht die Schreibaktion in die CommandQueue der Pumpe ein (ohne aktive CommandQueue
+            wird sie sofort ausgeführt).
+
+            :param value: Der einzustellende Wert.
+            :param priority: CommandPriority des Befehls (z. B. safety für halt).
+            :return: Future mit True bei Erfolg, sonst False.
+            """
+            self.modbus.ensure_ready()
             reg_value = self.modbus.convert_value_to_register(value, self.value_range, self.register_count)
+            return self.modbus._execute(priority, self._set_registers, reg_value, wait=False)
+
+        def _set_registers(self, reg_value):
             with self.modbus.bus_semaphore:
                 res = self.modbus.client.write_multiple_registers(self.register, reg_value)
             if res:
@@ -428,6 +2199,20 @@ class Modbus_Pump:
             self.modbus.write_error(0)
             return False
 
+        async def async_set_value(self, value: int) -> bool:
+            """
+            Asynchrones Gegenstück zu set_value().
+            """
+            await self.modbus.async_ensure_ready()
+            reg_value = self.modbus.convert_value_to_register(value, self.value_range, self.register_count)
+            client = self.modbus.async_client
+            if await client.write_multiple_registers(self.register, reg_value):
+                return True
+            print("Modbus-Fehler:", client.last_error_as_txt)
+            print("Ausnahme:", client.last_except)
+            await self.modbus.async_write("error", 0)
+            return False
+
     # ---------------------------
     # Properties für Leseaktionen
     # ---------------------------
@@ -438,7 +2223,7 @@ class Modbus_Pump:
         
         :return: Wert des 'stalled'-Status oder False bei Fehler.
         """
-        return self.__readActions["stalled"].get_value()
+        return self._read("stalled", self.__readActions["stalled"].get_value)
 
     @property
     def moving(self):
@@ -447,7 +2232,7 @@ class Modbus_Pump:
         
         :return: Wert des 'moving'-Status oder False bei Fehler.
         """
-        return self.__readActions["moving"].get_value()
+        return self._read("moving", self.__readActions["moving"].get_value)
 
     @property
     def output_fault(self):
@@ -456,7 +2241,7 @@ class Modbus_Pump:
         
         :return: Wert des 'outputFault'-Status oder False bei Fehler.
         """
-        return self.__readActions["outputFault"].get_value()
+        return self._read("output_fault", self.__readActions["outputFault"].get_value)
 
     @property
     def error(self):
@@ -465,7 +2250,7 @@ class Modbus_Pump:
         
         :return: Wert des 'error'-Status oder False bei Fehler.
         """
-        return self.__readActions["error"].get_value()
+        return self._read("error", self.__readActions["error"].get_value)
 
     @property
     def velocity(self):
@@ -474,7 +2259,7 @@ class Modbus_Pump:
         
         :return: Geschwindigkeit oder False bei Fehler.
         """
-        return self.__readActions["velocity"].get_value()
+        return self._read("velocity", self.__readActions["velocity"].get_value)
 
     @property
     def position(self):
@@ -483,7 +2268,7 @@ class Modbus_Pump:
         
         :return: Position oder False bei Fehler.
         """
-        return self.__readActions["position"].get_value()
+        return self._read("position", self.__readActions["position"].get_value)
 
     # ---------------------------
     # Methoden für Schreibaktionen
@@ -495,7 +2280,7 @@ class Modbus_Pump:
         :param value: Der einzustellende 'slew'-Wert.
         :return: True bei Erfolg, sonst False.
         """
-        return self.__writeActions["slew"].set_value(value)
+        return self._write(0x0078, value, self.__writeActions["slew"].set_value)
 
     def write_holdCurrent(self, value: int) -> bool:
         """
@@ -590,8 +2375,67 @@ class Modbus_Pump:
     def halt(self):
         """
         Stoppt den Motor, indem der 'slew'-Wert auf 0 gesetzt wird.
+        Der Befehl umgeht eine aktive Write-Behind-Schicht und verwirft dort ausstehende Werte;
+        in einer aktiven CommandQueue wird er vor allen wartenden Befehlen ausgeführt.
+        """
+        if self.write_behind is not None:
+            self.write_behind.forget(0x0078)
+        self.__writeActions["slew"].submit(0, CommandPriority.safety).result()
+
+    def submit_read(self, action: str):
+        """
+        Reiht eine Leseaktion (z. B. "velocity") ein, ohne auf das Ergebnis zu warten.
+
+        :param action: Name der Leseaktion
+        :return: concurrent.futures.Future mit dem gelesenen Wert oder False bei Fehler.
+        """
+        return self.__readActions[action].submit()
+
+    def submit_write(self, action: str, value: int, priority=CommandPriority.write):
+        """
+        Reiht eine Schreibaktion (z. B. "slew") ein, ohne auf das Ergebnis zu warten.
+        Eine aktive Write-Behind-Schicht wird dabei umgangen.
+
+        :param action: Name der Schreibaktion
+        :param value: Der einzustellende Wert.
+        :param priority: CommandPriority des Befehls
+        :return: concurrent.futures.Future mit True bei Erfolg, sonst False.
+        """
+        return self.__writeActions[action].submit(value, priority)
+
+    # ---------------------------
+    # Asynchrone Gegenstücke
+    # ---------------------------
+    async def async_read(self, action: str):
+        """
+        Liest eine Leseaktion asynchron (z. B. "velocity" oder "position").
+
+        :param action: Name der Leseaktion
+        :return: Gelesener Wert oder False bei Fehler.
+        """
+        return await self.__readActions[action].async_get_value()
+
+    async def async_write(self, action: str, value: int) -> bool:
+        """
+        Führt eine Schreibaktion asynchron aus (z. B. "slew").
+
+        :param action: Name der Schreibaktion
+        :param value: Der einzustellende Wert.
+        :return: True bei Erfolg, sonst False.
+        """
+        return await self.__writeActions[action].async_set_value(value)
+
+    async def async_halt(self):
+        """
+        Asynchrones Gegenstück zu halt().
+        """
+        return await self.async_write("slew", 0)
+
+    async def async_set_Flow(self, flow: float, a: float, b: float) -> bool:
+        """
+        Asynchrones Gegenstück zu set_Flow().
         """
-        self.write_slew(0)
+        return await self.async_write("slew", int(flow * a + b))
 
     def set_Flow(self, flow: float, a: float, b: float) -> bool:
         """
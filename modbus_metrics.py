@@ -0,0 +1,342 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Instrumentierung der Modbus-Transaktionen: Latenz-Histogramme, Timeouts, Exception-Codes und
+übertragene Bytes pro Gerät und Register.
+
+Ein InstrumentedClient umhüllt den Client eines Treibers (ModbusClient oder UnitHandle) und
+misst jede Transaktion; die Werte sammelt ein gemeinsames ModbusMetrics-Objekt. Die Erfassung
+kostet pro Transaktion nur eine Zeitmessung und einen kurzen Lock und kann daher im Betrieb
+aktiv bleiben.
+"""
+from threading import Lock
+from bisect import bisect_left
+from pyModbusTCP.constants import MB_NO_ERR, MB_TIMEOUT_ERR, MB_EXCEPT_ERR, MB_ERR_TXT
+import time
+
+# Obergrenzen der Histogramm-Klassen in Sekunden (die letzte Klasse ist +Inf)
+LATENCY_BUCKETS = (0.001, 0.002, 0.005, 0.01, 0.02, 0.05, 0.1, 0.2, 0.5, 1.0)
+
+MBAP_SIZE = 7  # Modbus-TCP-Header inklusive Unit-ID
+
+
+def frame_sizes(function, count):
+    """
+    Größe von Anfrage und Antwort einer erfolgreichen Transaktion in Bytes (MBAP-Header plus PDU).
+
+    :param function: Name der Client-Methode (z. B. "read_holding_registers")
+    :param count: Anzahl der gelesenen bzw. geschriebenen Register oder Bits
+    :return: Tupel (gesendet, empfangen)
+    """
+    if function in ("read_holding_registers", "read_input_registers"):
+        return MBAP_SIZE + 5, MBAP_SIZE + 2 + 2 * count
+    if function in ("read_coils", "read_discrete_inputs"):
+        return MBAP_SIZE + 5, MBAP_SIZE + 2 + (count + 7) // 8
+    if function == "write_multiple_registers":
+        return MBAP_SIZE + 6 + 2 * count, MBAP_SIZE + 5
+    if function == "write_multiple_coils":
+        return MBAP_SIZE + 6 + (count + 7) // 8, MBAP_SIZE + 5
+    return MBAP_SIZE + 5, MBAP_SIZE + 5
+
+
+class _Series:
+    """
+    Messwerte einer Kombination aus Gerät, Funktion und Register.
+    """
+    __slots__ = ("count", "total", "max", "buckets", "timeouts", "errors", "exceptions", "sent", "received")
+
+    def __init__(self, bucket_count):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.buckets = [0] * bucket_count
+        self.timeouts = 0
+        self.errors = {}      # Fehlertext -> Anzahl (ohne Timeouts und Modbus-Exceptions)
+        self.exceptions = {}  # Modbus-Exception-Code -> Anzahl
+        self.sent = 0
+        self.received = 0
+
+
+class ModbusMetrics:
+    """
+    Sammelt die Messwerte aller instrumentierten Clients.
+    """
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        """
+        :param buckets: Aufsteigende Obergrenzen der Latenzklassen in Sekunden
+        """
+        self.buckets = tuple(buckets)
+        self._series = {}  # (Gerät, Funktion, Register) -> _Series
+        self._lock = Lock()
+
+    def instrument(self, client, device):
+        """
+        Umhüllt einen Client, sodass alle seine Transaktionen erfasst werden.
+
+        :param client: ModbusClient oder Objekt mit derselben API (z. B. UnitHandle)
+        :param device: Name des Geräts, unter dem die Werte erfasst werden
+        :return: InstrumentedClient
+        """
+        return InstrumentedClient(client, self, device)
+
+    def record(self, device, function, register, seconds, error=MB_NO_ERR, exception=0, count=0):
+        """
+        Erfasst eine Transaktion.
+
+        :param device: Name des Geräts
+        :param function: Name der Client-Methode
+        :param register: Startadresse
+        :param seconds: Dauer der Transaktion
+        :param error: pyModbusTCP-Fehlercode (last_error) oder Fehlertext
+        :param exception: Modbus-Exception-Code (last_except), falls error == MB_EXCEPT_ERR
+        :param count: Anzahl der übertragenen Register bzw. Bits
+        """
+        key = (device, function, register)
+        index = bisect_left(self.buckets, seconds)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = _Series(len(self.buckets) + 1)
+            series.count += 1
+            series.total += seconds
+            if seconds > series.max:
+                series.max = seconds
+            series.buckets[index] += 1
+            if error == MB_NO_ERR:
+                sent, received = frame_sizes(function, count)
+                series.sent += sent
+                series.received += received
+            elif error == MB_TIMEOUT_ERR:
+                series.timeouts += 1
+                series.sent += frame_sizes(function, count)[0]
+            elif error == MB_EXCEPT_ERR:
+                series.exceptions[exception] = series.exceptions.get(exception, 0) + 1
+                series.sent += frame_sizes(function, count)[0]
+                series.received += MBAP_SIZE + 2
+            else:
+                text = MB_ERR_TXT.get(error, str(error)) if isinstance(error, int) else error
+                series.errors[text] = series.errors.get(text, 0) + 1
+
+    def reset(self):
+        """
+        Verwirft alle bisherigen Messwerte.
+        """
+        with self._lock:
+            self._series = {}
+
+    def _copy(self):
+        with self._lock:
+            return [(key, _clone(series)) for key, series in self._series.items()]
+
+    def quantile(self, buckets, q):
+        """
+        Schätzt ein Quantil aus den Histogramm-Klassen (Obergrenze der Klasse, in der es liegt).
+
+        :return: Latenz in Sekunden oder None ohne Messwerte (float("inf") oberhalb der letzten Grenze)
+        """
+        total = sum(buckets)
+        if not total:
+            return None
+        rank = q * total
+        seen = 0
+        for bound, hits in zip(self.buckets + (float("inf"),), buckets):
+            seen += hits
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+    def stats(self, device=None):
+        """
+        Liefert die Messwerte zusammengefasst pro Gerät und pro Register.
+
+        :param device: Nur dieses Gerät (Standard: alle)
+        :return: Dictionary Gerät -> Kennzahlen, darunter "registers" mit den Kennzahlen pro
+                 (Funktion, Register)
+        """
+        totals = {}
+        registers = {}
+        for (name, function, register), series in self._copy():
+            if device is not None and name != device:
+                continue
+            if name not in totals:
+                totals[name] = _Series(len(self.buckets) + 1)
+                registers[name] = {}
+            _merge(totals[name], series)
+            registers[name][(function, register)] = self._summary(series)
+        result = {}
+        for name, series in totals.items():
+            result[name] = self._summary(series)
+            result[name]["registers"] = registers[name]
+        return result
+
+    def _summary(self, series):
+        return {
+            "requests": series.count,
+            "timeouts": series.timeouts,
+            "exceptions": dict(series.exceptions),
+            "errors": dict(series.errors),
+            "bytes_sent": series.sent,
+            "bytes_received": series.received,
+            "mean_s": series.total / series.count if series.count else None,
+            "p50_s": self.quantile(series.buckets, 0.50),
+            "p95_s": self.quantile(series.buckets, 0.95),
+            "p99_s": self.quantile(series.buckets, 0.99),
+            "max_s": series.max if series.count else None,
+        }
+
+    def slowest(self, n=5):
+        """
+        :return: Die n Geräte mit der höchsten mittleren Latenz als Liste (Gerät, Kennzahlen)
+        """
+        ranked = [(name, entry) for name, entry in self.stats().items() if entry["requests"]]
+        ranked.sort(key=lambda item: item[1]["mean_s"], reverse=True)
+        return ranked[:n]
+
+    def prometheus(self, prefix="modbus"):
+        """
+        Gibt alle Messwerte im Textformat von Prometheus aus.
+
+        :param prefix: Präfix der Metriknamen
+        :return: Text (z. B. als Antwort eines /metrics-Endpunkts)
+        """
+        series_list = sorted(self._copy(), key=lambda item: (item[0][0], item[0][1], item[0][2]))
+        duration = f"{prefix}_request_duration_seconds"
+        lines = [f"# HELP {duration} Dauer der Modbus-Transaktionen",
+                 f"# TYPE {duration} histogram"]
+        for key, series in series_list:
+            labels = _labels(key)
+            cumulative = 0
+            for bound, hits in zip(self.buckets + (float("inf"),), series.buckets):
+                cumulative += hits
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f'{duration}_bucket{{{labels},le="{le}"}} {cumulative}')
+            lines.append(f"{duration}_sum{{{labels}}} {series.total!r}")
+            lines.append(f"{duration}_count{{{labels}}} {series.count}")
+
+        counters = (
+            ("timeouts_total", "Anzahl der Timeouts", lambda s: [("", s.timeouts)]),
+            ("exceptions_total", "Anzahl der Modbus-Exceptions nach Code",
+             lambda s: [(f',code="{code}"', hits) for code, hits in sorted(s.exceptions.items())]),
+            ("errors_total", "Anzahl sonstiger Kommunikationsfehler",
+             lambda s: [(f',error="{_escape(text)}"', hits) for text, hits in sorted(s.errors.items())]),
+            ("bytes_sent_total", "Gesendete Bytes", lambda s: [("", s.sent)]),
+            ("bytes_received_total", "Empfangene Bytes", lambda s: [("", s.received)]),
+        )
+        for suffix, help_text, samples in counters:
+            name = f"{prefix}_{suffix}"
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} counter")
+            for key, series in series_list:
+                labels = _labels(key)
+                for extra, value in samples(series):
+                    lines.append(f"{name}{{{labels}{extra}}} {value}")
+        return "\n".join(lines) + "\n"
+
+
+def _clone(series):
+    copy = _Series(len(series.buckets))
+    _merge(copy, series)
+    return copy
+
+
+def _merge(target, series):
+    target.count += series.count
+    target.total += series.total
+    target.max = max(target.max, series.max)
+    target.buckets = [a + b for a, b in zip(target.buckets, series.buckets)]
+    target.timeouts += series.timeouts
+    for text, hits in series.errors.items():
+        target.errors[text] = target.errors.get(text, 0) + hits
+    for code, hits in series.exceptions.items():
+        target.exceptions[code] = target.exceptions.get(code, 0) + hits
+    target.sent += series.sent
+    target.received += series.received
+
+
+def _escape(text):
+    return str(text).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(key):
+    device, function, register = key
+    return f'device="{_escape(device)}",function="{function}",register="{register}"'
+
+
+class InstrumentedClient:
+    """
+    Client-Hülle mit der API des pyModbusTCP-ModbusClient, die jede Transaktion in einem
+    ModbusMetrics-Objekt erfasst. Alle übrigen Attribute werden an den inneren Client durchgereicht.
+    """
+
+    def __init__(self, client, metrics, device):
+        """
+        :param client: Innerer Client (ModbusClient, UnitHandle, ...)
+        :param metrics: ModbusMetrics, in dem die Transaktionen erfasst werden
+        :param device: Name des Geräts
+        """
+        self.client = client
+        self.metrics = metrics
+        self.device = device
+
+    def __getattr__(self, name):
+        if name == "client":
+            raise AttributeError(name)
+        return getattr(self.client, name)
+
+    @property
+    def unit_id(self):
+        return self.client.unit_id
+
+    @unit_id.setter
+    def unit_id(self, value):
+        self.client.unit_id = value
+
+    @property
+    def timeout(self):
+        return self.client.timeout
+
+    @timeout.setter
+    def timeout(self, value):
+        self.client.timeout = value
+
+    def _call(self, function, address, count, *args):
+        start = time.perf_counter()
+        try:
+            result = getattr(self.client, function)(address, *args)
+        except Exception as e:
+            self.metrics.record(self.device, function, address, time.perf_counter() - start,
+                                error=type(e).__name__, count=count)
+            raise
+        elapsed = time.perf_counter() - start
+        if result is None or result is False:
+            error = getattr(self.client, "last_error", None) or "no response"
+            exception = getattr(self.client, "last_except", 0)
+            self.metrics.record(self.device, function, address, elapsed, error, exception, count)
+        else:
+            self.metrics.record(self.device, function, address, elapsed, count=count)
+        return result
+
+    def read_coils(self, bit_addr, bit_nb=1):
+        return self._call("read_coils", bit_addr, bit_nb, bit_nb)
+
+    def read_discrete_inputs(self, bit_addr, bit_nb=1):
+        return self._call("read_discrete_inputs", bit_addr, bit_nb, bit_nb)
+
+    def read_holding_registers(self, reg_addr, reg_nb=1):
+        return self._call("read_holding_registers", reg_addr, reg_nb, reg_nb)
+
+    def read_input_registers(self, reg_addr, reg_nb=1):
+        return self._call("read_input_registers", reg_addr, reg_nb, reg_nb)
+
+    def write_single_coil(self, bit_addr, bit_value):
+        return self._call("write_single_coil", bit_addr, 1, bit_value)
+
+    def write_single_register(self, reg_addr, reg_value):
+        return self._call("write_single_register", reg_addr, 1, reg_value)
+
+    def write_multiple_coils(self, bits_addr, bits_value):
+        return self._call("write_multiple_coils", bits_addr, len(bits_value), bits_value)
+
+    def write_multiple_registers(self, regs_addr, regs_value):
+        return self._call("write_multiple_registers", regs_addr, len(regs_value), regs_value)
@@ -0,0 +1,373 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Lokaler Modbus-TCP-Proxy, über den sich mehrere Programme (GUI, Logger, Skripte) eine
+Verbindung pro Gerät bzw. Gateway teilen.
+
+Für jedes Gateway (IP-Adresse, Port) der Konfiguration lauscht der Proxy auf einem eigenen
+lokalen Port und leitet Anfragen unter Beibehaltung der Unit-ID weiter:
+- Leseanfragen werden aus einem Cache mit kurzer Gültigkeit (ttl) beantwortet. Liegt eine
+  Anfrage innerhalb eines Blocks aus dem Registerabbild des Treibers (RegisterMap.plan()),
+  wird der ganze Block gelesen, sodass z. B. flow, temp und valve eines MFC von beliebig
+  vielen Programmen mit einem Buszugriff pro ttl bedient werden. Lehnt das Gerät einen Block
+  mit einer Modbus-Exception ab, werden danach nur noch die angefragten Register gelesen.
+- Schreibzugriffe gehen sofort und nacheinander an das Gerät und verwerfen die betroffenen
+  Cache-Einträge.
+
+Start als Dienst (schreibt die Zuordnung Gateway -> lokaler Port nach ROUTES_FILE):
+
+    python modbus_proxy.py --config anlage --ttl 0.1
+
+Programme verwenden den Proxy, indem sie ihre Konfiguration umschreiben:
+
+    MOD_TCP(proxied_config(get_config("anlage"), load_routes()))
+"""
+from threading import Lock, Event
+import argparse
+import json
+import os
+import signal
+import tempfile
+import time
+
+from pyModbusTCP.server import ModbusServer, DataHandler
+from pyModbusTCP.constants import (EXP_NONE, EXP_GATEWAY_TARGET_DEVICE_FAILED_TO_RESPOND, MB_EXCEPT_ERR,
+                                   READ_COILS, READ_DISCRETE_INPUTS, READ_HOLDING_REGISTERS,
+                                   READ_INPUT_REGISTERS, WRITE_SINGLE_COIL, WRITE_SINGLE_REGISTER)
+
+# Wie _sibling in modbus_functions: auch ohne Paket (Datei direkt im Suchpfad) importierbar
+if __package__:
+    from .modbus_functions import ConnectionPool, SERVER_PORT, load_config, driver_type
+    from . import device_registry
+else:
+    from modbus_functions import ConnectionPool, SERVER_PORT, load_config, driver_type
+    import device_registry
+
+ROUTES_FILE = os.path.join(tempfile.gettempdir(), "chemtherm_modbus_proxy.json")
+
+# Client-Methode je Lese-Funktionscode
+_READ_METHODS = {
+    READ_COILS: "read_coils",
+    READ_DISCRETE_INPUTS: "read_discrete_inputs",
+    READ_HOLDING_REGISTERS: "read_holding_registers",
+    READ_INPUT_REGISTERS: "read_input_registers",
+}
+
+
+def register_blocks(config):
+    """
+    Ermittelt aus den Registerabbildern der Treiber die Leseblöcke jedes Geräts.
+
+    :param config: Konfigurationsdictionary
+    :return: Dictionary (IP-Adresse, Port) -> {(Unit-ID, Funktionscode): [(Start, Anzahl), ...]}
+    """
+    blocks = {}
+    for value in config.values():
+        key = driver_type(value)
+        if key is None or "ip_address" not in value:
+            continue
+        registers = getattr(device_registry.driver_class(key), "REGISTERS", None)
+        if registers is None:
+            continue
+        gateway = blocks.setdefault((value["ip_address"], value.get("port", SERVER_PORT)), {})
+        for block in registers.plan():
+            gateway.setdefault((value.get("unit_id", 1), int(block.table)), []).append((block.start, block.count))
+    return blocks
+
+
+class ProxyHandler(DataHandler):
+    """
+    DataHandler eines Proxy-Ports: beantwortet Anfragen aus dem Cache oder über die geteilte
+    Verbindung zum Gateway. Alle Buszugriffe eines Gateways laufen nacheinander.
+    """
+
+    def __init__(self, pool, host, port, ttl=0.1, blocks=None, timeout=0.2):
+        """
+        :param pool: ConnectionPool für die Verbindung zum Gateway
+        :param host: IP-Adresse des Gateways
+        :param port: Port des Gateways
+        :param ttl: Gültigkeit gelesener Werte im Cache in Sekunden (0: kein Cache)
+        :param blocks: Leseblöcke {(Unit-ID, Funktionscode): [(Start, Anzahl)]} (siehe register_blocks)
+        :param timeout: Timeout der Anfragen an das Gateway in Sekunden
+        """
+        super().__init__()
+        self.pool = pool
+        self.host = host
+        self.port = port
+        self.ttl = ttl
+        self.blocks = blocks or {}
+        self.timeout = timeout
+        self.requests = 0
+        self.cache_hits = 0
+        self.upstream_reads = 0
+        self.writes = 0
+        self.errors = 0
+        self._units = {}    # Unit-ID -> UnitHandle
+        self._cache = {}    # (Unit-ID, Funktionscode) -> [(Zeit, Start, Daten)]
+        self._rejected = set()  # ((Unit-ID, Funktionscode), Start, Anzahl) vom Gerät abgelehnter Blöcke
+        self._lock = Lock()
+
+    def _unit(self, unit_id):
+        handle = self._units.get(unit_id)
+        if handle is None:
+            handle = self._units[unit_id] = self.pool.handle(self.host, self.port, unit_id, self.timeout)
+        return handle
+
+    def _cached(self, key, address, count, now):
+        for stamp, start, data in self._cache.get(key, ()):
+            if now - stamp <= self.ttl and start <= address and address + count <= start + len(data):
+                return data[address - start:address - start + count]
+        return None
+
+    def _store(self, key, start, data, now):
+        entries = [entry for entry in self._cache.get(key, ()) if now - entry[0] <= self.ttl and entry[1] != start]
+        entries.append((now, start, data))
+        self._cache[key] = entries
+
+    def _invalidate(self, key, address, count):
+        entries = self._cache.get(key)
+        if entries:
+            self._cache[key] = [entry for entry in entries
+                                if entry[1] + len(entry[2]) <= address or entry[1] >= address + count]
+
+    def _error(self, handle):
+        self.errors += 1
+        if handle.last_error == MB_EXCEPT_ERR and handle.last_except:
+            return DataHandler.Return(exp_code=handle.last_except)
+        return DataHandler.Return(exp_code=EXP_GATEWAY_TARGET_DEVICE_FAILED_TO_RESPOND)
+
+    def _read(self, function, address, count, srv_info):
+        unit_id = srv_info.recv_frame.mbap.unit_id
+        key = (unit_id, function)
+        self.requests += 1
+        data = self._cached(key, address, count, time.monotonic())
+        if data is not None:
+            self.cache_hits += 1
+            return DataHandler.Return(exp_code=EXP_NONE, data=data)
+        with self._lock:
+            # Eine gleichzeitige Anfrage kann den Wert inzwischen gelesen haben
+            data = self._cached(key, address, count, time.monotonic())
+            if data is not None:
+                self.cache_hits += 1
+                return DataHandler.Return(exp_code=EXP_NONE, data=data)
+            handle = self._unit(unit_id)
+            read = getattr(handle, _READ_METHODS[function])
+            start, length = address, count
+            for block_start, block_count in self.blocks.get(key, ()):
+                if (block_start <= address and address + count <= block_start + block_count
+                        and (key, block_start, block_count) not in self._rejected):
+                    start, length = block_start, block_count
+                    break
+            self.upstream_reads += 1
+            result = read(start, length)
+            if (result is None or len(result) != length) and (start, length) != (address, count):
+                # Das Gerät lässt den Block evtl. nicht zu (z. B. Lücken im Adressraum): nur die Anfrage lesen
+                block, exception = (start, length), handle.last_except
+                start, length = address, count
+                self.upstream_reads += 1
+                result = read(start, length)
+                if exception and result is not None and len(result) == length:
+                    # Abgelehnter Block: künftig direkt die angefragten Register lesen
+                    self._rejected.add((key,) + block)
+            if result is None or len(result) != length:
+                return self._error(handle)
+            if self.ttl > 0:
+                self._store(key, start, list(result), time.monotonic())
+        return DataHandler.Return(exp_code=EXP_NONE, data=list(result[address - start:address - start + count]))
+
+    def _write(self, function, address, values, srv_info):
+        unit_id = srv_info.recv_frame.mbap.unit_id
+        self.requests += 1
+        self.writes += 1
+        with self._lock:
+            handle = self._unit(unit_id)
+            code = srv_info.recv_frame.pdu.func_code
+            if function == READ_COILS:
+                if code == WRITE_SINGLE_COIL:
+                    result = handle.write_single_coil(address, values[0])
+                else:
+                    result = handle.write_multiple_coils(address, values)
+            elif code == WRITE_SINGLE_REGISTER:
+                result = handle.write_single_register(address, values[0])
+            else:
+                result = handle.write_multiple_registers(address, values)
+            self._invalidate((unit_id, function), address, len(values))
+            if not result:
+                return self._error(handle)
+        return DataHandler.Return(exp_code=EXP_NONE)
+
+    def read_coils(self, address, count, srv_info):
+        return self._read(READ_COILS, address, count, srv_info)
+
+    def read_d_inputs(self, address, count, srv_info):
+        return self._read(READ_DISCRETE_INPUTS, address, count, srv_info)
+
+    def read_h_regs(self, address, count, srv_info):
+        return self._read(READ_HOLDING_REGISTERS, address, count, srv_info)
+
+    def read_i_regs(self, address, count, srv_info):
+        return self._read(READ_INPUT_REGISTERS, address, count, srv_info)
+
+    def write_coils(self, address, bits_l, srv_info):
+        return self._write(READ_COILS, address, bits_l, srv_info)
+
+    def write_h_regs(self, address, words_l, srv_info):
+        return self._write(READ_HOLDING_REGISTERS, address, words_l, srv_info)
+
+    def stats(self):
+        """
+        :return: Dictionary mit Anfragen, Cache-Treffern, Buszugriffen, Schreibzugriffen und Fehlern
+        """
+        return {"requests": self.requests, "cache_hits": self.cache_hits, "upstream_reads": self.upstream_reads,
+                "writes": self.writes, "errors": self.errors}
+
+
+class ModbusProxy:
+    """
+    Startet für jedes Gateway einen lokalen ModbusServer mit einem ProxyHandler.
+    """
+
+    def __init__(self, config=None, host="127.0.0.1", base_port=15502, ttl=0.1, timeout=0.2):
+        """
+        :param config: Konfigurationsdictionary; für jedes darin genannte Gateway wird ein Port geöffnet
+        :param host: Adresse, an die die lokalen Server gebunden werden
+        :param base_port: Erster zu versuchender lokaler Port
+        :param ttl: Gültigkeit gelesener Werte im Cache in Sekunden
+        :param timeout: Timeout der Anfragen an die Gateways in Sekunden
+        """
+        self.host = host
+        self.ttl = ttl
+        self.timeout = timeout
+        self.pool = ConnectionPool(timeout)
+        self.handlers = {}   # (IP-Adresse, Port) -> (ProxyHandler, ModbusServer)
+        self._next_port = base_port
+        blocks = register_blocks(config or {})
+        for value in (config or {}).values():
+            if driver_type(value) is not None and "ip_address" in value:
+                gateway = (value["ip_address"], value.get("port", SERVER_PORT))
+                if gateway not in self.handlers:
+                    self.add(*gateway, blocks=blocks.get(gateway))
+
+    def add(self, host, port=SERVER_PORT, blocks=None):
+        """
+        Öffnet einen lokalen Port für ein Gateway.
+
+        :param host: IP-Adresse des Gateways
+        :param port: Port des Gateways
+        :param blocks: Leseblöcke (siehe register_blocks)
+        :return: Tupel (lokaler Host, lokaler Port)
+        """
+        handler = ProxyHandler(self.pool, host, port, self.ttl, blocks, self.timeout)
+        for _ in range(100):
+            local_port = self._next_port
+            self._next_port += 1
+            server = ModbusServer(self.host, local_port, no_block=True, data_hdl=handler)
+            try:
+                server.start()
+                break
+            except ModbusServer.NetworkError:
+                continue
+        else:
+            raise RuntimeError(f"Kein freier Port für den Proxy zu {host}:{port} gefunden")
+        self.handlers[(host, port)] = (handler, server)
+        print(f"Proxy {self.host}:{local_port} -> {host}:{port}")
+        return self.host, local_port
+
+    @property
+    def routes(self):
+        """
+        :return: Dictionary "IP-Adresse:Port" -> [lokaler Host, lokaler Port]
+        """
+        return {f"{host}:{port}": [self.host, server.port] for (host, port), (_, server) in self.handlers.items()}
+
+    def save_routes(self, path=ROUTES_FILE):
+        """
+        Schreibt die Zuordnung Gateway -> lokaler Port für proxied_config() anderer Programme.
+        """
+        temporary = path + ".tmp"
+        with open(temporary, "w") as file:
+            json.dump(self.routes, file, indent=1)
+        os.replace(temporary, path)
+
+    def stats(self):
+        """
+        :return: Dictionary "IP-Adresse:Port" -> ProxyHandler.stats()
+        """
+        return {f"{host}:{port}": handler.stats() for (host, port), (handler, _) in self.handlers.items()}
+
+    def close(self):
+        """
+        Stoppt alle lokalen Server und schließt die Verbindungen zu den Gateways.
+        """
+        for _, server in self.handlers.values():
+            server.stop()
+        self.handlers.clear()
+        self.pool.close_all()
+
+
+def load_routes(path=ROUTES_FILE):
+    """
+    Liest die Zuordnung eines laufenden Proxys.
+
+    :return: Dictionary "IP-Adresse:Port" -> [lokaler Host, lokaler Port] (leer, falls kein Proxy läuft)
+    """
+    try:
+        with open(path) as file:
+            return json.load(file)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def proxied_config(config, routes=None):
+    """
+    Schreibt die Adressen aller Geräte, für die der Proxy eine Route hat, auf den Proxy um.
+    Geräte ohne Route behalten ihre Adresse.
+
+    :param config: Konfigurationsdictionary
+    :param routes: Zuordnung aus load_routes() (Standard: ROUTES_FILE)
+    :return: Neues Konfigurationsdictionary
+    """
+    routes = load_routes() if routes is None else routes
+    result = {}
+    for name, value in config.items():
+        route = None
+        if isinstance(value, dict) and "ip_address" in value:
+            route = routes.get(f"{value['ip_address']}:{value.get('port', SERVER_PORT)}")
+        result[name] = value if route is None else dict(value, ip_address=route[0], port=route[1])
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Lokaler Modbus-TCP-Proxy mit Lese-Cache")
+    parser.add_argument("--config", default=False, help="Name der JSON-Konfiguration (Standard: config-Modul)")
+    parser.add_argument("--host", default="127.0.0.1", help="Adresse der lokalen Server")
+    parser.add_argument("--base-port", type=int, default=15502, help="Erster lokaler Port")
+    parser.add_argument("--ttl", type=float, default=0.1, help="Gültigkeit des Lese-Caches in Sekunden")
+    parser.add_argument("--timeout", type=float, default=0.2, help="Timeout zum Gerät in Sekunden")
+    parser.add_argument("--routes", default=ROUTES_FILE, help="Datei für die Zuordnung Gateway -> lokaler Port")
+    parser.add_argument("--stats", type=float, default=60.0, help="Abstand der Statistikausgaben in Sekunden (0: aus)")
+    args = parser.parse_args(argv)
+
+    config, _ = load_config(args.config)
+    if not config:
+        print("Keine Modbus-Geräte in der Konfiguration gefunden")
+        return
+    proxy = ModbusProxy(config, args.host, args.base_port, args.ttl, args.timeout)
+    proxy.save_routes(args.routes)
+    routes = proxy.routes
+    stop = Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    try:
+        while not stop.wait(args.stats or None):
+            for gateway, stats in proxy.stats().items():
+                print(f"{gateway}: {stats}")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        proxy.close()
+        if load_routes(args.routes) == routes:
+            os.remove(args.routes)
+
+
+if __name__ == "__main__":
+    main()
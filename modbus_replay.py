@@ -0,0 +1,464 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Aufzeichnung und Wiedergabe des Modbus-Verkehrs der Treiber.
+
+Ein RecordingClient umhüllt den Client eines Treibers und schreibt jede Anfrage samt Antwort
+mit Zeitstempel in eine kompakte Binärdatei (ModbusRecorder). Ein ReplayClient liefert diese
+Antworten später denselben Treiberklassen zurück, ohne dass ein Gerät erreichbar sein muss.
+Zusammen mit einer ReplayClock als Zeitquelle der Regler (easy_PI(..., clock=...)) lassen sich
+Regeländerungen so gegen stundenlange Aufzeichnungen in Sekunden testen.
+
+Dateiformat (Little-Endian): Kopf MAGIC, danach Einträge, die mit einem Typbyte beginnen:
+    b"D": Gerät      <HB Geräte-ID, Namenslänge; Name (UTF-8)
+    b"T": Transaktion <dfHBHHBBH Zeit (Epoche), Dauer, Geräte-ID, Funktionscode, Adresse, Anzahl,
+                      Fehlercode, Exception-Code, Anzahl Datenworte; Datenworte <H
+                      (Lesen: empfangene Werte, Schreiben: gesendete Werte)
+"""
+from threading import Lock
+from collections import namedtuple
+from bisect import bisect_right
+import struct
+import time
+
+MAGIC = b"CTMR\x01\x00\x00\x00"
+_device = struct.Struct("<HB")
+_transaction = struct.Struct("<dfHBHHBBH")
+
+# Modbus-Funktionscodes der aufgezeichneten Client-Methoden
+FUNCTION_CODES = {
+    "read_coils": 1,
+    "read_discrete_inputs": 2,
+    "read_holding_registers": 3,
+    "read_input_registers": 4,
+    "write_single_coil": 5,
+    "write_single_register": 6,
+    "write_multiple_coils": 15,
+    "write_multiple_registers": 16,
+}
+FUNCTION_NAMES = {code: name for name, code in FUNCTION_CODES.items()}
+READ_FUNCTIONS = {1, 2, 3, 4}
+BIT_FUNCTIONS = {1, 2}
+
+Transaction = namedtuple("Transaction", ["timestamp", "duration", "device", "function", "address", "count",
+                                         "error", "exception", "data"])
+
+
+class ModbusRecorder:
+    """
+    Schreibt Transaktionen mehrerer Geräte in eine Aufzeichnungsdatei.
+    """
+
+    def __init__(self, path):
+        """
+        :param path: Pfad der Aufzeichnungsdatei (wird überschrieben)
+        """
+        self.path = path
+        self.transactions = 0
+        self._file = open(path, "wb")
+        self._file.write(MAGIC)
+        self._devices = {}
+        self._lock = Lock()
+
+    def instrument(self, client, device):
+        """
+        Umhüllt einen Client, sodass alle seine Transaktionen aufgezeichnet werden.
+
+        :param client: ModbusClient oder Objekt mit derselben API
+        :param device: Gerätename in der Aufzeichnung
+        :return: RecordingClient
+        """
+        return RecordingClient(client, self, device)
+
+    def record(self, device, function, address, count, data, error=0, exception=0, timestamp=None, duration=0.0):
+        """
+        Schreibt eine Transaktion.
+
+        :param device: Gerätename
+        :param function: Name der Client-Methode oder Funktionscode
+        :param address: Startadresse
+        :param count: Anzahl der Register bzw. Bits
+        :param data: Empfangene (Lesen) bzw. gesendete (Schreiben) Werte oder None
+        :param error: pyModbusTCP-Fehlercode (0: erfolgreich)
+        :param exception: Modbus-Exception-Code
+        """
+        code = function if isinstance(function, int) else FUNCTION_CODES[function]
+        words = [int(value) & 0xFFFF for value in (data or ())]
+        timestamp = time.time() if timestamp is None else timestamp
+        with self._lock:
+            if self._file is None:
+                return
+            device_id = self._devices.get(device)
+            if device_id is None:
+                device_id = self._devices[device] = len(self._devices)
+                name = device.encode("utf-8")[:255]
+                self._file.write(b"D" + _device.pack(device_id, len(name)) + name)
+            self._file.write(b"T" + _transaction.pack(timestamp, duration, device_id, code, address, count,
+                                                      error, exception, len(words)))
+            if words:
+                self._file.write(struct.pack(f"<{len(words)}H", *words))
+            self.transactions += 1
+
+    def flush(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.flush()
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+def read_recording(path):
+    """
+    Liest eine Aufzeichnungsdatei.
+
+    :param path: Pfad der Aufzeichnungsdatei
+    :return: Iterator über Transaction-Tupel in Aufzeichnungsreihenfolge
+    """
+    with open(path, "rb") as file:
+        data = file.read()
+    if not data.startswith(MAGIC):
+        raise ValueError(f"{path} ist keine Modbus-Aufzeichnung")
+    names = {}
+    position = len(MAGIC)
+    while position < len(data):
+        kind = data[position:position + 1]
+        position += 1
+        if kind == b"D":
+            device_id, length = _device.unpack_from(data, position)
+            position += _device.size
+            names[device_id] = data[position:position + length].decode("utf-8")
+            position += length
+        elif kind == b"T":
+            timestamp, duration, device_id, code, address, count, error, exception, words = \
+                _transaction.unpack_from(data, position)
+            position += _transaction.size
+            values = list(struct.unpack_from(f"<{words}H", data, position)) if words else None
+            position += 2 * words
+            yield Transaction(timestamp, duration, names[device_id], code, address, count, error, exception, values)
+        else:
+            raise ValueError(f"Beschädigter Eintrag an Position {position - 1} in {path}")
+
+
+class RecordingClient:
+    """
+    Client-Hülle mit der API des pyModbusTCP-ModbusClient, die jede Transaktion aufzeichnet.
+    Alle übrigen Attribute werden an den inneren Client durchgereicht.
+    """
+
+    def __init__(self, client, recorder, device):
+        self.client = client
+        self.recorder = recorder
+        self.device = device
+
+    def __getattr__(self, name):
+        if name == "client":
+            raise AttributeError(name)
+        return getattr(self.client, name)
+
+    @property
+    def unit_id(self):
+        return self.client.unit_id
+
+    @unit_id.setter
+    def unit_id(self, value):
+        self.client.unit_id = value
+
+    @property
+    def timeout(self):
+        return self.client.timeout
+
+    @timeout.setter
+    def timeout(self, value):
+        self.client.timeout = value
+
+    def _call(self, function, address, count, sent, *args):
+        timestamp = time.time()
+        start = time.perf_counter()
+        result = getattr(self.client, function)(address, *args)
+        duration = time.perf_counter() - start
+        if result is None or result is False:
+            # Fehlgeschlagene Lese- (None) und Schreibzugriffe (False) ohne Daten aufzeichnen
+            error = getattr(self.client, "last_error", 0) or 0
+            exception = getattr(self.client, "last_except", 0) or 0
+            data = None
+        else:
+            error = exception = 0
+            data = result if sent is None else sent
+        self.recorder.record(self.device, function, address, count, data, error, exception, timestamp, duration)
+        return result
+
+    def read_coils(self, bit_addr, bit_nb=1):
+        return self._call("read_coils", bit_addr, bit_nb, None, bit_nb)
+
+    def read_discrete_inputs(self, bit_addr, bit_nb=1):
+        return self._call("read_discrete_inputs", bit_addr, bit_nb, None, bit_nb)
+
+    def read_holding_registers(self, reg_addr, reg_nb=1):
+        return self._call("read_holding_registers", reg_addr, reg_nb, None, reg_nb)
+
+    def read_input_registers(self, reg_addr, reg_nb=1):
+        return self._call("read_input_registers", reg_addr, reg_nb, None, reg_nb)
+
+    def write_single_coil(self, bit_addr, bit_value):
+        return self._call("write_single_coil", bit_addr, 1, [bool(bit_value)], bit_value)
+
+    def write_single_register(self, reg_addr, reg_value):
+        return self._call("write_single_register", reg_addr, 1, [reg_value], reg_value)
+
+    def write_multiple_coils(self, bits_addr, bits_value):
+        return self._call("write_multiple_coils", bits_addr, len(bits_value), [bool(bit) for bit in bits_value],
+                          bits_value)
+
+    def write_multiple_registers(self, regs_addr, regs_value):
+        return self._call("write_multiple_registers", regs_addr, len(regs_value), list(regs_value), regs_value)
+
+
+class ReplayClock:
+    """
+    Zeitquelle für die Wiedergabe.
+
+    Mit speed läuft die Zeit ab dem Start um diesen Faktor schneller als die Echtzeit; ohne speed
+    (None) steht sie still und wird nur mit advance() weitergeschaltet, sodass Regelschleifen so
+    schnell wie möglich und reproduzierbar durchlaufen. Eine Instanz ist direkt als clock-Parameter
+    von easy_PI, DirectHeatController und ControllerBank verwendbar.
+    """
+
+    def __init__(self, start, speed=None):
+        """
+        :param start: Startzeit in Sekunden seit der Epoche (z. B. Beginn der Aufzeichnung)
+        :param speed: Zeitraffer-Faktor (z. B. 100.0) oder None für manuelles Weiterschalten
+        """
+        self.start = start
+        self.speed = speed
+        self._offset = 0.0
+        self._real_start = time.monotonic()
+
+    def __call__(self):
+        return self.now()
+
+    def now(self):
+        """
+        :return: Aktuelle Wiedergabezeit in Sekunden seit der Epoche
+        """
+        if self.speed is None:
+            return self.start + self._offset
+        return self.start + self._offset + (time.monotonic() - self._real_start) * self.speed
+
+    def advance(self, seconds):
+        """
+        Schaltet die Wiedergabezeit um seconds weiter.
+        """
+        self._offset += seconds
+
+    def sleep(self, seconds):
+        """
+        Wartet seconds Wiedergabezeit (im manuellen Modus: schaltet nur weiter).
+        """
+        if self.speed is None:
+            self.advance(seconds)
+        else:
+            time.sleep(seconds / self.speed)
+
+
+class ReplayClient:
+    """
+    Transport mit der API des pyModbusTCP-ModbusClient, der die aufgezeichneten Antworten eines
+    Geräts zurückliefert.
+
+    Mit einer ReplayClock liefert jede Leseanfrage die letzte Antwort derselben Anfrage
+    (Funktion, Adresse, Anzahl), die bis zur aktuellen Wiedergabezeit aufgezeichnet wurde; ohne
+    Uhr werden die Antworten einer Anfrage der Reihe nach zurückgegeben. Schreibzugriffe werden
+    in writes gesammelt, damit Tests sie mit der Aufzeichnung vergleichen können; sie schlagen auf
+    dieselbe Weise fehl wie der entsprechende aufgezeichnete Schreibzugriff und werden sonst bestätigt.
+    """
+
+    def __init__(self, transactions, clock=None, host="replay", port=0, unit_id=1):
+        """
+        :param transactions: Transaction-Tupel dieses Geräts
+        :param clock: ReplayClock oder None für sequentielle Wiedergabe
+        """
+        self.clock = clock
+        self.host = host
+        self.port = port
+        self.unit_id = unit_id
+        self.timeout = 0.2
+        self.is_open = False
+        self.writes = []     # (Wiedergabezeit, Funktion, Adresse, Werte)
+        self.recorded_writes = [t for t in transactions if t.function not in READ_FUNCTIONS]
+        self._responses = {}     # (Funktionscode, Adresse, Anzahl) -> (Zeitstempel, Transaktionen)
+        for transaction in transactions:
+            key = (transaction.function, transaction.address, transaction.count)
+            self._responses.setdefault(key, ([], []))
+            self._responses[key][0].append(transaction.timestamp)
+            self._responses[key][1].append(transaction)
+        self._cursor = {}
+        self._set_error(0, 0)
+
+    def _set_error(self, error, exception):
+        self.last_error = error
+        self.last_except = exception
+        self.last_error_as_txt = "no error" if not error else f"aufgezeichneter Fehler {error}"
+        self.last_except_as_txt = self.last_except_as_full_txt = "" if not exception else f"exception {exception}"
+
+    def open(self):
+        self.is_open = True
+        return True
+
+    def close(self):
+        self.is_open = False
+
+    def _recorded(self, function, address, count):
+        # Aufgezeichnete Transaktion zur Anfrage (None: nicht aufgezeichnet)
+        entry = self._responses.get((FUNCTION_CODES[function], address, count))
+        if entry is None:
+            return None
+        timestamps, transactions = entry
+        if self.clock is not None:
+            index = bisect_right(timestamps, self.clock.now()) - 1
+            # Vor der ersten Aufzeichnung dieser Anfrage gab es noch keine Antwort
+            return transactions[index] if index >= 0 else None
+        index = self._cursor.get((function, address, count), 0)
+        self._cursor[(function, address, count)] = index + 1
+        return transactions[min(index, len(transactions) - 1)]
+
+    def _read(self, function, address, count):
+        transaction = self._recorded(function, address, count)
+        if transaction is None:
+            # Nicht aufgezeichnete Anfrage: wie ein Gerät ohne Antwort behandeln
+            self._set_error(5, 0)
+            return None
+        self._set_error(transaction.error, transaction.exception)
+        if transaction.error or transaction.data is None:
+            return None
+        if transaction.function in BIT_FUNCTIONS:
+            return [bool(bit) for bit in transaction.data]
+        return list(transaction.data)
+
+    def _write(self, function, address, values):
+        self.writes.append((None if self.clock is None else self.clock.now(), function, address, values))
+        transaction = self._recorded(function, address, len(values))
+        if transaction is not None and (transaction.error or transaction.data is None):
+            self._set_error(transaction.error or 5, transaction.exception)
+            return False
+        self._set_error(0, 0)
+        return True
+
+    def async_counterpart(self):
+        """
+        :return: AsyncReplayClient auf dieselbe Aufzeichnung (statt einer TCP-Verbindung für
+                 async_snapshot bzw. MOD_TCP.poll_all)
+        """
+        return AsyncReplayClient(self)
+
+    def read_coils(self, bit_addr, bit_nb=1):
+        return self._read("read_coils", bit_addr, bit_nb)
+
+    def read_discrete_inputs(self, bit_addr, bit_nb=1):
+        return self._read("read_discrete_inputs", bit_addr, bit_nb)
+
+    def read_holding_registers(self, reg_addr, reg_nb=1):
+        return self._read("read_holding_registers", reg_addr, reg_nb)
+
+    def read_input_registers(self, reg_addr, reg_nb=1):
+        return self._read("read_input_registers", reg_addr, reg_nb)
+
+    def write_single_coil(self, bit_addr, bit_value):
+        return self._write("write_single_coil", bit_addr, [bool(bit_value)])
+
+    def write_single_register(self, reg_addr, reg_value):
+        return self._write("write_single_register", reg_addr, [reg_value])
+
+    def write_multiple_coils(self, bits_addr, bits_value):
+        return self._write("write_multiple_coils", bits_addr, [bool(bit) for bit in bits_value])
+
+    def write_multiple_registers(self, regs_addr, regs_value):
+        return self._write("write_multiple_registers", regs_addr, list(regs_value))
+
+
+class AsyncReplayClient:
+    """
+    ReplayClient mit der API von modbus_functions.AsyncModbusClient (Koroutinen). Die Antworten
+    liegen im Speicher, daher werden die Aufrufe direkt an den ReplayClient weitergegeben.
+    """
+
+    def __init__(self, client):
+        """
+        :param client: ReplayClient des Geräts
+        """
+        self.client = client
+
+    def __getattr__(self, name):
+        if name == "client":
+            raise AttributeError(name)
+        return getattr(self.client, name)
+
+    async def open(self):
+        return self.client.open()
+
+    async def close(self):
+        self.client.close()
+
+    async def read_coils(self, bit_addr, bit_nb=1):
+        return self.client.read_coils(bit_addr, bit_nb)
+
+    async def read_holding_registers(self, reg_addr, reg_nb=1):
+        return self.client.read_holding_registers(reg_addr, reg_nb)
+
+    async def read_input_registers(self, reg_addr, reg_nb=1):
+        return self.client.read_input_registers(reg_addr, reg_nb)
+
+    async def write_single_coil(self, bit_addr, bit_value):
+        return self.client.write_single_coil(bit_addr, bit_value)
+
+    async def write_multiple_registers(self, regs_addr, regs_value):
+        return self.client.write_multiple_registers(regs_addr, regs_value)
+
+
+class Replay:
+    """
+    Lädt eine Aufzeichnung und stellt pro Gerät einen ReplayClient mit gemeinsamer ReplayClock bereit.
+    """
+
+    def __init__(self, path, speed=None):
+        """
+        :param path: Pfad der Aufzeichnungsdatei
+        :param speed: Zeitraffer-Faktor der ReplayClock oder None für manuelles Weiterschalten
+        """
+        self.transactions = list(read_recording(path))
+        self.start = self.transactions[0].timestamp if self.transactions else time.time()
+        self.end = self.transactions[-1].timestamp if self.transactions else self.start
+        self.clock = ReplayClock(self.start, speed)
+        self.devices = sorted({transaction.device for transaction in self.transactions})
+
+    @property
+    def duration(self):
+        return self.end - self.start
+
+    def client(self, device):
+        """
+        :return: ReplayClient mit den Transaktionen des Geräts device
+        """
+        return ReplayClient([t for t in self.transactions if t.device == device], self.clock, host=device)
+
+    def run(self, step, rate, until=None):
+        """
+        Schaltet die Uhr im festen Takt bis zum Ende der Aufzeichnung weiter und ruft in jedem
+        Takt step() auf (z. B. die regeln()-Methoden der Regler und das Schreiben der Ausgänge).
+
+        :param step: Funktion ohne Argumente
+        :param rate: Taktrate in Hz (Wiedergabezeit)
+        :param until: Ende in Sekunden seit der Epoche (Standard: Ende der Aufzeichnung)
+        :return: Anzahl der ausgeführten Takte
+        """
+        until = self.end if until is None else until
+        period = 1.0 / rate
+        steps = 0
+        while self.clock.now() <= until:
+            step()
+            steps += 1
+            self.clock.sleep(period)
+        return steps
@@ -0,0 +1,229 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Ausfallbehandlung für Modbus-Clients: adaptiver Timeout, Wiederholungen und Circuit Breaker.
+
+Wird von MOD_TCP(resilience=...) und ModbusDevice.make_resilient() verwendet.
+"""
+from threading import Lock, Thread, Event
+from enum import IntEnum
+import time
+
+from pyModbusTCP.constants import (MB_NO_ERR, MB_CONNECT_ERR, MB_SEND_ERR, MB_RECV_ERR, MB_TIMEOUT_ERR,
+                                   MB_EXCEPT_ERR, MB_SOCK_CLOSE_ERR, MB_ERR_TXT)
+
+
+class CircuitState(IntEnum):
+    """
+    Zustand des Circuit Breakers eines ResilientClient.
+    """
+    closed = 0     # Normalbetrieb
+    open = 1       # Gerät gilt als ausgefallen, Anfragen werden sofort abgewiesen
+    half_open = 2  # Ein Wiederverbindungsversuch läuft
+
+
+class ResilientClient:
+    """
+    Client-Hülle mit der API des pyModbusTCP-ModbusClient, die die Erreichbarkeit eines Geräts verfolgt.
+
+    - Der Timeout wird aus der beobachteten Antwortzeit abgeleitet (geglättete RTT plus vierfache
+      Schwankung, wie beim TCP-Retransmission-Timeout) und auf [min_timeout, max_timeout] begrenzt.
+    - Fehlgeschlagene Anfragen ohne Antwort des Geräts werden bis zu retries-mal mit exponentiell
+      wachsender Pause wiederholt; Modbus-Exceptions (das Gerät hat geantwortet) nicht.
+    - Nach failure_threshold aufeinanderfolgenden Fehlschlägen öffnet der Circuit Breaker: Anfragen
+      liefern sofort None (Schreibzugriffe False), und ein Hintergrund-Thread prüft alle
+      probe_interval Sekunden, ob das Gerät wieder antwortet.
+    - Wie bei pyModbusTCP gelten None (Lesen) und False (Schreiben) als Fehlschlag.
+    """
+
+    RETRY_ERRORS = (MB_CONNECT_ERR, MB_SEND_ERR, MB_RECV_ERR, MB_TIMEOUT_ERR, MB_SOCK_CLOSE_ERR)
+
+    def __init__(self, client, min_timeout=0.02, max_timeout=1.0, retries=1, backoff=0.01,
+                 failure_threshold=3, probe_interval=2.0, name=None):
+        """
+        :param client: Innerer Client (ModbusClient, UnitHandle, InstrumentedClient, ...)
+        :param min_timeout: Untere Grenze des adaptiven Timeouts in Sekunden
+        :param max_timeout: Obere Grenze des adaptiven Timeouts in Sekunden
+        :param retries: Maximale Anzahl Wiederholungen pro Anfrage
+        :param backoff: Pause vor der ersten Wiederholung in Sekunden (verdoppelt sich je Versuch)
+        :param failure_threshold: Aufeinanderfolgende Fehlschläge, nach denen das Gerät als ausgefallen gilt
+        :param probe_interval: Abstand der Wiederverbindungsversuche in Sekunden
+        :param name: Name für Statusmeldungen (Standard: Host und Unit-ID)
+        """
+        self.client = client
+        self.min_timeout = min_timeout
+        self.max_timeout = max_timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.failure_threshold = failure_threshold
+        self.probe_interval = probe_interval
+        self.name = name or f"{client.host}/{client.unit_id}"
+        self.state = CircuitState.closed
+        self.failures = 0        # Aufeinanderfolgende Fehlschläge
+        self.rejected = 0        # Bei offenem Circuit Breaker abgewiesene Anfragen
+        self.retried = 0
+        self.srtt = None
+        self.rttvar = None
+        self.rto = min(max(client.timeout, min_timeout), max_timeout)
+        self.last_error = MB_NO_ERR
+        self.last_except = 0
+        self.last_error_as_txt = MB_ERR_TXT[MB_NO_ERR]
+        self.last_except_as_txt = ""
+        self.last_except_as_full_txt = ""
+        self._probe = None       # Zuletzt erfolgreiche Leseanfrage (Methode, Argumente) für Wiederverbindungsversuche
+        self._lock = Lock()
+        self._stop = Event()
+        self._probe_thread = None
+
+    def __getattr__(self, name):
+        if name == "client":
+            raise AttributeError(name)
+        return getattr(self.client, name)
+
+    @property
+    def unit_id(self):
+        return self.client.unit_id
+
+    @unit_id.setter
+    def unit_id(self, value):
+        self.client.unit_id = value
+
+    @property
+    def timeout(self):
+        return self.rto
+
+    @timeout.setter
+    def timeout(self, value):
+        self.rto = min(max(value, self.min_timeout), self.max_timeout)
+
+    @property
+    def available(self):
+        """
+        False, solange der Circuit Breaker offen ist.
+        """
+        return self.state == CircuitState.closed
+
+    def open(self):
+        if self.state != CircuitState.closed:
+            self._reject()
+            return False
+        if self.client.open():
+            return True
+        self._copy_error()
+        self._failed()
+        return False
+
+    def close(self):
+        self._stop.set()
+        self.client.close()
+
+    def _reject(self):
+        self.rejected += 1
+        self.last_error = MB_CONNECT_ERR
+        self.last_except = 0
+        self.last_error_as_txt = f"{self.name} ist nicht erreichbar (Circuit Breaker offen)"
+        self.last_except_as_txt = self.last_except_as_full_txt = ""
+
+    def _copy_error(self):
+        client = self.client
+        self.last_error = client.last_error
+        self.last_except = client.last_except
+        self.last_error_as_txt = client.last_error_as_txt
+        self.last_except_as_txt = client.last_except_as_txt
+        self.last_except_as_full_txt = client.last_except_as_full_txt
+
+    def _observe(self, rtt):
+        # Glättung nach RFC 6298 (alpha = 1/8, beta = 1/4)
+        with self._lock:
+            if self.srtt is None:
+                self.srtt, self.rttvar = rtt, rtt / 2
+            else:
+                self.rttvar += (abs(self.srtt - rtt) - self.rttvar) / 4
+                self.srtt += (rtt - self.srtt) / 8
+            self.rto = min(max(self.srtt + 4 * self.rttvar, self.min_timeout), self.max_timeout)
+
+    def _call(self, method, *args):
+        # pyModbusTCP meldet Fehlschläge beim Lesen mit None, beim Schreiben mit False
+        failed = None if method.startswith("read") else False
+        if self.state != CircuitState.closed:
+            self._reject()
+            return failed
+        for attempt in range(self.retries + 1):
+            if attempt:
+                self.retried += 1
+                time.sleep(self.backoff * (1 << (attempt - 1)))
+            self.client.timeout = self.rto
+            start = time.perf_counter()
+            result = getattr(self.client, method)(*args)
+            elapsed = time.perf_counter() - start
+            self._copy_error()
+            if result is not None and result is not False:
+                if attempt == 0:
+                    # Nur eindeutig zuordenbare Antwortzeiten verwenden (Karn-Algorithmus)
+                    self._observe(elapsed)
+                with self._lock:
+                    self.failures = 0
+                if method.startswith("read"):
+                    self._probe = (method, args)
+                return result
+            if self.last_error == MB_EXCEPT_ERR:
+                # Das Gerät hat geantwortet; eine Wiederholung ändert nichts.
+                with self._lock:
+                    self.failures = 0
+                return failed
+            if self.last_error not in self.RETRY_ERRORS:
+                break
+            if self.last_error == MB_TIMEOUT_ERR:
+                with self._lock:
+                    self.rto = min(self.rto * 2, self.max_timeout)
+        self._failed()
+        return failed
+
+    def _failed(self):
+        with self._lock:
+            self.failures += 1
+            if self.failures < self.failure_threshold or self.state != CircuitState.closed:
+                return
+            self.state = CircuitState.open
+            self._stop.clear()
+            self._probe_thread = Thread(target=self._run_probe, name=f"Probe-{self.name}", daemon=True)
+            self._probe_thread.start()
+        print(f"{self.name}: {self.failures} Fehlschläge in Folge, Gerät wird bis zur Wiederverbindung übersprungen.")
+
+    def _run_probe(self):
+        while not self._stop.wait(self.probe_interval):
+            self.state = CircuitState.half_open
+            self.client.timeout = self.max_timeout
+            if self._probe is not None:
+                method, args = self._probe
+                result = getattr(self.client, method)(*args)
+                success = result is not None and result is not False
+            else:
+                self.client.close()
+                success = self.client.open()
+            if success:
+                with self._lock:
+                    self.failures = 0
+                    self.srtt = self.rttvar = None
+                    self.state = CircuitState.closed
+                print(f"{self.name}: Verbindung wiederhergestellt.")
+                return
+            self.state = CircuitState.open
+
+    def read_coils(self, bit_addr, bit_nb=1):
+        return self._call("read_coils", bit_addr, bit_nb)
+
+    def read_holding_registers(self, reg_addr, reg_nb=1):
+        return self._call("read_holding_registers", reg_addr, reg_nb)
+
+    def read_input_registers(self, reg_addr, reg_nb=1):
+        return self._call("read_input_registers", reg_addr, reg_nb)
+
+    def write_single_coil(self, bit_addr, bit_value):
+        return self._call("write_single_coil", bit_addr, bit_value)
+
+    def write_single_register(self, reg_addr, reg_value):
+        return self._call("write_single_register", reg_addr, reg_value)
+
+    def write_multiple_registers(self, regs_addr, regs_value):
+        return self._call("write_multiple_registers", regs_addr, regs_value)
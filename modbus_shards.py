@@ -0,0 +1,414 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Verteilte Datenerfassung für große MOD_TCP-Installationen.
+
+Die Geräte werden nach Gateway (Konfigurationsschlüssel "gateway", sonst "ip_address") auf
+mehrere Worker-Prozesse verteilt. Jeder Worker betreibt ein eigenes MOD_TCP für seinen Teil,
+fragt dessen Geräte zyklisch ab und schickt die Werte als gepackte float64-Rahmen über eine
+Pipe an den Elternprozess. Dort stehen die Geräte als RemoteDevice mit der gewohnten
+Property-API zur Verfügung: Registerwerte kommen aus dem zuletzt empfangenen Rahmen, alle
+übrigen Properties und Methoden (set, write_slew, halt, ...) werden im Worker ausgeführt.
+"""
+from threading import Thread, Lock, Event
+from concurrent.futures import Future
+from datetime import datetime
+import inspect
+import itertools
+import math
+import multiprocessing
+import pickle
+import struct
+import time
+
+# Wie _sibling in modbus_functions: auch ohne Paket (Datei direkt im Suchpfad) importierbar
+if __package__:
+    from .modbus_functions import MOD_TCP, RegisterSnapshot, CachedValue, Quality, SERVER_PORT, driver_type
+    from . import device_registry
+else:
+    from modbus_functions import MOD_TCP, RegisterSnapshot, CachedValue, Quality, SERVER_PORT, driver_type
+    import device_registry
+
+HEADER = 8              # Rahmenkopf: Kennbyte plus Auffüllung auf 8 Byte (float64-Ausrichtung)
+DATA = b"D"             # Worker -> Eltern: Messwertrahmen
+LAYOUT = b"L"           # Worker -> Eltern: Kanalbelegung und Startbericht (pickle)
+REPLY = b"R"            # Worker -> Eltern: Antwort auf einen Befehl (pickle)
+_header = struct.Struct("c7x")
+
+
+def shard_key(value):
+    """
+    :return: Schlüssel, nach dem Geräte gemeinsam einem Worker zugeordnet werden (Gateway bzw. Host)
+    """
+    return value.get("gateway") or (value.get("ip_address"), value.get("port", SERVER_PORT))
+
+
+def plan_shards(config, processes):
+    """
+    Verteilt die Geräte gruppenweise (pro Gateway) möglichst gleichmäßig auf die Worker.
+
+    :param config: Konfigurationsdictionary der Modbus-Geräte
+    :param processes: Anzahl der Worker-Prozesse
+    :return: Liste von Konfigurationsdictionaries (eines pro nicht leerem Worker)
+    """
+    groups = {}
+    for name, value in config.items():
+        groups.setdefault(shard_key(value), {})[name] = value
+    shards = [{} for _ in range(max(1, processes))]
+    for group in sorted(groups.values(), key=len, reverse=True):
+        min(shards, key=len).update(group)
+    return [shard for shard in shards if shard]
+
+
+def _to_float(value):
+    return math.nan if value is None else float(value)
+
+
+def _worker_main(conn, config, options, rate):
+    """
+    Einstiegspunkt eines Worker-Prozesses.
+    """
+    mod = MOD_TCP(config, **options)
+    devices = list(mod.devices.items())
+    layout = [(name, driver_type(config[name]), list(device.REGISTERS.fields)) for name, device in devices]
+    report = {name: (entry.driver, entry.seconds, None if entry.error is None else str(entry.error))
+              for name, entry in mod.startup_report.items()}
+    conn.send_bytes(LAYOUT + pickle.dumps((layout, report)))
+
+    channels = sum(len(fields) for _, _, fields in layout)
+    frame = bytearray(HEADER + 8 * (1 + channels))
+    _header.pack_into(frame, 0, DATA)
+    values = memoryview(frame)[HEADER:].cast("d")
+    period = 1.0 / rate
+    next_poll = time.monotonic()
+    running = True
+    try:
+        while running:
+            if conn.poll(max(0.0, next_poll - time.monotonic())):
+                running = _handle(conn, mod, pickle.loads(conn.recv_bytes()))
+                continue
+            values[0] = time.time()
+            index = 1
+            for (name, device), (_, _, fields) in zip(devices, layout):
+                try:
+                    snapshot = device.snapshot().values
+                except Exception:
+                    snapshot = {}
+                for field in fields:
+                    values[index] = _to_float(snapshot.get(field))
+                    index += 1
+            conn.send_bytes(frame)
+            now = time.monotonic()
+            next_poll = max(next_poll + period, now)
+    except (EOFError, BrokenPipeError, OSError):
+        pass
+    finally:
+        mod.close()
+        conn.close()
+
+
+def _handle(conn, mod, message):
+    """
+    Führt einen Befehl des Elternprozesses aus und schickt die Antwort zurück.
+
+    :return: False, wenn der Worker beendet werden soll
+    """
+    request, device, kind, name, args, kwargs = message
+    if kind == "shutdown":
+        conn.send_bytes(REPLY + pickle.dumps((request, True, None)))
+        return False
+    try:
+        target = getattr(mod.devices[device], name)
+        result = target(*args, **kwargs) if kind == "call" else target
+        payload = (request, True, result)
+        data = pickle.dumps(payload)
+    except Exception as e:
+        try:
+            data = pickle.dumps((request, False, e))
+        except Exception:
+            data = pickle.dumps((request, False, RuntimeError(repr(e))))
+    conn.send_bytes(REPLY + data)
+    return True
+
+
+class Shard:
+    """
+    Elternseitige Verbindung zu einem Worker-Prozess.
+    """
+
+    def __init__(self, context, index, config, options, rate):
+        self.index = index
+        self.config = config
+        self.max_age = 3.0 / rate  # Ab diesem Alter gelten empfangene Werte als veraltet
+        self.layout = []
+        self.report = {}
+        self.timestamp = None
+        self.devices = []  # RemoteDevice-Stellvertreter dieses Workers (setzt ShardSet)
+        self.sinks = []    # Funktionen sink(device, values), die jeden empfangenen Rahmen erhalten
+        self._conn, child = context.Pipe()
+        self._process = context.Process(target=_worker_main, args=(child, config, options, rate),
+                                        name=f"MOD_TCP-Shard-{index}", daemon=True)
+        self._process.start()
+        child.close()
+        self._send_lock = Lock()
+        self._pending = {}
+        self._requests = itertools.count()
+        self._ready = Event()
+        self._values_lock = Lock()
+        self._values = None  # float64-Sicht auf den zuletzt vollständig empfangenen Rahmen
+        self._thread = Thread(target=self._receive, name=f"MOD_TCP-Shard-{index}-Receiver", daemon=True)
+        self._thread.start()
+
+    @property
+    def alive(self):
+        return self._process.is_alive()
+
+    def wait_ready(self, timeout=None):
+        """
+        Wartet, bis der Worker seine Geräte eingerichtet und die Kanalbelegung gemeldet hat.
+        """
+        return self._ready.wait(timeout)
+
+    def _receive(self):
+        try:
+            message = self._conn.recv_bytes()
+            self.layout, self.report = pickle.loads(message[1:])
+            size = HEADER + 8 * (1 + sum(len(fields) for _, _, fields in self.layout))
+            # Empfangen wird in einen Zwischenpuffer; veröffentlicht wird ein Rahmen erst, wenn er
+            # vollständig ist (eine Kopie pro Rahmen, Leser sehen nie einen halb geschriebenen Rahmen).
+            receive = bytearray(size)
+            latest = bytearray(size)
+            latest_bytes = memoryview(latest)
+            self._values = latest_bytes[HEADER:].cast("d")
+            self._ready.set()
+            while True:
+                try:
+                    length = self._conn.recv_bytes_into(receive)
+                    message = receive
+                except multiprocessing.BufferTooShort as e:
+                    message = e.args[0]
+                    length = len(message)
+                tag = bytes(message[:1])
+                if tag == DATA and length == size:
+                    with self._values_lock:
+                        latest_bytes[:] = memoryview(receive)
+                        self.timestamp = self._values[0]
+                    if self.sinks:
+                        self._feed_sinks()
+                elif tag == REPLY:
+                    request, ok, result = pickle.loads(bytes(message[1:length]))
+                    future = self._pending.pop(request, None)
+                    if future is not None:
+                        if ok:
+                            future.set_result(result)
+                        else:
+                            future.set_exception(result)
+        except (EOFError, OSError):
+            pass
+        finally:
+            self._ready.set()
+            for future in self._pending.values():
+                future.set_exception(ConnectionError(f"Worker {self.index} wurde beendet"))
+            self._pending.clear()
+
+    def _feed_sinks(self):
+        # Wie DevicePoller._poll: jede Senke erhält pro Gerät die Werte des Rahmens
+        for device in self.devices:
+            values = device.snapshot().values
+            for sink in self.sinks:
+                try:
+                    sink(device, values)
+                except Exception as e:
+                    print(f"Fehler in der Senke von Worker {self.index}: {e}")
+
+    def request(self, device, kind, name, *args, **kwargs):
+        """
+        Schickt einen Befehl an den Worker.
+
+        :param kind: "get" (Attribut lesen), "call" (Methode aufrufen) oder "shutdown"
+        :return: concurrent.futures.Future mit dem Ergebnis
+        """
+        future = Future()
+        request = next(self._requests)
+        self._pending[request] = future
+        try:
+            with self._send_lock:
+                self._conn.send_bytes(pickle.dumps((request, device, kind, name, args, kwargs)))
+        except (OSError, ValueError) as e:
+            self._pending.pop(request, None)
+            future.set_exception(ConnectionError(f"Worker {self.index} ist nicht erreichbar: {e}"))
+        return future
+
+    def values(self, offset, count):
+        """
+        :return: Zeitstempel (Epoche) und Liste der count Kanalwerte ab offset aus dem letzten Rahmen
+        """
+        if self.timestamp is None:
+            return None, [math.nan] * count
+        with self._values_lock:
+            return self._values[0], self._values[1 + offset:1 + offset + count].tolist()
+
+    def shutdown(self):
+        """
+        Fordert den Worker auf, seine Geräte zu schließen und sich zu beenden (ohne zu warten).
+
+        :return: concurrent.futures.Future, das mit der Bestätigung des Workers erfüllt wird
+        """
+        return self.request(None, "shutdown", None)
+
+    def close(self, timeout=2.0):
+        """
+        Beendet den Worker geordnet (Geräte schließen) und notfalls hart.
+        """
+        if self._process.is_alive():
+            try:
+                self.shutdown().result(timeout)
+            except Exception:
+                pass
+            self._process.join(timeout)
+            if self._process.is_alive():
+                self._process.terminate()
+                self._process.join(timeout)
+        self._conn.close()
+        self._thread.join(timeout)
+
+
+class RemoteDevice:
+    """
+    Stellvertreter eines Geräts, das in einem Worker-Prozess abgefragt wird.
+
+    Registerwerte (z. B. flow, velocity) werden aus dem zuletzt empfangenen Rahmen geliefert,
+    alle übrigen Properties und Methoden des Treibers werden im Worker ausgeführt.
+    """
+
+    def __init__(self, shard, name, driver, offset, fields):
+        self._shard = shard
+        self._name = name
+        self._offset = offset
+        self._fields = fields
+        self.driver = driver
+        self.REGISTERS = driver.REGISTERS
+        self._integer = {field: self.REGISTERS.fields[field].codec.fmt not in "fd" for field in fields}
+
+    def __repr__(self):
+        return f"RemoteDevice({self._name!r}, {self.driver.__name__}, Worker {self._shard.index})"
+
+    def snapshot(self, names=None):
+        """
+        Liefert die zuletzt vom Worker empfangenen Werte als RegisterSnapshot (fehlende Werte None).
+        """
+        timestamp, raw = self._shard.values(self._offset, len(self._fields))
+        values = {}
+        for field, value in zip(self._fields, raw):
+            if names is not None and field not in names:
+                continue
+            if math.isnan(value):
+                value = None
+            elif self._integer[field]:
+                value = int(value)
+            values[field] = value
+        return RegisterSnapshot(values, None if timestamp is None else datetime.fromtimestamp(timestamp))
+
+    async def async_snapshot(self, names=None):
+        return self.snapshot(names)
+
+    async def async_close(self):
+        pass
+
+    def cached(self, name):
+        """
+        Liefert den zuletzt empfangenen Wert als CachedValue (Zeitstempel aus time.monotonic() wie
+        beim ValueCache) oder None, falls noch keiner empfangen wurde.
+        """
+        snapshot = self.snapshot((name,))
+        if name not in snapshot.values or self._shard.timestamp is None:
+            return None
+        value = snapshot.values[name]
+        age = time.time() - self._shard.timestamp
+        if value is None:
+            quality = Quality.bad
+        elif age > self._shard.max_age:
+            quality = Quality.stale
+        else:
+            quality = Quality.good
+        return CachedValue(value, time.monotonic() - age, quality)
+
+    @property
+    def available(self):
+        """
+        False, solange der Worker nicht läuft oder im letzten Rahmen keinen Wert des Geräts geliefert hat.
+        """
+        if not self._shard.alive:
+            return False
+        return any(value is not None for value in self.snapshot().values.values())
+
+    def call(self, method, *args, **kwargs):
+        """
+        Ruft eine Methode des Treibers im Worker auf, ohne auf das Ergebnis zu warten.
+
+        :return: concurrent.futures.Future mit dem Rückgabewert
+        """
+        return self._shard.request(self._name, "call", method, *args, **kwargs)
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        if name in self._fields:
+            return self.snapshot((name,)).values[name]
+        attribute = inspect.getattr_static(self.driver, name, None)
+        if inspect.isfunction(attribute):
+            return lambda *args, **kwargs: self.call(name, *args, **kwargs).result()
+        return self._shard.request(self._name, "get", name).result()
+
+
+class ShardSet:
+    """
+    Startet und verwaltet die Worker-Prozesse eines MOD_TCP.
+    """
+
+    def __init__(self, config, processes, rate=10.0, options=None, start_method=None, timeout=60.0):
+        """
+        :param config: Konfigurationsdictionary der Modbus-Geräte
+        :param processes: Maximale Anzahl der Worker-Prozesse
+        :param rate: Abfragerate der Worker in Hz
+        :param options: Weitere Parameter für das MOD_TCP der Worker (z. B. debug_mode, lazy)
+        :param start_method: multiprocessing-Startmethode (Standard: Plattformstandard)
+        :param timeout: Maximale Wartezeit auf die Geräteeinrichtung der Worker in Sekunden
+        """
+        context = multiprocessing.get_context(start_method)
+        self.shards = [Shard(context, index, shard_config, options or {}, rate)
+                       for index, shard_config in enumerate(plan_shards(config, processes))]
+        self.devices = {}
+        self.startup_report = {}
+        for shard in self.shards:
+            if not shard.wait_ready(timeout):
+                print(f"Worker {shard.index} hat seine Geräte nicht rechtzeitig eingerichtet.")
+            offset = 0
+            devices = []
+            for name, key, fields in shard.layout:
+                driver = device_registry.driver_class(key)
+                devices.append(RemoteDevice(shard, name, driver, offset, fields))
+                self.devices[name] = devices[-1]
+                offset += len(fields)
+            shard.devices = devices
+            self.startup_report.update(shard.report)
+
+    def add_sink(self, sink):
+        """
+        Registriert eine Funktion sink(device, values), die für jeden von einem Worker empfangenen
+        Rahmen die Werte jedes Geräts erhält (wie DevicePoller.add_sink; device ist der RemoteDevice).
+        """
+        for shard in self.shards:
+            shard.sinks.append(sink)
+
+    def close(self):
+        """
+        Beendet alle Worker.
+        """
+        # Erst alle Worker gleichzeitig herunterfahren lassen, dann auf jeden einzeln warten
+        for shard in self.shards:
+            if shard.alive:
+                shard.shutdown()
+        for shard in self.shards:
+            shard.close()
+        self.shards = []
@@ -0,0 +1,254 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Simulierte Modbus-TCP-Geräte (MFC, Pumpe, Coupon) auf Loopback-Ports.
+
+Die Simulation bildet die Registerabbilder der Treiber aus modbus_functions nach und
+wird von MOD_TCP im dummyMode sowie für Lasttests ohne Anlage verwendet.
+"""
+from threading import Lock
+from pyModbusTCP.server import ModbusServer, DataBank, DataHandler
+from pyModbusTCP.constants import EXP_NONE
+import random
+import time
+
+# Wie _sibling in modbus_functions: auch ohne Paket (Datei direkt im Suchpfad) importierbar
+if __package__:
+    from .modbus_functions import FLOAT32_BE, INT32_LOW_FIRST
+else:
+    from modbus_functions import FLOAT32_BE, INT32_LOW_FIRST
+
+
+class SimulatedDevice(DataHandler):
+    """
+    Basisklasse eines simulierten Geräts.
+
+    Register werden in Dictionaries gehalten (nicht belegte Adressen lesen sich als 0).
+    Vor jedem Zugriff wird die Physik des Geräts um die verstrichene Zeit fortgeschrieben.
+    Optional werden Antwortlatenz und Paketverlust nachgebildet: ein verlorenes Paket wird
+    erst nach loss_delay beantwortet, also nachdem der Client bereits in den Timeout gelaufen ist.
+    """
+
+    def __init__(self, latency=0.0, loss=0.0, loss_delay=1.0, seed=None):
+        """
+        :param latency: Zusätzliche Antwortzeit pro Anfrage in Sekunden
+        :param loss: Wahrscheinlichkeit (0-1), dass eine Antwort verloren geht
+        :param loss_delay: Verzögerung einer verlorenen Antwort in Sekunden
+        :param seed: Startwert des Zufallsgenerators für reproduzierbare Verluste
+        """
+        super().__init__(DataBank(virtual_mode=True))
+        self.latency = latency
+        self.loss = loss
+        self.loss_delay = loss_delay
+        self.holding = {}
+        self.inputs = {}
+        self.coils = {}
+        self.requests = 0
+        self._random = random.Random(seed)
+        self._lock = Lock()
+        self._last_update = time.monotonic()
+
+    def update(self, dt):
+        """
+        Schreibt den Gerätezustand um dt Sekunden fort (in abgeleiteten Klassen überschrieben).
+        """
+
+    def on_write(self, address, words):
+        """
+        Reagiert auf geschriebene Holding-Register (in abgeleiteten Klassen überschrieben).
+        """
+
+    def on_coils(self, address, bits):
+        """
+        Reagiert auf geschriebene Coils (in abgeleiteten Klassen überschrieben).
+        """
+
+    def _transaction(self):
+        self.requests += 1
+        if self.loss and self._random.random() < self.loss:
+            time.sleep(self.loss_delay)
+        if self.latency:
+            time.sleep(self.latency)
+        now = time.monotonic()
+        self.update(now - self._last_update)
+        self._last_update = now
+
+    def read_h_regs(self, address, count, srv_info):
+        with self._lock:
+            self._transaction()
+            data = [self.holding.get(a, 0) for a in range(address, address + count)]
+        return DataHandler.Return(exp_code=EXP_NONE, data=data)
+
+    def read_i_regs(self, address, count, srv_info):
+        with self._lock:
+            self._transaction()
+            data = [self.inputs.get(a, 0) for a in range(address, address + count)]
+        return DataHandler.Return(exp_code=EXP_NONE, data=data)
+
+    def read_coils(self, address, count, srv_info):
+        with self._lock:
+            self._transaction()
+            data = [self.coils.get(a, False) for a in range(address, address + count)]
+        return DataHandler.Return(exp_code=EXP_NONE, data=data)
+
+    def write_h_regs(self, address, words_l, srv_info):
+        with self._lock:
+            self._transaction()
+            for offset, word in enumerate(words_l):
+                self.holding[address + offset] = word
+            self.on_write(address, words_l)
+        return DataHandler.Return(exp_code=EXP_NONE)
+
+    def write_coils(self, address, bits_l, srv_info):
+        with self._lock:
+            self._transaction()
+            for offset, bit in enumerate(bits_l):
+                self.coils[address + offset] = bit
+            self.on_coils(address, bits_l)
+        return DataHandler.Return(exp_code=EXP_NONE)
+
+
+class SimulatedMFC(SimulatedDevice):
+    """
+    MKS-Massendurchflussregler: Flow folgt dem Setpoint (0xA000) mit einer Verzögerung erster Ordnung.
+    Input-Register 0x4000 Flow, 0x4002 Temperatur, 0x4004 Ventilstellung; Coil 0xE002 schließt das Ventil,
+    Coil 0xE003 setzt den Nullpunkt.
+    """
+
+    def __init__(self, full_scale=1000.0, tau=0.5, temperature=25.0, **kwargs):
+        """
+        :param full_scale: Flow bei voll geöffnetem Ventil in sccm
+        :param tau: Zeitkonstante des Flows in Sekunden
+        :param temperature: Gastemperatur in degC
+        """
+        super().__init__(**kwargs)
+        self.full_scale = full_scale
+        self.tau = tau
+        self.temperature = temperature
+        self.setpoint = 0.0
+        self.flow = 0.0
+        self.offset = 0.0
+        self._set_holding_float(0xA006, 1.0)  # Full Modbus Control aktiv
+        self.update(0.0)
+
+    def _set_holding_float(self, address, value):
+        self.holding[address], self.holding[address + 1] = FLOAT32_BE.encode(value)
+
+    def _set_input_float(self, address, value):
+        self.inputs[address], self.inputs[address + 1] = FLOAT32_BE.encode(value)
+
+    def update(self, dt):
+        target = 0.0 if self.coils.get(0xE002) else min(max(self.setpoint, 0.0), self.full_scale)
+        if dt > 0:
+            self.flow += (target - self.flow) * min(1.0, dt / self.tau)
+        self._set_input_float(0x4000, self.flow - self.offset)
+        self._set_input_float(0x4002, self.temperature + self._random.uniform(-0.05, 0.05))
+        self._set_input_float(0x4004, 100.0 * self.flow / self.full_scale)
+
+    def on_write(self, address, words):
+        if address <= 0xA000 < address + len(words) - 1:
+            self.setpoint = FLOAT32_BE.decode([self.holding[0xA000], self.holding[0xA001]])
+
+    def on_coils(self, address, bits):
+        if address == 0xE003 and bits[0]:
+            self.offset = self.flow
+            self.coils[0xE003] = False
+
+
+class SimulatedPump(SimulatedDevice):
+    """
+    Schrittmotorpumpe: der geschriebene Slew (0x78) wird zur Geschwindigkeit (0x85) und in die
+    Position (0x57) integriert; moving (0x4A) ist gesetzt, solange sich der Motor dreht.
+    """
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.position = 0.0
+        self.velocity = 0
+        self.update(0.0)
+
+    def update(self, dt):
+        self.position += self.velocity * dt
+        self.holding[0x0057], self.holding[0x0058] = INT32_LOW_FIRST.encode(round(self.position))
+        self.holding[0x0085], self.holding[0x0086] = INT32_LOW_FIRST.encode(self.velocity)
+        self.holding[0x004A] = int(self.velocity != 0)
+
+    def on_write(self, address, words):
+        if address == 0x0078 and len(words) == 2:
+            self.velocity = INT32_LOW_FIRST.decode(words)
+        elif address == 0x0057 and len(words) == 2:
+            self.position = INT32_LOW_FIRST.decode(words)
+        self.update(0.0)
+
+
+class SimulatedCoupon(SimulatedDevice):
+    """
+    Coupon-Ausgang: speichert den geschriebenen Wert in Register 2100.
+    """
+
+
+SIMULATED_DEVICES = {
+    "mks_modbus": SimulatedMFC,
+    "modbus_pump": SimulatedPump,
+    "coupon_modbus": SimulatedCoupon,
+}
+
+
+class SimulatedRig:
+    """
+    Startet simulierte Geräte als ModbusServer auf aufeinanderfolgenden Loopback-Ports.
+    """
+
+    def __init__(self, host="127.0.0.1", base_port=15020, latency=0.0, loss=0.0, loss_delay=1.0, seed=None):
+        """
+        :param host: Adresse, an die die Server gebunden werden
+        :param base_port: Erster zu versuchender Port
+        :param latency: Standard-Antwortlatenz der Geräte in Sekunden
+        :param loss: Standard-Verlustwahrscheinlichkeit der Geräte (0-1)
+        :param loss_delay: Verzögerung einer verlorenen Antwort in Sekunden
+        :param seed: Startwert für reproduzierbare Verluste
+        """
+        self.host = host
+        self.defaults = {"latency": latency, "loss": loss, "loss_delay": loss_delay, "seed": seed}
+        self.devices = {}  # Name -> (SimulatedDevice, ModbusServer)
+        self._next_port = base_port
+
+    def add(self, name, driver_type, **kwargs):
+        """
+        Startet ein simuliertes Gerät.
+
+        :param name: Gerätename
+        :param driver_type: "mks_modbus", "modbus_pump" oder "coupon_modbus"
+        :param kwargs: Überschreibt latency/loss/... oder Geräteparameter (z. B. full_scale)
+        :return: Tupel (host, port) des gestarteten Servers
+        """
+        options = dict(self.defaults)
+        options.update(kwargs)
+        device = SIMULATED_DEVICES[driver_type](**options)
+        for _ in range(100):
+            port = self._next_port
+            self._next_port += 1
+            server = ModbusServer(self.host, port, no_block=True, data_hdl=device)
+            try:
+                server.start()
+                break
+            except ModbusServer.NetworkError:
+                continue
+        else:
+            raise RuntimeError(f"Kein freier Port für das simulierte Gerät {name} gefunden")
+        self.devices[name] = (device, server)
+        return self.host, port
+
+    def device(self, name):
+        """
+        :return: SimulatedDevice des Geräts name (z. B. um Latenz oder Verlust zur Laufzeit zu ändern)
+        """
+        return self.devices[name][0]
+
+    def stop(self):
+        """
+        Stoppt alle Server.
+        """
+        for _, server in self.devices.values():
+            server.stop()
+        self.devices.clear()
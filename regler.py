@@ -1,15 +1,146 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 from datetime import datetime
+from collections import namedtuple
+import time
+from threading import Lock, Thread, Event
+
+try:
+    import numpy as np
+except ImportError:  # NumPy wird nur für die ControllerBank benötigt
+    np = None
+
+Sample = namedtuple("Sample", ["value", "timestamp", "seq"])
+Sample.__doc__ = """
+Messwert eines Eingangskanals mit Zeitpunkt der Erfassung (Sekunden der Zeitquelle des Eingangs)
+und fortlaufender Nummer (0: nie über update() gesetzt).
+"""
+
 
 class CustomInput:
-    def __init__(self):
+    """
+    Eingang mit Messwerten in values. Werte, die über update() gesetzt werden, tragen zusätzlich
+    Zeitstempel und Sequenznummer, und Abonnenten (z. B. easy_PI.subscribe) werden pro neuem
+    Messwert benachrichtigt. Direkt in values geschriebene Werte werden wie bisher behandelt,
+    auch nach update(): weicht values[i] vom zuletzt über update() gesetzten Wert ab, liefert
+    sample() den direkt geschriebenen Wert ohne Sequenznummer, bis zum nächsten update().
+    """
+
+    def __init__(self, channels=4, clock=time.monotonic):
+        """
+        :param channels: Anzahl der Kanäle
+        :param clock: Zeitquelle in Sekunden für Messwerte ohne Zeitstempel (wie die der Regler)
+        """
         self.data = {}
-        self.values = [0, 0, 0, 0]
-    
+        self.values = [0] * channels
+        self.timestamps = [None] * channels
+        self.seq = [0] * channels
+        self._updated = [None] * channels  # zuletzt über update() gesetzter Wert pro Kanal
+        self.clock = clock
+        self._subscribers = []  # (Kanal oder None, callback)
+        self._lock = Lock()
+
+    def update(self, channel, value, timestamp=None):
+        """
+        Setzt einen neuen Messwert und benachrichtigt die Abonnenten des Kanals.
+
+        :param channel: Kanalindex
+        :param value: Messwert
+        :param timestamp: Zeitpunkt der Erfassung in Sekunden der Zeitquelle (Standard: jetzt)
+        """
+        timestamp = self.clock() if timestamp is None else timestamp
+        with self._lock:
+            self.values[channel] = value
+            self._updated[channel] = value
+            self.timestamps[channel] = timestamp
+            self.seq[channel] += 1
+            sample = Sample(value, timestamp, self.seq[channel])
+            subscribers = [callback for wanted, callback in self._subscribers if wanted is None or wanted == channel]
+        for callback in subscribers:
+            try:
+                callback(sample)
+            except Exception as e:
+                print(f"Fehler im Abonnenten von Kanal {channel}: {e}")
+
+    def sample(self, channel):
+        """
+        :return: Sample des Kanals (seq 0, solange kein Wert über update() gesetzt wurde oder
+                 values[channel] seitdem direkt überschrieben wurde)
+        """
+        with self._lock:
+            value = self.values[channel]
+            if value is not self._updated[channel]:
+                return Sample(value, None, 0)
+            return Sample(value, self.timestamps[channel], self.seq[channel])
+
+    def subscribe(self, callback, channel=None):
+        """
+        Ruft callback(sample) für jeden neuen Messwert auf (im Thread, der update() aufruft).
+
+        :param channel: Kanalindex oder None für alle Kanäle
+        """
+        with self._lock:
+            self._subscribers.append((channel, callback))
+
+    def unsubscribe(self, callback):
+        with self._lock:
+            self._subscribers = [entry for entry in self._subscribers if entry[1] is not callback]
+
+
+class PolledInput(CustomInput):
+    """
+    Eingang, der von einem DevicePoller bzw. MOD_TCP gespeist wird: jedes Pollergebnis eines
+    Kanals ("Gerät.Wert", z. B. "MFC1.flow") wird ein neuer Messwert. Fehlgeschlagene Lesezugriffe
+    (None) erzeugen keinen Messwert.
+    """
+
+    def __init__(self, channels, clock=time.monotonic):
+        """
+        :param channels: Liste der Kanalnamen "Gerät.Wert"; die Position ist der Kanalindex der Regler
+        :param clock: Zeitquelle in Sekunden (wie die der Regler)
+        """
+        super().__init__(len(channels), clock)
+        self.channels = list(channels)
+        self.index = {channel: i for i, channel in enumerate(self.channels)}
+
+    def sink(self, names):
+        """
+        Liefert eine Senke für DevicePoller.add_sink bzw. MOD_TCP.add_sink.
+
+        :param names: Dictionary id(Gerät) -> Gerätename (z. B. MOD_TCP.device_names())
+        """
+        def update(device, values):
+            name = names.get(id(device))
+            if name is None:
+                return
+            timestamp = self.clock()
+            for key, value in values.items():
+                channel = self.index.get(f"{name}.{key}")
+                if channel is not None and value is not None:
+                    self.update(channel, value, timestamp)
+        return update
+
+    def attach(self, modbus):
+        """
+        Meldet den Eingang als Senke eines MOD_TCP an (wirkt auf laufende und spätere Poller
+        sowie mit processes auf die Datenrahmen der Worker-Prozesse).
+
+        :return: self
+        """
+        modbus.add_sink(self.sink(modbus.device_names()))
+        return self
+
+
 class DirectHeatController:
-    def __init__(self, name):
+    def __init__(self, name, clock=time.monotonic):
+        """
+        :param name: Name des Heizers
+        :param clock: Zeitquelle in Sekunden (Standard: time.monotonic; für Wiedergaben z. B.
+                      eine modbus_replay.ReplayClock)
+        """
         self.deviceName = name
+        self.clock = clock
+        self.t_last_call = clock()  # Zeit der letzten Regelung in Sekunden der Zeitquelle
         self.entry = None
         self.label = None
         self.running = False
@@ -42,8 +173,15 @@ class DirectHeatController:
         self.running = False
         self.out = 0
 
+    def regeln(self):
+        """
+        Regelschritt für den ControlScheduler: der Ausgang folgt direkt dem Sollwert.
+        """
+        self.t_last_call = self.clock()
+        self.out = self.soll if self.running else 0
+
 class easy_PI:
-    def __init__(self, out_handle, output_channel, input_handle, input_channel, ki, kp) -> None:
+    def __init__(self, out_handle, output_channel, input_handle, input_channel, ki, kp, clock=time.monotonic) -> None:
         """
         Initialisiert den easy_PI-Regler.
 
@@ -53,7 +191,10 @@ class easy_PI:
         :param input_channel: Kanal, über den der Messwert abgerufen wird
         :param ki: Integrationskoeffizient
         :param kp: Proportionalitätskoeffizient
+        :param clock: Zeitquelle in Sekunden für die Integrationszeit (Standard: time.monotonic;
+                      für Wiedergaben im Zeitraffer z. B. eine modbus_replay.ReplayClock)
         """
+        self.clock = clock
         self.running = False           # Kennzeichnet, ob der Regler aktiv läuft
         self.input_channel = input_channel
 
@@ -71,6 +212,9 @@ class easy_PI:
         self.soll = 0                  # Zielwert (Sollwert)
         self.i = 0                     # Integrierter Fehler (I-Anteil)
         self.time_last_call = datetime.now()  # Zeitpunkt der letzten Regelung
+        self._t_last_call = clock()  # Zeit der letzten Regelung in Sekunden der Zeitquelle (für dtime)
+        self._last_seq = 0             # Sequenznummer des zuletzt verarbeiteten Messwerts
+        self._subscription = None      # Callback des Abonnements (siehe subscribe)
         self.sec_diff = 0              # Sicherheitsdifferenz (z. B. Temperatur-Schutz)
         self.secureOff = False         # Flag für manuelle Sicherheitsabschaltung
         self.tc_S = None               # Handle für die Temperaturüberwachung (muss Attribut 't' besitzen)
@@ -94,6 +238,7 @@ class easy_PI:
         self.soll = soll
         self.running = True
         self.time_last_call = datetime.now()
+        self._t_last_call = self.clock()
 
     def security(self, tc_handle, threshold=30):
         """
@@ -129,12 +274,61 @@ class easy_PI:
         """
         self.secureOff = True
 
-    def regeln(self):
+    def subscribe(self, on_step=None):
+        """
+        Regelt ereignisgesteuert: der Regler abonniert seinen Eingangskanal (CustomInput,
+        PolledInput) und führt genau einen Regelschritt pro neuem Messwert aus, mit dem Abstand
+        der Zeitstempel der Messwerte als Integrationszeit. Ein ControlScheduler ist dann nicht nötig.
+
+        :param on_step: Optionale Funktion on_step(regler) nach jedem Regelschritt, z. B. zum
+                        Schreiben des Ausgangs
+        """
+        self.unsubscribe()
+
+        def step(sample):
+            self.regeln(sample)
+            if on_step is not None:
+                on_step(self)
+        self._subscription = step
+        self.input.subscribe(step, self.input_channel)
+
+    def unsubscribe(self):
+        """
+        Beendet die ereignisgesteuerte Regelung.
+        """
+        if self._subscription is not None:
+            self.input.unsubscribe(self._subscription)
+            self._subscription = None
+
+    def _read_input(self, sample=None):
+        """
+        :return: Tupel (Messwert, Zeitpunkt) oder None, falls seit dem letzten Regelschritt kein
+                 neuer Messwert vorliegt. Eingänge ohne Sequenznummern liefern immer den aktuellen
+                 Wert mit der Aufrufzeit.
+        """
+        if sample is None:
+            sample_of = getattr(self.input, "sample", None)
+            if sample_of is not None:
+                sample = sample_of(self.input_channel)
+        if sample is None or not sample.seq:
+            return self.input.values[self.input_channel], self.clock()
+        if sample.seq == self._last_seq:
+            return None
+        self._last_seq = sample.seq
+        return sample.value, sample.timestamp
+
+    def regeln(self, sample=None):
         """
         Führt die PI-Regelung durch und aktualisiert den Ausgangswert (self.out)
         basierend auf dem aktuellen Messwert und dem Sollwert.
         Liegt ein Sicherheitsfall (z. B. zu hohe Temperatur) vor oder ist der
         Regler nicht aktiv, wird der Ausgang auf 0 gesetzt.
+
+        Liefert der Eingang Messwerte mit Sequenznummer (CustomInput.update), wird pro Messwert
+        höchstens ein Regelschritt ausgeführt, und die Integrationszeit ist der Abstand der
+        Zeitstempel der Messwerte statt der Aufrufzeitpunkte.
+
+        :param sample: Messwert (Sample) aus einem Abonnement; ohne Angabe wird der Eingang gelesen
         """
         # Überprüfe, ob ein Sicherheitsfall vorliegt
         safety_active = False
@@ -151,17 +345,22 @@ class easy_PI:
         # erfolgt ist, dann führe die PI-Regelung aus.
         if self.running and not safety_active and not self.secureOff:
             # Ermittle den aktuellen Messwert
-            current_value = self.input.values[self.input_channel]
+            reading = self._read_input(sample)
+            if reading is None:
+                # Kein neuer Messwert: ein weiterer Schritt würde den I-Anteil doppelt integrieren
+                return
+            current_value, now = reading
             # Berechne den Fehler zwischen Soll- und Ist-Wert
             delta = self.soll - current_value
 
             # Proportionalanteil berechnen
             p = self.kp * delta
 
-            # Berechne die verstrichene Zeit seit dem letzten Aufruf
-            now = datetime.now()
-            dtime = (now - self.time_last_call).total_seconds()
-            self.time_last_call = now
+            # Berechne die verstrichene Zeit seit dem letzten Messwert bzw. Aufruf (monoton,
+            # unabhängig von NTP-Sprüngen)
+            dtime = max(0.0, now - self._t_last_call)
+            self._t_last_call = now
+            self.time_last_call = datetime.now()
 
             # Integriere den Fehler (mit Zeitskalierung)
             self.i += delta * self.ki * dtime
@@ -184,4 +383,371 @@ class easy_PI:
             # Im Sicherheitsfall oder wenn der Regler gestoppt ist, setze den Ausgang auf 0.
             self.out = 0
             # Setze die manuelle Sicherheitsabschaltung zurück.
-            self.secureOff = False
\ No newline at end of file
+            self.secureOff = False
+
+
+class LoopStats:
+    """
+    Laufzeitstatistik einer Regelschleife des ControlScheduler (alle Zeiten in Sekunden).
+    """
+
+    def __init__(self, name, target_period):
+        self.name = name
+        self.target_period = target_period
+        self.count = 0
+        self.overruns = 0          # Ausgefallene Takte, weil ein Schritt zu lange dauerte
+        self.period_last = 0.0
+        self.period_min = float("inf")
+        self.period_max = 0.0
+        self.jitter_max = 0.0      # Größte Abweichung der Periode vom Sollwert
+        self._jitter_sq_sum = 0.0
+        self.exec_last = 0.0
+        self.exec_max = 0.0
+        self._exec_sum = 0.0
+
+    def record(self, period, exec_time):
+        self.count += 1
+        self.exec_last = exec_time
+        self.exec_max = max(self.exec_max, exec_time)
+        self._exec_sum += exec_time
+        if period is None:
+            return
+        jitter = period - self.target_period
+        self.period_last = period
+        self.period_min = min(self.period_min, period)
+        self.period_max = max(self.period_max, period)
+        self.jitter_max = max(self.jitter_max, abs(jitter))
+        self._jitter_sq_sum += jitter * jitter
+
+    @property
+    def jitter_rms(self):
+        return (self._jitter_sq_sum / (self.count - 1)) ** 0.5 if self.count > 1 else 0.0
+
+    @property
+    def exec_mean(self):
+        return self._exec_sum / self.count if self.count else 0.0
+
+    def as_dict(self):
+        return {
+            "name": self.name,
+            "target_period": self.target_period,
+            "count": self.count,
+            "overruns": self.overruns,
+            "period_last": self.period_last,
+            "period_min": self.period_min if self.count > 1 else 0.0,
+            "period_max": self.period_max,
+            "jitter_max": self.jitter_max,
+            "jitter_rms": self.jitter_rms,
+            "exec_last": self.exec_last,
+            "exec_mean": self.exec_mean,
+            "exec_max": self.exec_max,
+        }
+
+
+class ControlScheduler:
+    """
+    Führt registrierte Regler (easy_PI, DirectHeatController, ...) mit fester Rate in einem
+    eigenen Thread aus. Die Taktung basiert auf time.monotonic(); pro Schleife werden Periode,
+    Jitter, Überläufe und Ausführungszeit in LoopStats erfasst.
+    """
+
+    def __init__(self, name="ControlScheduler"):
+        self.name = name
+        self._loops = []  # [controller, period, on_step, stats, next_due, last_start]
+        self._lock = Lock()
+        self._stop_event = Event()
+        self._thread = None
+
+    def add(self, controller, rate, on_step=None, name=None):
+        """
+        Registriert einen Regler.
+
+        :param controller: Objekt mit regeln()-Methode
+        :param rate: Regelrate in Hz
+        :param on_step: Optionaler Callback on_step(controller) nach jedem Schritt,
+                        z. B. um controller.out an das Ausgabegerät zu schreiben
+        :param name: Name für die Statistik (Standard: deviceName oder Klassenname)
+        :return: LoopStats der Schleife
+        """
+        period = 1.0 / rate
+        if name is None:
+            name = getattr(controller, "deviceName", None) or f"{type(controller).__name__}-{len(self._loops)}"
+        stats = LoopStats(name, period)
+        with self._lock:
+            self._loops.append([controller, period, on_step, stats, time.monotonic(), None])
+        return stats
+
+    def remove(self, controller):
+        """
+        Entfernt einen Regler aus dem Scheduler.
+        """
+        with self._lock:
+            self._loops = [loop for loop in self._loops if loop[0] is not controller]
+
+    def stats(self):
+        """
+        :return: Dictionary Schleifenname -> LoopStats
+        """
+        with self._lock:
+            return {loop[3].name: loop[3] for loop in self._loops}
+
+    def start(self):
+        """
+        Startet den Scheduler-Thread.
+        """
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        now = time.monotonic()
+        with self._lock:
+            for loop in self._loops:
+                loop[4] = now
+                loop[5] = None
+        self._thread = Thread(target=self._run, name=self.name, daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=1.0):
+        """
+        Stoppt den Scheduler-Thread.
+        """
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            with self._lock:
+                loops = list(self._loops)
+            if not loops:
+                self._stop_event.wait(0.1)
+                continue
+            now = time.monotonic()
+            for loop in loops:
+                controller, period, on_step, stats, next_due, last_start = loop
+                if next_due > now:
+                    continue
+                start = time.monotonic()
+                try:
+                    controller.regeln()
+                    if on_step is not None:
+                        on_step(controller)
+                except Exception as e:
+                    print(f"Fehler im Regelschritt {stats.name}: {e}")
+                end = time.monotonic()
+                stats.record(None if last_start is None else start - last_start, end - start)
+                loop[5] = start
+                # Feste Taktung: ausgefallene Slots werden als Überlauf gezählt und übersprungen
+                next_due += period
+                if next_due <= end:
+                    missed = int((end - next_due) // period) + 1
+                    stats.overruns += missed
+                    next_due += missed * period
+                loop[4] = next_due
+                now = time.monotonic()
+            next_wake = min(loop[4] for loop in loops)
+            self._stop_event.wait(max(0.0, next_wake - time.monotonic()))
+
+
+def pi_law(kp, ki, soll, i, current, dtime):
+    """
+    Vektorisiertes Regelgesetz von easy_PI.regeln für beliebig viele Regler.
+    Enthält die Begrenzung auf [0, 1] und den Anti-Windup des I-Anteils.
+
+    :param kp: Proportionalitätskoeffizienten (Array)
+    :param ki: Integrationskoeffizienten (Array)
+    :param soll: Sollwerte (Array)
+    :param i: Bisherige I-Anteile (Array)
+    :param current: Aktuelle Messwerte (Array)
+    :param dtime: Verstrichene Zeit seit dem letzten Regelschritt in Sekunden (Array oder Skalar)
+    :return: Tupel (Ausgang, neuer I-Anteil)
+    """
+    delta = soll - current
+    p = kp * delta
+    i = i + delta * ki * dtime
+    pi = p + i
+    # Anti-Windup: oben I-Anteil nachführen, unten zurücksetzen
+    i = np.where(pi > 1, 1 - p, np.where(pi < 0, 0.0, i))
+    return np.clip(pi, 0.0, 1.0), i
+
+
+def guard_active(soll, sec_diff, temperature, has_guard):
+    """
+    Vektorisierter Temperaturwächter von easy_PI.regeln: aktiv, wenn die Temperatur den
+    Sollwert plus Sicherheitsdifferenz oder 300 übersteigt.
+    """
+    return has_guard & (sec_diff > 0) & ((temperature > soll + sec_diff) | (temperature > 300))
+
+
+def _bank_field(name, cast):
+    def fget(self):
+        return cast(getattr(self.bank, name)[self.index])
+
+    def fset(self, value):
+        getattr(self.bank, name)[self.index] = value
+    return property(fget, fset)
+
+
+class BankedPI:
+    """
+    Sicht auf einen einzelnen Regler einer ControllerBank mit der API von easy_PI.
+    Die Zustandsgrößen liegen in den Arrays der Bank.
+    """
+    kp = _bank_field("kp", float)
+    ki = _bank_field("ki", float)
+    soll = _bank_field("soll", float)
+    i = _bank_field("i", float)
+    out = _bank_field("out", float)
+    sec_diff = _bank_field("sec_diff", float)
+    running = _bank_field("running", bool)
+    secureOff = _bank_field("secure_off", bool)
+    time_last_call = _bank_field("time_last_call", float)
+
+    def __init__(self, bank, index, out_handle, output_channel, input_handle, input_channel):
+        self.bank = bank
+        self.index = index
+        self.input_channel = input_channel
+        if isinstance(input_handle, str) and "extern" in input_handle.lower():
+            self.input = CustomInput()
+        else:
+            self.input = input_handle
+        self.output_device = out_handle
+        self.output_channel = output_channel
+        self._tc_S = None
+
+    @property
+    def tc_S(self):
+        return self._tc_S
+
+    @tc_S.setter
+    def tc_S(self, tc_handle):
+        self._tc_S = tc_handle
+        self.bank.has_guard[self.index] = tc_handle is not None
+
+    def config(self, ki, kp):
+        """
+        Aktualisiert die PI-Regler-Parameter.
+        """
+        self.ki = ki
+        self.kp = kp
+
+    def start(self, soll):
+        """
+        Startet den Regler mit dem angegebenen Sollwert.
+        """
+        self.soll = soll
+        self.running = True
+        self.time_last_call = self.bank.clock()
+
+    def security(self, tc_handle, threshold=30):
+        """
+        Konfiguriert den Temperaturschutz (siehe easy_PI.security).
+        """
+        self.tc_S = tc_handle
+        self.sec_diff = threshold
+
+    def stop(self):
+        """
+        Stoppt den Regler und führt eine letzte Regelung durch, um den Ausgang zurückzusetzen.
+        """
+        self.running = False
+        self.regeln()
+
+    def set_soll(self, soll):
+        self.soll = soll
+
+    def set_secureOff(self):
+        self.secureOff = True
+
+    def regeln(self):
+        """
+        Führt einen Regelschritt nur für diesen Regler aus.
+        """
+        self.bank.step(self.index)
+
+
+class ControllerBank:
+    """
+    Hält den Zustand vieler PI-Regler in NumPy-Arrays und berechnet P-, I-Anteil, Begrenzung,
+    Anti-Windup und Temperaturwächter aller Regler in einem vektorisierten Schritt mit einem
+    gemeinsamen Zeitstempel.
+
+    Die von add() gelieferten BankedPI-Objekte sind API-kompatibel zu easy_PI.
+    """
+
+    def __init__(self, capacity=16, clock=time.monotonic):
+        """
+        :param capacity: Anfangskapazität der Arrays (wächst bei Bedarf)
+        :param clock: Zeitquelle in Sekunden (Standard: time.monotonic)
+        """
+        if np is None:
+            raise ImportError("ControllerBank benötigt NumPy")
+        self.clock = clock
+        self.controllers = []
+        self._allocate(max(1, capacity))
+
+    def _allocate(self, capacity):
+        n = len(self.controllers)
+        for name in ("kp", "ki", "soll", "i", "out", "sec_diff", "time_last_call"):
+            array = np.zeros(capacity)
+            if n:
+                array[:n] = getattr(self, name)[:n]
+            setattr(self, name, array)
+        for name in ("running", "secure_off", "has_guard"):
+            array = np.zeros(capacity, dtype=bool)
+            if n:
+                array[:n] = getattr(self, name)[:n]
+            setattr(self, name, array)
+
+    def __len__(self):
+        return len(self.controllers)
+
+    def __iter__(self):
+        return iter(self.controllers)
+
+    def add(self, out_handle, output_channel, input_handle, input_channel, ki, kp):
+        """
+        Fügt einen Regler hinzu (Parameter wie easy_PI).
+
+        :return: BankedPI-Sicht auf den neuen Regler
+        """
+        index = len(self.controllers)
+        if index == len(self.kp):
+            self._allocate(2 * index)
+        controller = BankedPI(self, index, out_handle, output_channel, input_handle, input_channel)
+        self.controllers.append(controller)
+        controller.config(ki, kp)
+        controller.time_last_call = self.clock()
+        return controller
+
+    def step(self, index=None):
+        """
+        Führt einen Regelschritt für alle Regler (oder nur den Regler index) aus.
+        """
+        n = len(self.controllers)
+        if n == 0:
+            return
+        sel = slice(0, n) if index is None else slice(index, index + 1)
+        controllers = self.controllers[sel]
+        now = self.clock()
+
+        has_guard = self.has_guard[sel]
+        temperature = np.fromiter(
+            (c.tc_S.t if guarded else 0.0 for c, guarded in zip(controllers, has_guard)),
+            dtype=float, count=len(controllers))
+        safety = guard_active(self.soll[sel], self.sec_diff[sel], temperature, has_guard)
+        for _ in range(int(np.count_nonzero(safety))):
+            print('Temperaturwächter aktiv')
+
+        active = self.running[sel] & ~safety & ~self.secure_off[sel]
+        current = np.fromiter(
+            (c.input.values[c.input_channel] if act else 0.0 for c, act in zip(controllers, active)),
+            dtype=float, count=len(controllers))
+        out, i = pi_law(self.kp[sel], self.ki[sel], self.soll[sel], self.i[sel], current,
+                        now - self.time_last_call[sel])
+
+        self.out[sel] = np.where(active, out, 0.0)
+        self.i[sel] = np.where(active, i, self.i[sel])
+        self.time_last_call[sel] = np.where(active, now, self.time_last_call[sel])
+        # Im Sicherheitsfall oder bei gestopptem Regler wird die manuelle Abschaltung zurückgesetzt.
+        self.secure_off[sel] &= active
@@ -0,0 +1,232 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Geschlossener Regelkreis aus easy_PI und einer Regelstrecke erster Ordnung mit Totzeit (FOPDT)
+für die Auslegung von kp/ki ohne Anlage.
+
+Alle Reglerparameter eines Gitters werden gleichzeitig als NumPy-Arrays simuliert. Das
+Regelgesetz ist dasselbe wie in easy_PI.regeln (pi_law, guard_active aus regler): Begrenzung
+auf [0, 1], Anti-Windup des I-Anteils und Temperaturwächter (sec_diff bzw. 300 degC), während
+dessen der Ausgang 0 ist und die Integrationszeit bis zum nächsten Regelschritt weiterläuft.
+Pro Parameterpaar werden Anstiegszeit, Überschwingen, Ausregelzeit und Auslösungen des
+Temperaturwächters ausgewertet.
+
+Aufruf z. B.: python regler_sim.py --gain 400 --tau 120 --dead-time 15 --soll 200
+"""
+from collections import namedtuple
+import argparse
+import math
+import time
+
+import numpy as np
+
+# Wie _sibling in modbus_functions: auch als Skript (python regler_sim.py) lauffähig
+if __package__:
+    from .regler import pi_law, guard_active
+else:
+    from regler import pi_law, guard_active
+
+
+class FOPDT(namedtuple("FOPDT", ["gain", "tau", "dead_time", "ambient"])):
+    """
+    Regelstrecke erster Ordnung mit Totzeit:
+        tau * dy/dt = ambient + gain * u(t - dead_time) - y
+
+    :param gain: Temperaturerhöhung bei Ausgang 1 im Beharrungszustand in K
+    :param tau: Zeitkonstante in Sekunden
+    :param dead_time: Totzeit in Sekunden
+    :param ambient: Temperatur bei Ausgang 0 in degC
+    """
+    __slots__ = ()
+
+    def __new__(cls, gain, tau, dead_time=0.0, ambient=20.0):
+        return super().__new__(cls, gain, tau, dead_time, ambient)
+
+    @classmethod
+    def from_step(cls, time_s, temperature, u=1.0):
+        """
+        Schätzt die Strecke aus einer aufgezeichneten Sprungantwort (Zwei-Punkte-Methode nach
+        Smith über die Zeitpunkte, zu denen 28,3 % und 63,2 % des Endwerts erreicht sind).
+
+        :param time_s: Zeitpunkte in Sekunden ab dem Sprung (aufsteigend)
+        :param temperature: Gemessene Temperaturen zu den Zeitpunkten
+        :param u: Höhe des Ausgangssprungs (0-1)
+        """
+        time_s = np.asarray(time_s, dtype=float)
+        temperature = np.asarray(temperature, dtype=float)
+        start, end = temperature[0], temperature[-1]
+        step = end - start
+        if step == 0:
+            raise ValueError("Die Sprungantwort enthält keine Temperaturänderung")
+        fraction = (temperature - start) / step
+        t28 = np.interp(0.283, fraction, time_s)
+        t63 = np.interp(0.632, fraction, time_s)
+        tau = 1.5 * (t63 - t28)
+        return cls(float(step / u), float(tau), float(max(0.0, t63 - tau)), float(start))
+
+
+SimulationResult = namedtuple("SimulationResult", ["kp", "ki", "rise_time", "overshoot", "settling_time",
+                                                   "guard_trips", "iae", "final_value"])
+SimulationResult.__doc__ = """
+Kennzahlen je Parameterpaar (Arrays in der Form von kp/ki):
+    rise_time: Zeit von 10 % auf 90 % des Sollwertsprungs in Sekunden (NaN: nicht erreicht)
+    overshoot: Überschwingen in % des Sollwertsprungs
+    settling_time: Zeit bis zum endgültigen Verbleib im Toleranzband in Sekunden (NaN: nicht eingeregelt)
+    guard_trips: Anzahl der Auslösungen des Temperaturwächters
+    iae: Integral des Betrags der Regelabweichung in K*s
+    final_value: Temperatur am Ende der Simulation
+"""
+
+
+def simulate(plant, kp, ki, soll, duration, period=1.0, start=None, sec_diff=0.0, band=0.02, noise=0.0, seed=None):
+    """
+    Simuliert einen Sollwertsprung für alle Parameterpaare gleichzeitig.
+
+    :param plant: FOPDT-Strecke
+    :param kp: Proportionalitätskoeffizienten (Array beliebiger Form)
+    :param ki: Integrationskoeffizienten (Array derselben Form)
+    :param soll: Sollwert in degC
+    :param duration: Simulierte Dauer in Sekunden
+    :param period: Regeltakt in Sekunden (Abtastzeit des Reglers und Schrittweite der Strecke)
+    :param start: Anfangstemperatur (Standard: plant.ambient)
+    :param sec_diff: Sicherheitsdifferenz des Temperaturwächters (0: Wächter aus, wie easy_PI.security)
+    :param band: Toleranzband der Ausregelzeit relativ zum Sollwertsprung
+    :param noise: Standardabweichung des Messrauschens in K
+    :param seed: Startwert des Zufallsgenerators für das Messrauschen
+    :return: SimulationResult
+    """
+    kp, ki = np.broadcast_arrays(np.asarray(kp, dtype=float), np.asarray(ki, dtype=float))
+    shape = kp.shape
+    kp, ki = kp.ravel(), ki.ravel()
+    n = kp.size
+    steps = int(round(duration / period))
+    start = plant.ambient if start is None else start
+    step_size = soll - start
+    direction = 1.0 if step_size >= 0 else -1.0
+    tolerance = abs(step_size) * band
+    rng = np.random.default_rng(seed) if noise else None
+
+    # Strecke exakt diskretisiert (Halteglied nullter Ordnung über eine Regelperiode)
+    decay = math.exp(-period / plant.tau)
+    delay = int(round(plant.dead_time / period))
+    pending = np.zeros((delay, n))     # Ringpuffer der Ausgänge, die die Strecke noch nicht erreicht haben
+    y = np.full(n, float(start))
+    i = np.zeros(n)
+    t_last = np.zeros(n)                # Zeit des letzten aktiven Regelschritts (wie easy_PI._t_last_call)
+    soll_v = np.full(n, float(soll))
+    sec_v = np.full(n, float(sec_diff))
+    has_guard = np.full(n, sec_diff > 0)
+    guard_before = np.zeros(n, dtype=bool)
+
+    t10 = np.full(n, np.nan)
+    t90 = np.full(n, np.nan)
+    peak = y * direction
+    last_outside = np.zeros(n)
+    guard_trips = np.zeros(n, dtype=int)
+    iae = np.zeros(n)
+
+    for k in range(steps):
+        now = k * period
+        measured = y if rng is None else y + rng.normal(0.0, noise, n)
+
+        safety = guard_active(soll_v, sec_v, measured, has_guard)
+        guard_trips += safety & ~guard_before
+        guard_before = safety
+        out, i_new = pi_law(kp, ki, soll_v, i, measured, now - t_last)
+        u = np.where(safety, 0.0, out)
+        i = np.where(safety, i, i_new)
+        t_last = np.where(safety, t_last, now)
+
+        if delay:
+            applied = pending[k % delay].copy()
+            pending[k % delay] = u
+        else:
+            applied = u
+        y = plant.ambient + plant.gain * applied + (y - plant.ambient - plant.gain * applied) * decay
+
+        # Kennzahlen am Ende der Periode
+        t = now + period
+        progress = (y - start) * direction
+        np.copyto(t10, t, where=np.isnan(t10) & (progress >= 0.1 * abs(step_size)))
+        np.copyto(t90, t, where=np.isnan(t90) & (progress >= 0.9 * abs(step_size)))
+        np.maximum(peak, y * direction, out=peak)
+        error = np.abs(soll - y)
+        np.copyto(last_outside, t, where=error > tolerance)
+        iae += error * period
+
+    end = steps * period
+    overshoot = np.maximum(0.0, peak - soll * direction) / abs(step_size) * 100 if step_size else np.zeros(n)
+    settling = np.where(last_outside < end, last_outside, np.nan)
+    return SimulationResult(kp.reshape(shape), ki.reshape(shape), (t90 - t10).reshape(shape),
+                            overshoot.reshape(shape), settling.reshape(shape), guard_trips.reshape(shape),
+                            iae.reshape(shape), y.reshape(shape))
+
+
+def grid_search(plant, kp_values, ki_values, soll, duration, **kwargs):
+    """
+    Simuliert alle Kombinationen aus kp_values und ki_values.
+
+    :param plant: FOPDT-Strecke
+    :param kp_values: Zu prüfende kp-Werte (z. B. np.geomspace(1e-3, 1, 100))
+    :param ki_values: Zu prüfende ki-Werte
+    :param soll: Sollwert in degC
+    :param duration: Simulierte Dauer in Sekunden
+    :param kwargs: Weitere Parameter von simulate (period, start, sec_diff, band, noise, seed)
+    :return: SimulationResult mit Arrays der Form (len(kp_values), len(ki_values))
+    """
+    kp, ki = np.meshgrid(np.asarray(kp_values, dtype=float), np.asarray(ki_values, dtype=float), indexing="ij")
+    return simulate(plant, kp, ki, soll, duration, **kwargs)
+
+
+def rank(result, max_overshoot=5.0, allow_guard_trips=False):
+    """
+    Sortiert die Parameterpaare, die eingeregelt haben, nach Ausregelzeit (dann IAE).
+
+    :param result: SimulationResult
+    :param max_overshoot: Maximal zulässiges Überschwingen in %
+    :param allow_guard_trips: Paare mit Auslösungen des Temperaturwächters zulassen
+    :return: Liste von Dictionaries mit kp, ki und den Kennzahlen, bestes Paar zuerst
+    """
+    ok = ~np.isnan(result.settling_time) & (result.overshoot <= max_overshoot)
+    if not allow_guard_trips:
+        ok &= result.guard_trips == 0
+    index = np.flatnonzero(ok.ravel())
+    order = index[np.lexsort((result.iae.ravel()[index], result.settling_time.ravel()[index]))]
+    return [{field: float(getattr(result, field).ravel()[j]) for field in SimulationResult._fields} for j in order]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Gittersuche für kp/ki von easy_PI an einer FOPDT-Strecke")
+    parser.add_argument("--gain", type=float, required=True, help="Temperaturerhöhung bei Ausgang 1 in K")
+    parser.add_argument("--tau", type=float, required=True, help="Zeitkonstante in Sekunden")
+    parser.add_argument("--dead-time", type=float, default=0.0, help="Totzeit in Sekunden")
+    parser.add_argument("--ambient", type=float, default=20.0, help="Temperatur bei Ausgang 0 in degC")
+    parser.add_argument("--soll", type=float, required=True, help="Sollwert in degC")
+    parser.add_argument("--duration", type=float, default=None, help="Simulierte Dauer (Standard: 10 * (tau + Totzeit))")
+    parser.add_argument("--period", type=float, default=1.0, help="Regeltakt in Sekunden")
+    parser.add_argument("--sec-diff", type=float, default=0.0, help="Sicherheitsdifferenz des Temperaturwächters")
+    parser.add_argument("--kp", default="1e-4,1,100", help="kp-Gitter als min,max,Anzahl (logarithmisch)")
+    parser.add_argument("--ki", default="1e-6,1e-1,100", help="ki-Gitter als min,max,Anzahl (logarithmisch)")
+    parser.add_argument("--top", type=int, default=10, help="Anzahl der ausgegebenen Paare")
+    args = parser.parse_args(argv)
+
+    def grid(text):
+        low, high, count = text.split(",")
+        return np.geomspace(float(low), float(high), int(count))
+
+    plant = FOPDT(args.gain, args.tau, args.dead_time, args.ambient)
+    duration = args.duration or 10 * (args.tau + args.dead_time)
+    kp_values, ki_values = grid(args.kp), grid(args.ki)
+    start = time.perf_counter()
+    result = grid_search(plant, kp_values, ki_values, args.soll, duration, period=args.period, sec_diff=args.sec_diff)
+    seconds = time.perf_counter() - start
+    print(f"{kp_values.size * ki_values.size} Parameterpaare, {int(round(duration / args.period))} Schritte "
+          f"in {seconds:.2f} s")
+    print(f"{'kp':>10} {'ki':>10} {'Anstieg/s':>10} {'Übersch./%':>10} {'Ausregel/s':>10} {'Wächter':>8}")
+    for entry in rank(result)[:args.top]:
+        print(f"{entry['kp']:10.4g} {entry['ki']:10.4g} {entry['rise_time']:10.1f} {entry['overshoot']:10.2f} "
+              f"{entry['settling_time']:10.1f} {int(entry['guard_trips']):8d}")
+
+
+if __name__ == "__main__":
+    main()
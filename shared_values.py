@@ -0,0 +1,216 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Tabelle der jeweils neuesten Messwerte in Shared Memory.
+
+Die Tabelle hat ein festes Layout mit einem Slot pro Kanal ("Gerät.Wert", z. B. "MFC1.flow").
+Jeder Slot enthält Sequenzzähler, Wert, Zeitstempel und Qualität. Die Erfassung (z. B. der
+DevicePoller eines MOD_TCP) schreibt hinein; beliebig viele Leser im selben oder in anderen
+Prozessen lesen ohne Buszugriff und ohne Lock. Konsistenz pro Slot sichert ein Seqlock: der
+Schreiber macht den Zähler vor dem Schreiben ungerade und danach wieder gerade, ein Leser
+wiederholt den Zugriff, solange der Zähler ungerade ist oder sich während des Lesens geändert hat.
+"""
+from multiprocessing import shared_memory, resource_tracker
+from threading import Lock
+import json
+import math
+import struct
+import sys
+import time
+
+# Wie _sibling in modbus_functions: auch ohne Paket (Datei direkt im Suchpfad) importierbar
+if __package__:
+    from .modbus_functions import CachedValue, Quality, driver_type
+    from . import device_registry
+else:
+    from modbus_functions import CachedValue, Quality, driver_type
+    import device_registry
+
+MAGIC = b"CTVT"
+VERSION = 1
+_header = struct.Struct("<4sIII")     # Kennung, Version, Anzahl Slots, Länge des Kanalverzeichnisses
+_slot = struct.Struct("<QddI4x")      # Sequenzzähler, Wert, Zeitstempel (Epoche), Qualität
+_seq = struct.Struct("<Q")
+_payload = struct.Struct("<ddI")
+SLOT_SIZE = _slot.size
+_attach_lock = Lock()
+
+def channels_from_config(config):
+    """
+    Ermittelt die Kanäle aller Modbus-Geräte einer Konfiguration (z. B. aus get_config).
+
+    :param config: Konfigurationsdictionary
+    :return: Liste der Kanalnamen "Gerät.Wert" in Konfigurationsreihenfolge
+    """
+    channels = []
+    for device, value in (config or {}).items():
+        key = driver_type(value)
+        registers = None if key is None else getattr(device_registry.driver_class(key), "REGISTERS", None)
+        if registers is not None:
+            channels.extend(f"{device}.{name}" for name in registers.fields)
+    return channels
+
+
+class SharedValueTable:
+    """
+    Shared-Memory-Tabelle der neuesten Werte (siehe Modulbeschreibung).
+
+    Mit channels wird eine neue Tabelle angelegt, ohne channels eine bestehende Tabelle über
+    ihren Namen geöffnet. Jeder Kanal darf nur von einem Prozess beschrieben werden.
+    """
+
+    def __init__(self, name=None, channels=None):
+        """
+        :param name: Name des Shared-Memory-Segments (beim Anlegen optional, beim Öffnen erforderlich)
+        :param channels: Liste der Kanalnamen, um eine neue Tabelle anzulegen
+        """
+        self._write_lock = Lock()
+        if channels is not None:
+            self.channels = list(channels)
+            directory = json.dumps(self.channels).encode("utf-8")
+            directory += b" " * (-len(directory) % 8)
+            self._offset = _header.size + len(directory)
+            size = self._offset + SLOT_SIZE * max(1, len(self.channels))
+            self._shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+            self.owner = True
+            buffer = self._shm.buf
+            buffer[_header.size:self._offset] = directory
+            for index in range(len(self.channels)):
+                _slot.pack_into(buffer, self._offset + index * SLOT_SIZE, 0, math.nan, 0.0, Quality.bad)
+            _header.pack_into(buffer, 0, MAGIC, VERSION, len(self.channels), len(directory))
+        else:
+            self._shm = _attach(name)
+            self.owner = False
+            magic, version, count, length = _header.unpack_from(self._shm.buf, 0)
+            if magic != MAGIC or version != VERSION:
+                self._shm.close()
+                raise ValueError(f"{name} ist keine Messwerttabelle (Version {VERSION})")
+            self._offset = _header.size + length
+            self.channels = json.loads(bytes(self._shm.buf[_header.size:self._offset]).decode("utf-8"))
+        self.name = self._shm.name
+        self.slots = {channel: index for index, channel in enumerate(self.channels)}
+
+    def __len__(self):
+        return len(self.channels)
+
+    def __contains__(self, channel):
+        return channel in self.slots
+
+    def write(self, channel, value, timestamp=None, quality=None):
+        """
+        Schreibt den neuesten Wert eines Kanals.
+
+        :param channel: Kanalname oder Slot-Index
+        :param value: Wert (None wird als NaN mit Quality.bad abgelegt)
+        :param timestamp: Zeitstempel in Sekunden seit der Epoche (Standard: jetzt)
+        :param quality: Quality (Standard: good, bzw. bad bei None)
+        """
+        index = channel if isinstance(channel, int) else self.slots[channel]
+        if value is None:
+            value, quality = math.nan, Quality.bad
+        elif quality is None:
+            quality = Quality.good
+        position = self._offset + index * SLOT_SIZE
+        buffer = self._shm.buf
+        with self._write_lock:
+            seq = _seq.unpack_from(buffer, position)[0]
+            _seq.pack_into(buffer, position, seq + 1)
+            _payload.pack_into(buffer, position + 8, value, time.time() if timestamp is None else timestamp, quality)
+            _seq.pack_into(buffer, position, seq + 2)
+
+    def update(self, device, values, timestamp=None):
+        """
+        Schreibt die Werte eines Geräts (z. B. snapshot().values). Kanäle, die nicht in der
+        Tabelle stehen, werden übergangen.
+
+        :param device: Gerätename aus der Konfiguration
+        :param values: Dictionary Wertname -> Wert
+        """
+        timestamp = time.time() if timestamp is None else timestamp
+        for name, value in values.items():
+            index = self.slots.get(f"{device}.{name}")
+            if index is not None:
+                self.write(index, value, timestamp)
+
+    def read(self, channel):
+        """
+        Liest einen Slot konsistent.
+
+        :param channel: Kanalname oder Slot-Index
+        :return: CachedValue(value, timestamp, quality) mit Zeitstempel in Sekunden seit der Epoche;
+                 value ist None, solange kein gültiger Wert vorliegt
+        """
+        index = channel if isinstance(channel, int) else self.slots[channel]
+        position = self._offset + index * SLOT_SIZE
+        buffer = self._shm.buf
+        while True:
+            seq, value, timestamp, quality = _slot.unpack_from(buffer, position)
+            if seq & 1 or _seq.unpack_from(buffer, position)[0] != seq:
+                # Schreibvorgang läuft gerade
+                time.sleep(0)
+                continue
+            if math.isnan(value):
+                value = None
+            return CachedValue(value, timestamp, Quality(quality))
+
+    def snapshot(self, channels=None):
+        """
+        Liest mehrere Kanäle (jeden Slot für sich konsistent).
+
+        :param channels: Iterable der Kanalnamen oder None für alle
+        :return: Dictionary Kanalname -> CachedValue
+        """
+        return {channel: self.read(channel) for channel in (self.channels if channels is None else channels)}
+
+    def as_array(self):
+        """
+        NumPy-Sicht (ohne Kopie) auf alle Slots mit den Feldern seq, value, timestamp und quality.
+        Für Massenauswertungen; die Konsistenz einzelner Slots ist hier nicht gesichert.
+        """
+        import numpy as np
+        dtype = np.dtype({"names": ["seq", "value", "timestamp", "quality"],
+                          "formats": ["<u8", "<f8", "<f8", "<u4"],
+                          "offsets": [0, 8, 16, 24], "itemsize": SLOT_SIZE})
+        return np.ndarray((len(self.channels),), dtype=dtype, buffer=self._shm.buf, offset=self._offset)
+
+    def sink(self, names):
+        """
+        Liefert eine Senke für DevicePoller.add_sink, die die gepollten Werte in die Tabelle schreibt.
+
+        :param names: Dictionary id(Gerät) -> Gerätename in der Konfiguration
+        """
+        def write(device, values):
+            name = names.get(id(device))
+            if name is not None:
+                self.update(name, values)
+        return write
+
+    def close(self):
+        """
+        Gibt die Tabelle in diesem Prozess frei; der Ersteller entfernt das Segment zusätzlich.
+        """
+        if self._shm is None:
+            return
+        shm, self._shm = self._shm, None
+        shm.close()
+        if self.owner:
+            shm.unlink()
+
+
+def _attach(name):
+    """
+    Öffnet ein bestehendes Segment, ohne es beim Beenden dieses Prozesses mit abzuräumen.
+    """
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=name, track=False)
+    # Vor Python 3.13 meldet auch das Öffnen das Segment beim resource_tracker an, der es sonst
+    # beim Prozessende des Lesers entfernen würde. Ein nachträgliches unregister würde dagegen
+    # die Anmeldung des Erstellers löschen, wenn dieser denselben resource_tracker verwendet
+    # (gleicher Prozess oder Kindprozess); daher wird die Anmeldung beim Öffnen unterdrückt.
+    with _attach_lock:
+        register = resource_tracker.register
+        resource_tracker.register = lambda name, rtype: None
+        try:
+            return shared_memory.SharedMemory(name=name)
+        finally:
+            resource_tracker.register = register
@@ -0,0 +1,19 @@
+import os
+import sys
+
+import pytest
+
+# Die Module werden wie Skripte direkt aus dem Repository importiert (siehe _sibling in
+# modbus_functions), unabhängig davon, unter welchem Paketnamen das Repository eingebunden ist.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def rig_config():
+    """
+    Konfiguration mit je einem MFC, einer Pumpe und einem Coupon für MOD_TCP im dummyMode
+    (modbus_simulator ersetzt die Geräte durch simulierte Gegenstücke auf Loopback-Ports).
+    """
+    return {"MFC1": {"input_type": "mks_modbus", "ip_address": "10.0.0.2"},
+            "P1": {"output_type": "modbus_pump", "ip_address": "10.0.0.3"},
+            "C1": {"output_type": "coupon_modbus", "ip_address": "10.0.0.4"}}
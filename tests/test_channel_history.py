@@ -0,0 +1,119 @@
+import time
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from data_functions import ChannelHistory, HistoryStore
+
+
+def filled(count, capacity=100, levels=3, factor=10):
+    history = ChannelHistory(capacity, levels, factor)
+    for i in range(count):
+        history.append(float(i), timestamp=float(i))
+    return history
+
+
+def test_levels_fold_min_max_mean():
+    history = filled(250)
+    level1 = history.levels[1]
+    assert len(level1) == 25
+    assert level1.take(0, 3, None).tolist() == [0.0, 10.0, 20.0]
+    assert level1.take(0, 3, "min").tolist() == [0.0, 10.0, 20.0]
+    assert level1.take(0, 3, "max").tolist() == [9.0, 19.0, 29.0]
+    assert level1.take(0, 3, "mean").tolist() == [4.5, 14.5, 24.5]
+    level2 = history.levels[2]
+    assert len(level2) == 2
+    assert level2.take(0, 2, "min").tolist() == [0.0, 100.0]
+    assert level2.take(0, 2, "max").tolist() == [99.0, 199.0]
+    assert level2.take(0, 2, "mean").tolist() == [49.5, 149.5]
+
+
+def test_none_is_skipped():
+    history = ChannelHistory(10, 2, 2)
+    history.append(None, 1.0)
+    history.append(3.0, 2.0)
+    assert history.latest() == (2.0, 3.0)
+    assert len(history.levels[0]) == 1
+
+
+def test_query_uses_raw_values_when_they_fit():
+    history = filled(50)
+    result = history.query(10.0, 19.0, 20)
+    assert result["time"].tolist() == [float(i) for i in range(10, 20)]
+    assert result["min"].tolist() == result["max"].tolist() == result["mean"].tolist()
+
+
+def test_query_switches_to_coarser_level():
+    history = filled(100)
+    result = history.query(0.0, 99.0, 10)
+    assert result["time"].tolist() == [float(i) for i in range(0, 100, 10)]
+    assert result["min"].tolist() == [float(i) for i in range(0, 100, 10)]
+    assert result["max"].tolist() == [float(i) for i in range(9, 100, 10)]
+
+
+def test_query_reduces_when_coarsest_level_has_too_many_points():
+    history = filled(1000, capacity=1000, levels=2, factor=10)
+    result = history.query(0.0, 999.0, 25)
+    assert len(result["time"]) == 25
+    assert result["min"][0] == 0.0 and result["max"][0] == 39.0
+    assert result["mean"][0] == pytest.approx(19.5)
+
+
+def test_wrapped_ring_window_and_coverage():
+    history = filled(1000, capacity=100, levels=3, factor=10)
+    # Rohwerte reichen nur bis 900 zurück: das Fenster ab 500 kommt aus Stufe 1
+    result = history.query(500.0, 999.0, 100)
+    assert result["time"][0] == 500.0
+    assert result["time"][-1] == 990.0
+    assert np.all(np.diff(result["time"]) > 0)
+    raw = history.query(950.0, 959.0, 100)
+    assert raw["mean"].tolist() == [float(i) for i in range(950, 960)]
+
+
+def test_coarse_query_appends_partial_bucket():
+    history = filled(125, capacity=100, levels=3, factor=10)
+    result = history.query(0.0, 124.0, 2)
+    # Stufe 2: ein Eintrag 0..99, dazu der offene Abschnitt 100..124 aus Stufe 1 und den Rohwerten
+    assert result["time"].tolist() == [0.0, 100.0]
+    assert result["min"].tolist() == [0.0, 100.0]
+    assert result["max"].tolist() == [99.0, 124.0]
+    assert result["mean"][1] == pytest.approx(112.0)
+
+
+def test_empty_query():
+    result = ChannelHistory(10, 2, 2).query(0.0, 1.0, 10)
+    assert all(len(values) == 0 for values in result.values())
+
+
+def test_store_sink_records_device_values():
+    store = HistoryStore(capacity=10, levels=2, factor=2)
+    device = object()
+    sink = store.sink({id(device): "MFC1"})
+    sink(device, {"flow": 1.5, "valve": None})
+    sink(object(), {"flow": 9.0})
+    assert store.channel("MFC1.flow").latest()[1] == 1.5
+    assert store.channel("MFC1.valve").latest() is None
+    assert set(store.channels) == {"MFC1.flow", "MFC1.valve"}
+
+
+def test_store_query_does_not_create_channels():
+    store = HistoryStore(capacity=10, levels=2, factor=2)
+    result = store.query("MFC1.flow", 0.0, 1.0, 10)
+    assert all(len(values) == 0 for values in result.values())
+    assert store.channels == {}
+
+
+def test_record_history_with_worker_processes(rig_config):
+    pytest.importorskip("pyModbusTCP")
+    from modbus_functions import MOD_TCP
+    modbus = MOD_TCP(rig_config, debug_mode=MOD_TCP.OperationModes.dummyMode, processes=2, shard_rate=20.0)
+    try:
+        history = modbus.record_history(capacity=100, levels=2, factor=10)
+        deadline = time.monotonic() + 5.0
+        while "P1.velocity" not in history.channels and time.monotonic() < deadline:
+            time.sleep(0.05)
+        assert history.channel("P1.velocity").latest() is not None
+        assert history.channel("MFC1.flow").latest() is not None
+    finally:
+        modbus.close()
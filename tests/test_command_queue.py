@@ -0,0 +1,103 @@
+import threading
+import time
+
+import pytest
+
+from modbus_functions import CommandQueue, CommandPriority
+
+
+@pytest.fixture
+def queue():
+    queue = CommandQueue("Test-Commands")
+    yield queue
+    queue.close()
+
+
+def blocked(queue):
+    """
+    Belegt den Worker, bis das zurückgegebene Event gesetzt wird.
+    """
+    started, release = threading.Event(), threading.Event()
+
+    def block():
+        started.set()
+        release.wait(5.0)
+
+    queue.submit(CommandPriority.read, block)
+    assert started.wait(5.0)
+    return release
+
+
+def test_waiting_commands_run_by_priority(queue):
+    order = []
+    release = blocked(queue)
+    futures = [queue.submit(CommandPriority.read, order.append, "read"),
+               queue.submit(CommandPriority.write, order.append, "write"),
+               queue.submit(CommandPriority.safety, order.append, "halt"),
+               queue.submit(CommandPriority.write, order.append, "write2")]
+    release.set()
+    for future in futures:
+        future.result(5.0)
+    assert order == ["halt", "write", "write2", "read"]
+    assert queue.executed == 5
+
+
+def test_equal_waiting_reads_are_merged(queue):
+    release = blocked(queue)
+    calls = []
+    first = queue.submit(CommandPriority.read, lambda: calls.append(1) or len(calls), key=("read", 0x85))
+    second = queue.submit(CommandPriority.read, lambda: calls.append(2) or len(calls), key=("read", 0x85))
+    other = queue.submit(CommandPriority.read, lambda: "other", key=("read", 0x57))
+    assert second is first and other is not first
+    release.set()
+    assert first.result(5.0) == 1
+    assert calls == [1] and queue.merged == 1
+    # Nach dem Start wird ein neuer Befehl mit gleichem Schlüssel wieder eingereiht
+    assert queue.submit(CommandPriority.read, lambda: "again", key=("read", 0x85)).result(5.0) == "again"
+
+
+def test_exceptions_reach_the_caller(queue):
+    future = queue.submit(CommandPriority.write, lambda: 1 / 0)
+    with pytest.raises(ZeroDivisionError):
+        future.result(5.0)
+    assert queue.submit(CommandPriority.read, lambda: "next").result(5.0) == "next"
+
+
+def test_close_drains_queue_and_rejects_new_commands():
+    queue = CommandQueue()
+    release = blocked(queue)
+    pending = queue.submit(CommandPriority.read, lambda: "done")
+    threading.Timer(0.05, release.set).start()
+    queue.close(timeout=5.0)
+    assert pending.result(0) == "done"
+    with pytest.raises(RuntimeError):
+        queue.submit(CommandPriority.read, lambda: None)
+
+
+def test_pump_halt_overtakes_waiting_writes(rig_config):
+    pytest.importorskip("pyModbusTCP")
+    from modbus_functions import MOD_TCP
+    modbus = MOD_TCP(rig_config, debug_mode=MOD_TCP.OperationModes.dummyMode)
+    try:
+        pump = modbus.devices["P1"]
+        queue = pump.enable_command_queue()
+        assert pump.enable_command_queue() is queue
+        release = blocked(queue)
+        write = pump.submit_write("slew", 1000)
+        reads = [pump.submit_read("velocity"), pump.submit_read("velocity")]
+        assert reads[0] is reads[1]
+        halt = threading.Thread(target=pump.halt)
+        halt.start()
+        deadline = time.monotonic() + 5.0
+        while queue._queue.qsize() < 3 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        release.set()
+        halt.join(5.0)
+        assert write.result(5.0) is True
+        # halt lief vor dem wartenden Schreibzugriff, der Lesezugriff zuletzt
+        assert reads[0].result(5.0) == 1000
+        pump.disable_command_queue()
+        assert pump.command_queue is None
+        assert pump.velocity == 1000
+    finally:
+        modbus.close()
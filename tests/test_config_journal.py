@@ -0,0 +1,71 @@
+import json
+
+from data_functions import ConfigJournal, read_config_journal
+
+
+def configs():
+    base = {"MFC1": {"input_type": "mks_modbus", "ip_address": "10.0.0.2", "x": 5, "y": 7},
+            "P1": {"output_type": "modbus_pump", "ip_address": "10.0.0.3"}}
+    yield 100.0, base
+    changed = json.loads(json.dumps(base))
+    changed["MFC1"]["ip_address"] = "10.0.0.9"
+    changed["MFC1"]["x"] = 99                   # Positionsangabe: kein Eintrag
+    yield 200.0, changed
+    removed = json.loads(json.dumps(changed))
+    del removed["P1"]
+    removed["MFC1"].pop("input_type")
+    removed["TC1"] = {"input_type": "thermocouple"}
+    yield 300.0, removed
+
+
+def expected(config):
+    return {name: {k: v for k, v in rule.items() if k not in ("x", "y")} for name, rule in config.items()}
+
+
+def test_config_at_reconstructs_each_entry(tmp_path):
+    path = str(tmp_path / "journal.jsonl")
+    journal = ConfigJournal(path, keyframe_interval=100)
+    history = list(configs())
+    for t, config in history:
+        assert journal.record(config, t)
+    assert journal.times() == [100.0, 200.0, 300.0]
+    assert journal.config_at(99.9) is None
+    for (t, config), following in zip(history, [150.0, 299.0, 1e12]):
+        assert journal.config_at(t) == expected(config)
+        assert journal.config_at(following) == expected(config)
+    journal.close()
+
+    lines = [json.loads(line) for line in open(path, encoding="utf-8")]
+    assert "snapshot" in lines[0]
+    assert lines[1]["devices"] == {"MFC1": {"set": {"ip_address": "10.0.0.9"}}}
+    assert lines[2]["devices"]["P1"] is None
+    assert lines[2]["devices"]["MFC1"] == {"unset": ["input_type"]}
+
+
+def test_unchanged_config_is_not_recorded(tmp_path):
+    journal = ConfigJournal(str(tmp_path / "journal.jsonl"))
+    _, config = next(configs())
+    assert journal.record(config, 1.0)
+    assert not journal.record(dict(config, MFC1=dict(config["MFC1"], x=1)), 2.0)
+    assert journal.times() == [1.0]
+    journal.close()
+
+
+def test_keyframes_and_reopen(tmp_path):
+    path = str(tmp_path / "journal.jsonl")
+    journal = ConfigJournal(path, keyframe_interval=3)
+    for step in range(10):
+        journal.record({"T1": {"setpoint": step}}, float(step))
+    journal.close()
+    lines = [json.loads(line) for line in open(path, encoding="utf-8")]
+    assert [index for index, line in enumerate(lines) if "snapshot" in line] == [0, 4, 8]
+
+    # Fortsetzen: der nächste Eintrag ist ein Diff zum letzten Stand, danach folgt planmäßig ein Schnappschuss
+    journal = ConfigJournal(path, keyframe_interval=3)
+    for step in range(10, 13):
+        journal.record({"T1": {"setpoint": step}}, float(step))
+    journal.close()
+    lines = [json.loads(line) for line in open(path, encoding="utf-8")]
+    assert [index for index, line in enumerate(lines) if "snapshot" in line] == [0, 4, 8, 12]
+    for step in range(13):
+        assert read_config_journal(path, step + 0.5) == {"T1": {"setpoint": step}}
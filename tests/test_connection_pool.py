@@ -0,0 +1,88 @@
+import pytest
+
+pytest.importorskip("pyModbusTCP")
+
+from modbus_functions import MOD_TCP, ConnectionPool, UnitHandle
+from modbus_simulator import SimulatedRig
+
+
+@pytest.fixture
+def rig():
+    rig = SimulatedRig(base_port=16220)
+    yield rig
+    rig.stop()
+
+
+def test_handles_share_one_connection_per_gateway(rig):
+    host, port = rig.add("MFC1", "mks_modbus")
+    pool = ConnectionPool()
+    first, second = pool.handle(host, port, 1), pool.handle(host, port, 2, timeout=0.5)
+    other = pool.handle(host, port + 1000, 1)
+    assert isinstance(first, UnitHandle)
+    assert len(pool) == 2
+    assert first._connection is second._connection
+    assert first._connection.handles == 2
+    assert (second.unit_id, second.timeout, second.host, second.port) == (2, 0.5, host, port)
+    assert first.read_input_registers(0x4000, 2) is not None
+    assert first.is_open and second.is_open
+
+    first.close()
+    first.close()   # ein zweites close() gibt den Handle nicht erneut zurück
+    assert len(pool) == 2 and second.is_open
+    assert second.read_input_registers(0x4000, 2) is not None
+    second.close()
+    assert len(pool) == 1
+    assert not second.is_open and not first._connection.client.is_open
+    other.close()
+    assert len(pool) == 0
+
+
+def test_failed_request_state_is_kept_per_handle(rig):
+    host, port = rig.add("MFC1", "mks_modbus")
+    pool = ConnectionPool()
+    good, bad = pool.handle(host, port, 1), pool.handle(host, port + 1000, 1, timeout=0.05)
+    try:
+        assert bad.read_holding_registers(0, 1) is None
+        assert good.read_input_registers(0x4000, 2) is not None
+        assert bad.last_error != 0 and good.last_error == 0
+    finally:
+        pool.close_all()
+
+
+def test_close_all_closes_every_connection(rig):
+    host, port = rig.add("MFC1", "mks_modbus")
+    pool = ConnectionPool()
+    handles = [pool.handle(host, port, unit) for unit in (1, 2, 3)]
+    assert handles[0].read_input_registers(0x4000, 2) is not None
+    connection = handles[0]._connection
+    pool.close_all()
+    assert len(pool) == 0 and not connection.client.is_open
+    # Nach close_all entsteht beim nächsten Handle eine neue Verbindung
+    fresh = pool.handle(host, port, 1)
+    assert fresh._connection is not connection
+    for handle in handles:
+        handle.close()
+    assert len(pool) == 1
+    fresh.close()
+    assert len(pool) == 0
+
+
+def test_mod_tcp_devices_behind_one_gateway_share_a_connection(rig):
+    host, port = rig.add("MFC1", "mks_modbus")
+    config = {"MFC1": {"input_type": "mks_modbus", "ip_address": host, "port": port, "unit_id": 1},
+              "MFC2": {"input_type": "mks_modbus", "ip_address": host, "port": port, "unit_id": 2}}
+    modbus = MOD_TCP(config)
+    try:
+        assert len(modbus.pool) == 1
+        assert modbus.devices["MFC2"].client.unit_id == 2
+        assert modbus.devices["MFC1"].flow is not None
+    finally:
+        modbus.close()
+    assert len(modbus.pool) == 0
+
+    separate = MOD_TCP(config, shared_connections=False)
+    try:
+        assert separate.pool is None
+        assert separate.devices["MFC2"].client.unit_id == 2
+    finally:
+        separate.close()
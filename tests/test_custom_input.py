@@ -0,0 +1,144 @@
+import time
+
+import pytest
+
+from regler import CustomInput, PolledInput, Sample, easy_PI
+
+
+class Clock:
+    def __init__(self, now=0.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+KP, KI = 0.01, 0.001
+
+
+def controller(source, clock, kp=KP, ki=KI):
+    pi = easy_PI(None, 0, source, 0, ki=ki, kp=kp, clock=clock)
+    pi.start(100.0)
+    return pi
+
+
+def test_update_numbers_samples_per_channel():
+    clock = Clock(5.0)
+    source = CustomInput(2, clock)
+    assert source.sample(0) == Sample(0, None, 0)
+    source.update(0, 1.5)
+    source.update(0, 2.5, timestamp=7.0)
+    source.update(1, 9.0)
+    assert source.sample(0) == Sample(2.5, 7.0, 2)
+    assert source.sample(1) == Sample(9.0, 5.0, 1)
+
+
+def test_subscribers_receive_their_channel_only():
+    source = CustomInput(2, Clock())
+    seen, every = [], []
+    record_every = every.append
+    source.subscribe(seen.append, channel=1)
+    source.subscribe(record_every)
+    source.update(0, 1.0)
+    source.update(1, 2.0)
+    assert [sample.value for sample in seen] == [2.0]
+    assert [sample.value for sample in every] == [1.0, 2.0]
+    source.unsubscribe(record_every)
+    source.update(1, 3.0)
+    assert len(every) == 2 and len(seen) == 2
+
+
+def test_failing_subscriber_does_not_block_others():
+    source = CustomInput(1, Clock())
+    seen = []
+    source.subscribe(lambda sample: 1 / 0)
+    source.subscribe(seen.append)
+    source.update(0, 1.0)
+    assert len(seen) == 1
+
+
+def test_same_sample_is_integrated_once():
+    clock = Clock()
+    source = CustomInput(1, clock)
+    pi = controller(source, clock)
+    source.update(0, 90.0, timestamp=10.0)
+    pi.regeln()
+    integral = pi.i
+    assert integral == pytest.approx(10.0 * KI * 10.0)
+    clock.now = 20.0
+    pi.regeln()
+    assert pi.i == integral
+    source.update(0, 95.0, timestamp=12.0)
+    pi.regeln()
+    assert pi.i == pytest.approx(integral + 5.0 * KI * 2.0)
+
+
+def test_values_written_directly_keep_call_time_behaviour():
+    clock = Clock()
+    source = CustomInput(1, clock)
+    pi = controller(source, clock)
+    source.values[0] = 90.0
+    clock.now = 1.0
+    pi.regeln()
+    clock.now = 2.0
+    pi.regeln()
+    assert pi.i == pytest.approx(2 * 10.0 * KI)
+
+
+def test_direct_write_after_update_is_followed():
+    clock = Clock()
+    source = CustomInput(1, clock)
+    pi = controller(source, clock)
+    source.update(0, 90.0, timestamp=1.0)
+    clock.now = 1.0
+    pi.regeln()
+    integral = pi.i
+    source.values[0] = 80.0
+    assert source.sample(0) == Sample(80.0, None, 0)
+    clock.now = 3.0
+    pi.regeln()
+    assert pi.i == pytest.approx(integral + 20.0 * KI * 2.0)
+    source.update(0, 85.0, timestamp=4.0)
+    assert source.sample(0) == Sample(85.0, 4.0, 2)
+
+
+def test_subscribed_controller_steps_once_per_sample():
+    clock = Clock()
+    source = CustomInput(1, clock)
+    pi = controller(source, clock)
+    steps = []
+    pi.subscribe(steps.append)
+    for t in (1.0, 2.0, 3.0):
+        source.update(0, 90.0, timestamp=t)
+    assert len(steps) == 3
+    assert pi.i == pytest.approx(3 * 10.0 * KI)
+    pi.regeln()
+    assert pi.i == pytest.approx(3 * 10.0 * KI)
+    pi.unsubscribe()
+    source.update(0, 90.0, timestamp=4.0)
+    assert len(steps) == 3
+
+
+def test_polled_input_sink_skips_failed_reads():
+    clock = Clock(3.0)
+    source = PolledInput(["MFC1.flow", "MFC1.temp"], clock)
+    device = object()
+    sink = source.sink({id(device): "MFC1"})
+    sink(device, {"flow": 12.0, "temp": None, "valve": 1})
+    sink(object(), {"flow": 99.0})
+    assert source.sample(0) == Sample(12.0, 3.0, 1)
+    assert source.sample(1).seq == 0
+
+
+def test_polled_input_attach_with_worker_processes(rig_config):
+    pytest.importorskip("pyModbusTCP")
+    from modbus_functions import MOD_TCP
+    modbus = MOD_TCP(rig_config, debug_mode=MOD_TCP.OperationModes.dummyMode, processes=2, shard_rate=20.0)
+    try:
+        source = PolledInput(["P1.velocity", "MFC1.flow"]).attach(modbus)
+        deadline = time.monotonic() + 5.0
+        while not (source.sample(0).seq and source.sample(1).seq) and time.monotonic() < deadline:
+            time.sleep(0.05)
+        assert source.sample(0).seq and source.sample(1).seq
+    finally:
+        modbus.close()
@@ -0,0 +1,127 @@
+import time
+
+import pytest
+
+pytest.importorskip("pyModbusTCP")
+
+from modbus_functions import (MOD_TCP, DevicePoller, ValueCache, Quality, CachedValue, Modbus_MFC_MKS,
+                              RegisterSnapshot)
+from modbus_simulator import SimulatedRig
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+class FakeDevice:
+    """
+    Gerät mit dem Registerabbild eines MFC, dessen Lesezugriffe die Tests vorgeben.
+    """
+    REGISTERS = Modbus_MFC_MKS.REGISTERS
+    cache = None
+    poller = None
+
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.reads = []
+
+    def snapshot(self, names=None):
+        self.reads.append(tuple(names))
+        if self.fail:
+            raise ConnectionError("keine Verbindung")
+        return RegisterSnapshot({name: 1.0 for name in names})
+
+
+@pytest.fixture
+def mfc():
+    rig = SimulatedRig(base_port=16120)
+    host, port = rig.add("MFC1", "mks_modbus")
+    device = Modbus_MFC_MKS(host, port)
+    yield device
+    if device.poller is not None:
+        device.poller.stop()
+    device.client.close()
+    rig.stop()
+
+
+def test_cache_marks_missing_values_bad_and_old_values_stale():
+    cache = ValueCache()
+    cache.max_age["flow"] = cache.max_age["temp"] = 1.0
+    cache.update({"flow": 12.5, "temp": None})
+    assert cache.get("flow").quality == Quality.good
+    assert cache.get("temp") == CachedValue(None, cache.get("temp").timestamp, Quality.bad)
+    cache.update({"flow": 12.5}, timestamp=time.monotonic() - 2.0)
+    assert cache.get("flow").quality == Quality.stale
+    assert cache.fresh("flow") is None
+    assert cache.get("valve") is None
+
+
+def test_poller_fills_cache_and_feeds_sinks(mfc):
+    seen = []
+    poller = mfc.start_polling({"flow": 50.0, "temp": 50.0})
+    poller.add_sink(lambda device, values: seen.append((device, dict(values))))
+    assert wait_for(lambda: mfc.cached("flow") is not None)
+    assert mfc.cached("flow").quality == Quality.good
+    assert mfc.cached("valve") is None
+    assert wait_for(lambda: seen)
+    assert seen[0][0] is mfc and set(seen[0][1]) == {"flow", "temp"}
+    assert mfc.flow == mfc.cached("flow").value
+
+
+def test_values_turn_stale_after_polling_stops(mfc):
+    poller = mfc.start_polling(50.0)
+    assert wait_for(lambda: mfc.cached("flow") is not None)
+    poller.stop()
+    # Zulässiges Alter: zwei Abfrageperioden (40 ms)
+    assert wait_for(lambda: mfc.cached("flow") is None)
+    assert mfc.cache.get("flow").quality == Quality.stale
+    assert mfc.flow is not None   # liest wieder direkt vom Bus
+    poller.remove(mfc)
+    assert mfc.cache is None and mfc.poller is None
+
+
+def test_failed_polls_are_cached_as_bad():
+    device = FakeDevice(fail=True)
+    poller = DevicePoller()
+    poller.add(device, {"flow": 100.0})
+    poller.start()
+    try:
+        assert wait_for(lambda: device.cache.get("flow") is not None)
+        assert device.cache.get("flow").quality == Quality.bad
+    finally:
+        poller.stop()
+
+
+def test_due_values_are_read_together():
+    device = FakeDevice()
+    poller = DevicePoller()
+    poller.add(device, {"flow": 20.0, "temp": 20.0, "valve": 2.0})
+    poller.start()
+    try:
+        assert wait_for(lambda: len(device.reads) >= 3)
+    finally:
+        poller.stop()
+    assert sorted(device.reads[0]) == ["flow", "temp", "valve"]
+    assert all(sorted(names) == ["flow", "temp"] for names in device.reads[1:3])
+
+
+def test_unknown_value_is_rejected():
+    with pytest.raises(KeyError):
+        DevicePoller().add(FakeDevice(), {"pressure": 1.0})
+
+
+def test_mod_tcp_polls_all_devices(rig_config):
+    modbus = MOD_TCP(rig_config, debug_mode=MOD_TCP.OperationModes.dummyMode)
+    try:
+        poller = modbus.start_polling({"MFC1": 20.0, "P1": {"velocity": 20.0, "flow": 20.0}})
+        assert wait_for(lambda: modbus.devices["P1"].cached("velocity") is not None)
+        assert wait_for(lambda: modbus.devices["MFC1"].cached("flow") is not None)
+        assert modbus.devices["P1"].cache.max_age.keys() == {"velocity"}
+        assert modbus.devices["P1"].poller is modbus.devices["MFC1"].poller is poller
+        # Geräte ohne Eintrag im Dictionary Gerätename -> Rate(n) werden nicht abgefragt
+        assert modbus.devices["C1"].poller is None
+    finally:
+        modbus.close()
@@ -0,0 +1,18 @@
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def loaded_after_import(module, *names):
+    code = (f"import sys; sys.path.insert(0, {ROOT!r}); import {module}; "
+            f"print(' '.join(name for name in {names!r} if name in sys.modules))")
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, timeout=60)
+    assert result.returncode == 0, result.stderr
+    return result.stdout.split()
+
+
+def test_modbus_functions_defers_asyncio_and_pymodbustcp():
+    assert loaded_after_import("modbus_functions", "asyncio", "concurrent.futures", "queue",
+                               "pyModbusTCP", "pyModbusTCP.client") == []
@@ -0,0 +1,34 @@
+import pytest
+
+pytest.importorskip("pyModbusTCP")
+
+from pyModbusTCP.constants import MB_EXCEPT_ERR
+
+from modbus_metrics import ModbusMetrics, frame_sizes
+
+
+class FakeClient:
+    def __init__(self):
+        self.last_error = 0
+        self.last_except = 0
+
+    def read_discrete_inputs(self, bit_addr, bit_nb=1):
+        return [True] * bit_nb
+
+    def write_multiple_coils(self, bits_addr, bits_value):
+        self.last_error, self.last_except = MB_EXCEPT_ERR, 2
+        return False
+
+
+def test_bit_functions_are_instrumented():
+    metrics = ModbusMetrics()
+    client = metrics.instrument(FakeClient(), "Ventile")
+    assert client.read_discrete_inputs(8, 12) == [True] * 12
+    assert client.write_multiple_coils(0, [True, False, True]) is False
+    registers = metrics.stats("Ventile")["Ventile"]["registers"]
+    read = registers[("read_discrete_inputs", 8)]
+    assert read["requests"] == 1
+    assert (read["bytes_sent"], read["bytes_received"]) == frame_sizes("read_discrete_inputs", 12)
+    write = registers[("write_multiple_coils", 0)]
+    assert write["exceptions"] == {2: 1}
+    assert write["bytes_sent"] == frame_sizes("write_multiple_coils", 3)[0]
@@ -0,0 +1,44 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+pytest.importorskip("pyModbusTCP")
+
+import modbus_proxy
+from modbus_functions import MOD_TCP
+from modbus_simulator import SimulatedRig
+
+
+@pytest.fixture
+def rig():
+    rig = SimulatedRig(base_port=16020)
+    yield rig
+    rig.stop()
+
+
+def test_proxy_serves_simulated_device(rig):
+    host, port = rig.add("MFC1", "mks_modbus")
+    config = {"MFC1": {"input_type": "mks_modbus", "ip_address": host, "port": port}}
+    proxy = modbus_proxy.ModbusProxy(config, base_port=16520, ttl=0.05)
+    try:
+        routes = proxy.routes
+        assert list(routes) == [f"{host}:{port}"]
+        assert routes[f"{host}:{port}"][1] != port
+        modbus = MOD_TCP(modbus_proxy.proxied_config(config, routes), shared_connections=False)
+        try:
+            snapshot = modbus.devices["MFC1"].snapshot()
+            assert snapshot.values["flow"] is not None
+        finally:
+            modbus.close()
+        assert sum(stats["upstream_reads"] for stats in proxy.stats().values()) > 0
+    finally:
+        proxy.close()
+    assert proxy.handlers == {}
+
+
+def test_runs_as_script():
+    path = os.path.join(os.path.dirname(os.path.abspath(modbus_proxy.__file__)), "modbus_proxy.py")
+    result = subprocess.run([sys.executable, path, "--help"], capture_output=True, text=True, timeout=60)
+    assert result.returncode == 0, result.stderr
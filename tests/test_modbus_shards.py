@@ -0,0 +1,29 @@
+import pytest
+
+pytest.importorskip("pyModbusTCP")
+
+from modbus_functions import MOD_TCP
+from modbus_metrics import ModbusMetrics
+from modbus_shards import plan_shards
+
+
+def test_plan_shards_keeps_gateways_together():
+    config = {"A": {"ip_address": "10.0.0.1"}, "B": {"ip_address": "10.0.0.1", "unit_id": 2},
+              "C": {"ip_address": "10.0.0.2"}, "D": {"ip_address": "10.0.0.3"}}
+    shards = plan_shards(config, 2)
+    assert sorted(sorted(shard) for shard in shards) == [["A", "B"], ["C", "D"]]
+    assert len(plan_shards(config, 8)) == 3
+
+
+def test_metrics_object_is_rejected_with_processes(rig_config):
+    with pytest.raises(ValueError):
+        MOD_TCP(rig_config, debug_mode=MOD_TCP.OperationModes.dummyMode, processes=2, metrics=ModbusMetrics())
+
+
+def test_metrics_stay_in_workers(rig_config):
+    modbus = MOD_TCP(rig_config, debug_mode=MOD_TCP.OperationModes.dummyMode, processes=2, metrics=True)
+    try:
+        assert modbus.metrics is None
+        assert modbus.devices["P1"].snapshot().values
+    finally:
+        modbus.close()
@@ -0,0 +1,59 @@
+import math
+import struct
+import sys
+
+import pytest
+
+import modbus_functions
+from modbus_functions import (RegisterCodec, UINT16, INT16, FLOAT32_BE, INT32_LOW_FIRST,
+                              decode_values, registers_to_bytes)
+
+
+@pytest.mark.parametrize("codec, value", [
+    (UINT16, 0), (UINT16, 65535), (INT16, -32768), (INT16, 1234),
+    (INT32_LOW_FIRST, -5000000), (INT32_LOW_FIRST, 2 ** 31 - 1),
+    (FLOAT32_BE, 0.0), (FLOAT32_BE, -273.5), (RegisterCodec("I", "big"), 0xDEADBEEF),
+    (RegisterCodec("d", "little"), math.pi),
+])
+def test_round_trip(codec, value):
+    regs = codec.encode(value)
+    assert len(regs) == codec.count
+    assert all(0 <= reg <= 0xFFFF for reg in regs)
+    assert codec(regs) == value
+
+
+def test_word_order():
+    # MKS-MFC: High-Word zuerst; Pumpe: Low-Word zuerst
+    assert FLOAT32_BE.encode(1.0) == [0x3F80, 0x0000]
+    assert INT32_LOW_FIRST.encode(0x12345678) == [0x5678, 0x1234]
+    assert INT32_LOW_FIRST.decode([0xFFFF, 0xFFFF]) == -1
+
+
+def test_registers_to_bytes():
+    assert registers_to_bytes([0x1234, 0xABCD]) == b"\x12\x34\xab\xcd"
+    assert registers_to_bytes([0x1234, 0xABCD], "little") == b"\x34\x12\xcd\xab"
+
+
+@pytest.mark.parametrize("count", [1, 7, modbus_functions.NUMPY_BLOCK_THRESHOLD + 3])
+@pytest.mark.parametrize("codec", [UINT16, INT16, FLOAT32_BE, INT32_LOW_FIRST])
+def test_decode_values_matches_single_decode(codec, count):
+    first = 0 if codec is UINT16 else -(count // 2)
+    values = [codec.decode(codec.encode(value)) for value in range(first, first + count)]
+    regs = [reg for value in values for reg in codec.encode(value)]
+    assert decode_values(regs, codec) == values
+    assert decode_values(regs + [0] * codec.count, codec, count) == values
+
+
+def test_decode_values_without_numpy(monkeypatch):
+    monkeypatch.setitem(sys.modules, "numpy", None)
+    count = modbus_functions.NUMPY_BLOCK_THRESHOLD
+    regs = [reg for value in range(count) for reg in FLOAT32_BE.encode(float(value))]
+    assert decode_values(regs, FLOAT32_BE) == [float(value) for value in range(count)]
+
+
+def test_block_decode_uses_compiled_layout():
+    fields = [modbus_functions.RegisterField("flow", 0, FLOAT32_BE), modbus_functions.RegisterField("valve", 4)]
+    block = modbus_functions.RegisterMap(fields).plan()[0]
+    regs = FLOAT32_BE.encode(12.5) + [0, 0, 42]
+    assert block.decode(regs) == {"flow": 12.5, "valve": 42}
+    assert isinstance(block._layout[1], struct.Struct)
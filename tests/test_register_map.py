@@ -0,0 +1,118 @@
+from modbus_functions import (RegisterMap, RegisterField, RegisterTable, Modbus_Pump,
+                              UINT16, INT32_LOW_FIRST, FLOAT32_BE)
+
+
+class FakeClient:
+    """
+    Registerspeicher mit der Lese-API des ModbusClient. Anfragen, die eine Adresse außerhalb
+    von documented berühren, werden wie von einem echten Gerät mit Exception 2 abgelehnt.
+    """
+
+    def __init__(self, registers, documented=None):
+        self.registers = registers
+        self.documented = documented
+        self.calls = []
+        self.last_except = 0
+
+    def read_holding_registers(self, address, count):
+        self.calls.append((RegisterTable.holding, address, count))
+        if self.documented is not None and any(a not in self.documented for a in range(address, address + count)):
+            self.last_except = 2
+            return None
+        self.last_except = 0
+        return [self.registers.get(a, 0) for a in range(address, address + count)]
+
+    def read_input_registers(self, address, count):
+        self.calls.append((RegisterTable.input, address, count))
+        self.last_except = 0
+        return [self.registers.get(a, 0) for a in range(address, address + count)]
+
+
+def blocks(register_map, names=None):
+    return [(block.table, block.start, block.count, [f.name for f in block.fields])
+            for block in register_map.plan(names)]
+
+
+def test_plan_merges_neighbours_within_max_gap():
+    register_map = RegisterMap([
+        RegisterField("a", 10),
+        RegisterField("b", 11, FLOAT32_BE),
+        RegisterField("c", 17),        # Lücke von 4 Registern: wird noch zusammengefasst
+        RegisterField("d", 23),        # Lücke von 5 Registern: neuer Block
+    ], max_gap=4)
+    assert blocks(register_map) == [
+        (RegisterTable.holding, 10, 8, ["a", "b", "c"]),
+        (RegisterTable.holding, 23, 1, ["d"]),
+    ]
+
+
+def test_plan_separates_tables_and_respects_block_limit():
+    fields = [RegisterField(f"h{i}", i * 2) for i in range(100)]
+    fields.append(RegisterField("in", 0, table=RegisterTable.input))
+    register_map = RegisterMap(fields, max_gap=4)
+    plan = register_map.plan()
+    assert all(block.count <= RegisterMap.MAX_BLOCK for block in plan)
+    assert [block.table for block in plan] == [RegisterTable.holding, RegisterTable.holding, RegisterTable.input]
+    assert sum(len(block.fields) for block in plan) == 101
+
+
+def test_plan_for_subset_is_cached():
+    register_map = Modbus_Pump.REGISTERS
+    assert register_map.plan(["velocity", "error"]) is register_map.plan(("error", "velocity"))
+    assert blocks(register_map, ["velocity"]) == [(RegisterTable.holding, 0x85, 2, ["velocity"])]
+
+
+def test_read_decodes_block():
+    registers = {0x21: 4, 0x57: 0xFFFE, 0x58: 0xFFFF, 0x85: 1000, 0x86: 0}
+    client = FakeClient(registers)
+    snapshot = RegisterMap(list(Modbus_Pump.REGISTERS.fields.values()), max_gap=48).read(client)
+    assert client.calls == [(RegisterTable.holding, 0x21, 0x66)]
+    assert snapshot.error == 4
+    assert snapshot.position == -2
+    assert snapshot["velocity"] == 1000
+    assert snapshot.moving == 0
+
+
+def test_rejected_block_falls_back_and_is_remembered():
+    fields = [RegisterField("a", 0), RegisterField("b", 3), RegisterField("c", 10, INT32_LOW_FIRST)]
+    register_map = RegisterMap(fields, max_gap=8)
+    client = FakeClient({0: 1, 3: 2, 10: 3, 11: 0}, documented={0, 3, 10, 11})
+    assert register_map.read(client).values == {"a": 1, "b": 2, "c": 3}
+    assert client.calls[0] == (RegisterTable.holding, 0, 12)
+    assert len(client.calls) == 4
+
+    client.calls.clear()
+    assert register_map.read(client).values == {"a": 1, "b": 2, "c": 3}
+    assert client.calls == [(RegisterTable.holding, 0, 1), (RegisterTable.holding, 3, 1),
+                            (RegisterTable.holding, 10, 2)]
+
+
+def test_rejection_is_remembered_per_device():
+    fields = [RegisterField("a", 0), RegisterField("b", 3)]
+    register_map = RegisterMap(fields, max_gap=8)
+    strict = FakeClient({0: 1, 3: 2}, documented={0, 3})
+    strict.host, strict.port, strict.unit_id = "10.0.0.2", 502, 1
+    lenient = FakeClient({0: 1, 3: 2})
+    lenient.host, lenient.port, lenient.unit_id = "10.0.0.3", 502, 1
+    register_map.read(strict)
+    strict.calls.clear()
+    assert register_map.read(strict).values == {"a": 1, "b": 2}
+    assert register_map.read(lenient).values == {"a": 1, "b": 2}
+    assert strict.calls == [(RegisterTable.holding, 0, 1), (RegisterTable.holding, 3, 1)]
+    assert lenient.calls == [(RegisterTable.holding, 0, 4)]
+    assert blocks(register_map) == [(RegisterTable.holding, 0, 4, ["a", "b"])]
+
+
+def test_unreachable_device_does_not_mark_block():
+    class DeadClient(FakeClient):
+        def read_holding_registers(self, address, count):
+            self.calls.append((RegisterTable.holding, address, count))
+            self.last_except = 0
+            return None
+
+    register_map = RegisterMap([RegisterField("a", 0), RegisterField("b", 2, UINT16)])
+    client = DeadClient({})
+    assert register_map.read(client).values == {"a": None, "b": None}
+    client.calls.clear()
+    register_map.read(client)
+    assert client.calls[0] == (RegisterTable.holding, 0, 3)
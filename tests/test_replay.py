@@ -0,0 +1,52 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("pyModbusTCP")
+
+from modbus_functions import MOD_TCP
+from modbus_replay import Replay, ReplayClient, ReplayClock, Transaction, read_recording
+
+CONFIG = {"MFC1": {"input_type": "mks_modbus", "ip_address": "10.0.0.2"},
+          "P1": {"output_type": "modbus_pump", "ip_address": "10.0.0.3"}}
+
+
+def transaction(timestamp, data, address=0, function=3, error=0):
+    return Transaction(timestamp, 0.0, "MFC1", function, address, len(data), error, 0, data)
+
+
+def test_clocked_replay_has_no_answer_before_first_recording():
+    clock = ReplayClock(10.0)
+    client = ReplayClient([transaction(10.0, [1]), transaction(12.0, [2]), transaction(11.0, [5], address=7)],
+                          clock)
+    assert client.read_holding_registers(0) == [1]
+    assert client.read_holding_registers(7) is None
+    clock.advance(1.5)
+    assert client.read_holding_registers(7) == [5]
+    clock.advance(1.0)
+    assert client.read_holding_registers(0) == [2]
+
+
+def test_record_and_replay_round_trip(tmp_path):
+    path = str(tmp_path / "anlage.ctmr")
+    modbus = MOD_TCP(CONFIG, debug_mode=MOD_TCP.OperationModes.dummyMode, record=path)
+    try:
+        modbus.devices["MFC1"].set(500.0)
+        recorded = {name: device.snapshot().values for name, device in modbus.devices.items()}
+    finally:
+        modbus.close()
+    transactions = list(read_recording(path))
+    assert {t.device for t in transactions} == set(CONFIG)
+
+    replay = Replay(path)
+    replayed = MOD_TCP(CONFIG, replay=replay)
+    try:
+        replay.clock.advance(replay.duration)
+        assert {name: device.snapshot().values for name, device in replayed.devices.items()} == recorded
+        polled = asyncio.run(replayed.poll_all())
+        assert {name: snapshot.values for name, snapshot in polled.items()} == recorded
+        assert type(replayed.devices["MFC1"].async_client).__name__ == "AsyncReplayClient"
+        replayed.devices["MFC1"].set(500.0)
+        assert replayed.devices["MFC1"].client.writes
+    finally:
+        replayed.close()
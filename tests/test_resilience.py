@@ -0,0 +1,146 @@
+import pytest
+
+pytest.importorskip("pyModbusTCP")
+
+from pyModbusTCP.constants import MB_NO_ERR, MB_TIMEOUT_ERR, MB_EXCEPT_ERR, MB_CONNECT_ERR
+
+from modbus_resilience import ResilientClient, CircuitState
+
+
+class FakeClient:
+    """
+    Client mit der API des ModbusClient, dessen Antworten die Tests vorgeben.
+    Jede Antwort ist (Ergebnis, Fehlercode); die letzte wird wiederholt.
+    """
+
+    def __init__(self, *responses):
+        self.responses = list(responses) or [([0], MB_NO_ERR)]
+        self.host = "fake"
+        self.unit_id = 1
+        self.timeout = 0.2
+        self.calls = 0
+        self.closed = False
+        self.last_error = MB_NO_ERR
+        self.last_except = 0
+        self.last_error_as_txt = self.last_except_as_txt = self.last_except_as_full_txt = ""
+
+    def _respond(self):
+        self.calls += 1
+        result, self.last_error = self.responses.pop(0) if len(self.responses) > 1 else self.responses[0]
+        self.last_except = 2 if self.last_error == MB_EXCEPT_ERR else 0
+        return result
+
+    def read_holding_registers(self, reg_addr, reg_nb=1):
+        return self._respond()
+
+    def write_single_register(self, reg_addr, reg_value):
+        return self._respond()
+
+    def open(self):
+        return True
+
+    def close(self):
+        self.closed = True
+
+
+def resilient(client, **options):
+    options.setdefault("backoff", 0.0)
+    options.setdefault("probe_interval", 60.0)
+    return ResilientClient(client, **options)
+
+
+def test_success_is_passed_through_and_observed():
+    wrapped = resilient(FakeClient(([1, 2], MB_NO_ERR)))
+    assert wrapped.read_holding_registers(0, 2) == [1, 2]
+    assert wrapped.failures == 0
+    assert wrapped.srtt is not None
+
+
+def test_timeout_is_retried():
+    client = FakeClient((None, MB_TIMEOUT_ERR), ([7], MB_NO_ERR))
+    wrapped = resilient(client, retries=1)
+    assert wrapped.read_holding_registers(0) == [7]
+    assert client.calls == 2
+    assert wrapped.retried == 1
+    assert wrapped.failures == 0
+    # Antwortzeit eines wiederholten Versuchs ist nicht eindeutig (Karn-Algorithmus)
+    assert wrapped.srtt is None
+
+
+def test_modbus_exception_is_not_retried_and_not_counted():
+    client = FakeClient((None, MB_EXCEPT_ERR))
+    wrapped = resilient(client, retries=3)
+    assert wrapped.read_holding_registers(0) is None
+    assert client.calls == 1
+    assert wrapped.failures == 0
+    assert wrapped.last_error == MB_EXCEPT_ERR
+
+
+def test_failed_write_counts_as_failure():
+    client = FakeClient((False, MB_TIMEOUT_ERR))
+    wrapped = resilient(client, retries=1, failure_threshold=5)
+    assert wrapped.write_single_register(0, 1) is False
+    assert client.calls == 2
+    assert wrapped.failures == 1
+    assert wrapped.srtt is None
+
+
+def test_breaker_opens_after_threshold_and_rejects():
+    client = FakeClient((False, MB_TIMEOUT_ERR))
+    wrapped = resilient(client, retries=0, failure_threshold=3)
+    for _ in range(3):
+        assert wrapped.write_single_register(0, 1) is False
+    assert wrapped.state == CircuitState.open
+    assert not wrapped.available
+    calls = client.calls
+    assert wrapped.read_holding_registers(0) is None
+    assert wrapped.write_single_register(0, 1) is False
+    assert client.calls == calls
+    assert wrapped.rejected == 2
+    assert wrapped.last_error == MB_CONNECT_ERR
+    wrapped.close()
+
+
+def test_success_resets_failure_count():
+    client = FakeClient((None, MB_TIMEOUT_ERR), (None, MB_TIMEOUT_ERR), ([1], MB_NO_ERR), (None, MB_TIMEOUT_ERR))
+    wrapped = resilient(client, retries=0, failure_threshold=3)
+    wrapped.read_holding_registers(0)
+    wrapped.read_holding_registers(0)
+    assert wrapped.failures == 2
+    assert wrapped.read_holding_registers(0) == [1]
+    assert wrapped.failures == 0
+    wrapped.read_holding_registers(0)
+    assert wrapped.state == CircuitState.closed
+
+
+def test_probe_closes_breaker_when_device_answers_again():
+    client = FakeClient(([5], MB_NO_ERR), (None, MB_TIMEOUT_ERR), (None, MB_TIMEOUT_ERR), ([5], MB_NO_ERR))
+    wrapped = resilient(client, retries=0, failure_threshold=2, probe_interval=0.01)
+    assert wrapped.read_holding_registers(3) == [5]
+    wrapped.read_holding_registers(3)
+    wrapped.read_holding_registers(3)
+    assert wrapped.state != CircuitState.closed
+    wrapped._probe_thread.join(1.0)
+    assert wrapped.state == CircuitState.closed
+    assert wrapped.failures == 0
+    assert wrapped.read_holding_registers(3) == [5]
+
+
+def test_probe_treats_failed_write_style_result_as_failure():
+    client = FakeClient((False, MB_TIMEOUT_ERR))
+    wrapped = resilient(client, retries=0, failure_threshold=1, probe_interval=0.01)
+    wrapped._probe = ("write_single_register", (0, 1))
+    wrapped.write_single_register(0, 1)
+    assert wrapped.state == CircuitState.open
+    wrapped._probe_thread.join(0.05)
+    assert wrapped.state != CircuitState.closed
+    wrapped.close()
+
+
+def test_timeout_adapts_to_observed_rtt():
+    wrapped = resilient(FakeClient(), min_timeout=0.05, max_timeout=1.0)
+    wrapped._observe(0.001)
+    assert wrapped.timeout == 0.05
+    for _ in range(50):
+        wrapped._observe(0.3)
+    assert 0.3 <= wrapped.timeout <= 1.0
@@ -0,0 +1,116 @@
+import struct
+import threading
+import time
+
+import pytest
+
+from modbus_functions import Quality, Modbus_MFC_MKS, Modbus_Pump
+from shared_values import SharedValueTable, channels_from_config
+
+
+@pytest.fixture
+def table():
+    table = SharedValueTable(channels=["MFC1.flow", "MFC1.valve", "P1.position"])
+    yield table
+    table.close()
+
+
+def test_write_and_read(table):
+    assert table.read("MFC1.flow").value is None
+    assert table.read("MFC1.flow").quality == Quality.bad
+    table.write("MFC1.flow", 12.5, timestamp=100.0)
+    assert table.read("MFC1.flow") == (12.5, 100.0, Quality.good)
+    table.write("MFC1.flow", None, timestamp=101.0)
+    assert table.read(0) == (None, 101.0, Quality.bad)
+
+
+def test_update_and_open_by_name(table):
+    table.update("MFC1", {"flow": 3.0, "valve": 1, "unknown": 7}, timestamp=5.0)
+    reader = SharedValueTable(table.name)
+    try:
+        assert reader.channels == table.channels
+        snapshot = reader.snapshot()
+        assert snapshot["MFC1.flow"].value == 3.0
+        assert snapshot["MFC1.valve"].value == 1.0
+        assert snapshot["P1.position"].value is None
+    finally:
+        reader.close()
+
+
+def test_open_rejects_foreign_segment():
+    from multiprocessing import shared_memory
+    segment = shared_memory.SharedMemory(create=True, size=64)
+    try:
+        with pytest.raises(ValueError):
+            SharedValueTable(segment.name)
+    finally:
+        segment.close()
+        segment.unlink()
+
+
+def test_sequence_counter_is_even_after_each_write(table):
+    for step in range(5):
+        table.write("P1.position", float(step))
+    assert table.as_array()["seq"][2] == 10
+
+
+def test_reader_waits_while_write_is_in_progress(table):
+    table.write("MFC1.flow", 1.0, timestamp=1.0)
+    position = table._offset
+    buffer = table._shm.buf
+    # Schreibvorgang von Hand beginnen: ungerader Zähler, halb geschriebener Slot
+    struct.pack_into("<Qd", buffer, position, 3, 2.0)
+    result = []
+    reader = threading.Thread(target=lambda: result.append(table.read("MFC1.flow")))
+    reader.start()
+    reader.join(0.05)
+    assert reader.is_alive() and not result
+    struct.pack_into("<dI", buffer, position + 16, 2.0, Quality.good)
+    struct.pack_into("<Q", buffer, position, 4)
+    reader.join(1.0)
+    assert result == [(2.0, 2.0, Quality.good)]
+
+
+def test_concurrent_reads_are_consistent(table):
+    stop = threading.Event()
+
+    def writer():
+        value = 0.0
+        while not stop.is_set():
+            value += 1.0
+            table.write("P1.position", value, timestamp=value)
+
+    thread = threading.Thread(target=writer)
+    thread.start()
+    try:
+        deadline = time.monotonic() + 0.2
+        while time.monotonic() < deadline:
+            value, timestamp, _ = table.read("P1.position")
+            assert value is None or value == timestamp
+    finally:
+        stop.set()
+        thread.join()
+
+
+def test_channels_from_config():
+    config = {"MFC1": {"input_type": "mks_modbus", "ip_address": "10.0.0.2"},
+              "TC1": {"input_type": "thermocouple"},
+              "P1": {"output_type": "modbus_pump", "ip_address": "10.0.0.3"}}
+    assert channels_from_config(config) == ([f"MFC1.{name}" for name in Modbus_MFC_MKS.REGISTERS.fields]
+                                            + [f"P1.{name}" for name in Modbus_Pump.REGISTERS.fields])
+
+
+def test_publish_with_worker_processes(rig_config):
+    pytest.importorskip("pyModbusTCP")
+    from modbus_functions import MOD_TCP
+    modbus = MOD_TCP(rig_config, debug_mode=MOD_TCP.OperationModes.dummyMode, processes=2, shard_rate=20.0)
+    try:
+        table = modbus.publish()
+        deadline = time.monotonic() + 5.0
+        while table.read("P1.velocity").quality != Quality.good and time.monotonic() < deadline:
+            time.sleep(0.05)
+        assert table.read("P1.velocity").quality == Quality.good
+        assert table.read("MFC1.flow").value is not None
+    finally:
+        modbus.close()
+        table.close()
@@ -0,0 +1,118 @@
+import threading
+import time
+
+import pytest
+
+from modbus_functions import WriteBehind
+
+
+class Sender:
+    """
+    Schreibfunktion, die die geschriebenen Werte festhält und optional fehlschlägt.
+    """
+
+    def __init__(self, success=True):
+        self.success = success
+        self.values = []
+        self.written = threading.Event()
+
+    def __call__(self, value):
+        self.values.append(value)
+        self.written.set()
+        return self.success
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+def test_deadband_skips_small_changes():
+    layer = WriteBehind(deadband=0.5)
+    send = Sender()
+    assert layer.write("sp", 10.0, send)
+    assert layer.write("sp", 10.4, send)
+    assert layer.write("sp", 11.0, send)
+    assert send.values == [10.0, 11.0]
+    assert (layer.sent, layer.skipped) == (2, 1)
+
+
+def test_failed_write_is_not_acknowledged():
+    layer = WriteBehind(deadband=0.5)
+    failing = Sender(success=False)
+    assert layer.write("sp", 10.0, failing) is False
+    send = Sender()
+    layer.write("sp", 10.0, send)
+    assert send.values == [10.0]
+
+
+def test_unchanged_value_is_refreshed():
+    layer = WriteBehind(deadband=0.5, refresh=0.05)
+    send = Sender()
+    layer.write("sp", 10.0, send)
+    time.sleep(0.06)
+    layer.write("sp", 10.0, send)
+    assert send.values == [10.0, 10.0]
+
+
+def test_rate_limit_coalesces_to_newest_value():
+    layer = WriteBehind(max_rate=10.0)
+    send = Sender()
+    layer.write("sp", 1.0, send)
+    for value in (2.0, 3.0, 4.0):
+        assert layer.write("sp", value, send) is True
+    assert send.values == [1.0]
+    assert wait_for(lambda: len(send.values) == 2)
+    time.sleep(0.15)
+    assert send.values == [1.0, 4.0]
+    assert layer.coalesced == 2
+
+
+def test_rate_limit_is_per_register():
+    layer = WriteBehind(max_rate=1.0)
+    send = Sender()
+    layer.write("a", 1.0, send)
+    layer.write("b", 2.0, send)
+    assert send.values == [1.0, 2.0]
+
+
+def test_value_inside_deadband_cancels_pending_write():
+    layer = WriteBehind(deadband=0.5, max_rate=10.0)
+    send = Sender()
+    layer.write("sp", 1.0, send)
+    layer.write("sp", 5.0, send)
+    layer.write("sp", 1.2, send)
+    time.sleep(0.2)
+    assert send.values == [1.0]
+
+
+def test_forget_drops_pending_value():
+    layer = WriteBehind(max_rate=10.0)
+    send = Sender()
+    layer.write("sp", 1.0, send)
+    layer.write("sp", 2.0, send)
+    layer.forget("sp")
+    time.sleep(0.2)
+    assert send.values == [1.0]
+
+
+def test_pump_halt_bypasses_write_behind(rig_config):
+    pytest.importorskip("pyModbusTCP")
+    from modbus_functions import MOD_TCP
+    modbus = MOD_TCP(rig_config, debug_mode=MOD_TCP.OperationModes.dummyMode)
+    try:
+        pump = modbus.devices["P1"]
+        layer = pump.enable_write_behind(deadband=10, max_rate=2.0)
+        assert pump.write_slew(1000)
+        assert pump.write_slew(1005)
+        assert (layer.sent, layer.skipped) == (1, 1)
+        assert wait_for(lambda: pump.velocity == 1000)
+        pump.write_slew(2000)   # wartet auf das nächste Sendefenster
+        pump.halt()
+        time.sleep(0.6)
+        assert layer.sent == 1
+        assert pump.velocity == 0
+    finally:
+        modbus.close()